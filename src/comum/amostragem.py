@@ -0,0 +1,117 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Amostragem do barometro a alta frequencia **************
+#
+# Uma thread (Amostrador) le o BMP280/BMP388 ao ritmo maximo do sensor
+# e escreve num buffer circular. Radio, CSV e detecao de fases consomem
+# do buffer, cada um com o seu cursor e ao seu ritmo.
+#
+# O buffer tem um unico escritor e nao usa locks: cada posicao guarda um
+# tuplo imutavel e o contador de escritas so avanca depois de a posicao
+# estar escrita (atribuicoes atomicas no CPython).
+import time
+from threading import Thread
+
+
+class BufferCircular:
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._posicoes = [None] * capacidade
+        self.escritas = 0
+
+    def escrever(self, amostra):
+        self._posicoes[self.escritas % self.capacidade] = amostra
+        self.escritas += 1
+
+    def ler_desde(self, indice):
+        """Devolve (amostras, novo_indice) com tudo o que foi escrito desde indice.
+
+        Se o leitor ficou mais de uma volta para tras, as amostras ja
+        reescritas sao saltadas.
+        """
+        fim = self.escritas
+        inicio = max(indice, fim - self.capacidade + 1)
+        amostras = [self._posicoes[i % self.capacidade] for i in range(inicio, fim)]
+        return amostras, fim
+
+    def ultima(self):
+        fim = self.escritas
+        if fim == 0:
+            return None
+        return self._posicoes[(fim - 1) % self.capacidade]
+
+
+class Leitor:
+    """Cursor de um consumidor sobre o BufferCircular."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.indice = buffer.escritas
+        self.perdidas = 0
+        self._pendentes = []
+
+    def novas(self):
+        amostras, fim = self.buffer.ler_desde(self.indice)
+        self.perdidas += (fim - self.indice) - len(amostras)
+        self.indice = fim
+        return amostras
+
+    def media(self):
+        """Media (tempo, pressao, temperatura) das amostras novas, ou None."""
+        amostras = self.novas()
+        if not amostras:
+            return None
+        return _media(amostras)
+
+    def decimadas(self, fator):
+        """Medias de cada grupo de fator amostras novas (o resto fica pendente)."""
+        self._pendentes.extend(self.novas())
+        completas = len(self._pendentes) - len(self._pendentes) % fator
+        medias = [_media(self._pendentes[i:i + fator]) for i in range(0, completas, fator)]
+        del self._pendentes[:completas]
+        return medias
+
+
+def _media(amostras):
+    n = len(amostras)
+    return (
+        amostras[-1][0],
+        sum(a[1] for a in amostras) / n,
+        sum(a[2] for a in amostras) / n,
+    )
+
+
+class Amostrador(Thread):
+    """Chama ler() a cada periodo segundos; ler devolve (pressao em Pa, temperatura)."""
+
+    def __init__(self, ler, buffer, periodo=0.02, relogio=time.monotonic, dormir=time.sleep):
+        super().__init__(daemon=True)
+        self.ler = ler
+        self.buffer = buffer
+        self.periodo = periodo
+        self.relogio = relogio
+        self.dormir = dormir
+        self.erros = 0
+        self.ativo = True
+
+    def run(self):
+        proximo = self.relogio()
+        while self.ativo:
+            try:
+                pressao, temperatura = self.ler()
+                self.buffer.escrever((self.relogio(), pressao, temperatura))
+            except Exception as e:
+                # Falha pontual no I2C (OSError) ou no driver: perder uma
+                # amostra, nao a thread; so o primeiro erro e mostrado
+                self.erros += 1
+                if self.erros == 1:
+                    print(f"[AMOSTRAGEM] Erro a ler o sensor (a continuar): {e!r}")
+            proximo += self.periodo
+            espera = proximo - self.relogio()
+            if espera > 0:
+                self.dormir(espera)
+            else:
+                proximo = self.relogio()
+
+    def parar(self):
+        self.ativo = False
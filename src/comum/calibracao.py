@@ -0,0 +1,114 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Calibracao da pressao de referencia em segundo plano ****
+#
+# Substitui as 26 leituras com sleep(1) antes do ciclo de voo. As amostras
+# vem do Amostrador (50 Hz) e entram numa janela deslizante; a calibracao
+# termina quando a janela esta cheia e
+#
+#   ruido  = desvio padrao da janela        < ruido_maximo  (sensor parado)
+#   erro   = ruido / sqrt(amostras)         < tolerancia    (media estavel)
+#
+# ou, se o cansat nunca estiver quieto, ao fim de tempo_maximo com a media
+# que houver. A referencia e guardada em disco (escrita atomica) e, se o
+# programa reiniciar durante o mesmo voo (corte de energia), e lida no
+# arranque em vez de se calibrar de novo a meio do ar.
+import json
+import os
+import time
+from math import sqrt
+
+from janela import JanelaDeslizante
+
+
+def carregar_referencia(caminho, idade_maxima=3600.0, relogio=time.time):
+    """Pressao de referencia guardada ha menos de idade_maxima segundos, ou None.
+
+    Sem RTC o relogio do Pi pode recuar apos um reinicio, por isso a idade
+    conta nos dois sentidos.
+    """
+    try:
+        with open(caminho) as f:
+            dados = json.load(f)
+        pressao = float(dados["pressao"])
+        idade = relogio() - float(dados["tempo"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if abs(idade) > idade_maxima:
+        return None
+    return pressao
+
+
+def guardar_referencia(caminho, pressao, relogio=time.time, **extra):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w") as f:
+        json.dump(dict(extra, pressao=pressao, tempo=relogio()), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+class CalibracaoPressao:
+    def __init__(self, caminho, periodo=0.02, janela=2.0, tolerancia=0.5, ruido_maximo=6.0,
+                 tempo_minimo=2.0, tempo_maximo=30.0, idade_maxima=3600.0, relogio=time.time):
+        self.caminho = caminho
+        self.tolerancia = tolerancia
+        self.ruido_maximo = ruido_maximo
+        self.tempo_minimo = tempo_minimo
+        self.tempo_maximo = tempo_maximo
+        self.relogio = relogio
+        self.janela = JanelaDeslizante(max(2, int(round(janela / periodo))), periodo)
+        self.amostras = 0
+        self.inicio = None  # tempo da primeira amostra (relogio do amostrador)
+        self.duracao = 0.0
+        self.referencia = carregar_referencia(caminho, idade_maxima, relogio)
+        self.retomada = self.referencia is not None
+        self.forcada = False
+
+    def retomar(self, pressao):
+        """Usa a referencia de um ponto de controlo em vez de calibrar."""
+        self.referencia = pressao
+        self.retomada = True
+
+    @property
+    def concluida(self):
+        return self.referencia is not None
+
+    @property
+    def provisoria(self):
+        """Referencia final, ou a media atual enquanto a calibracao decorre."""
+        return self.referencia if self.referencia is not None else self.janela.media
+
+    @property
+    def ruido(self):
+        return sqrt(self.janela.variancia)
+
+    def atualizar(self, amostras):
+        """Consome amostras (tempo, pressao, temperatura); devolve True quando termina."""
+        if self.concluida:
+            return False
+        for tempo, pressao, _ in amostras:
+            if self.inicio is None:
+                self.inicio = tempo
+            self.janela.adicionar(pressao)
+            self.amostras += 1
+            self.duracao = tempo - self.inicio
+            if self._convergiu():
+                self._concluir(False)
+                return True
+            if self.duracao >= self.tempo_maximo and self.janela.cheia:
+                self._concluir(True)
+                return True
+        return False
+
+    def _convergiu(self):
+        if not self.janela.cheia or self.duracao < self.tempo_minimo:
+            return False
+        ruido = self.ruido
+        return ruido < self.ruido_maximo and ruido / sqrt(len(self.janela)) < self.tolerancia
+
+    def _concluir(self, forcada):
+        self.referencia = self.janela.media
+        self.forcada = forcada
+        guardar_referencia(self.caminho, self.referencia, self.relogio,
+                           ruido=self.ruido, amostras=self.amostras, forcada=forcada)
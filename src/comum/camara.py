@@ -0,0 +1,148 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Captura de fotografias fora do ciclo de voo ************
+#
+# O ciclo de voo so faz pedir(caminho); a captura do frame e a gravacao
+# do JPEG no cartao acontecem numa thread propria. A fila de pedidos e
+# limitada: se a camara nao acompanha, o pedido e descartado e contado,
+# em vez de atrasar a telemetria.
+#
+# Qualquer objeto com iniciar/capturar/guardar/fechar serve de camara:
+# CamaraPicamera2 no Pi, CamaraFalsa num PC.
+import time
+from queue import Queue, Full, Empty
+from threading import Thread
+
+
+class CamaraPicamera2:
+    def __init__(self, picam2):
+        self.picam2 = picam2
+
+    def iniciar(self):
+        self.picam2.configure(self.picam2.create_still_configuration())
+        self.picam2.start()
+
+    def capturar(self):
+        # O request segura o buffer da camara ate ser libertado em guardar()
+        return self.picam2.capture_request()
+
+    def guardar(self, frame, caminho):
+        try:
+            frame.save("main", caminho)
+        finally:
+            frame.release()
+
+    def fechar(self):
+        self.picam2.close()
+
+
+class CamaraFalsa:
+    """Camara para testes: simula os tempos de captura e de gravacao."""
+
+    def __init__(self, tempo_captura=0.1, tempo_gravacao=0.3, dormir=time.sleep):
+        self.tempo_captura = tempo_captura
+        self.tempo_gravacao = tempo_gravacao
+        self.dormir = dormir
+        self.iniciada = False
+        self.guardadas = []
+
+    def iniciar(self):
+        self.iniciada = True
+
+    def capturar(self):
+        self.dormir(self.tempo_captura)
+        return b"\xff\xd8\xff\xd9"
+
+    def guardar(self, frame, caminho):
+        self.dormir(self.tempo_gravacao)
+        with open(caminho, "wb") as f:
+            f.write(frame)
+        self.guardadas.append(caminho)
+
+    def fechar(self):
+        self.iniciada = False
+
+
+class CapturaAssincrona:
+    def __init__(self, camara, max_pendentes=2, relogio=time.monotonic):
+        self.camara = camara
+        self.relogio = relogio
+        self.fila = Queue(maxsize=max_pendentes)
+        self.pedidos = 0
+        self.capturadas = 0
+        self.descartadas = 0
+        self.falhadas = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+        self._thread = None
+
+    @property
+    def iniciada(self):
+        return self._thread is not None
+
+    def iniciar(self):
+        if self.iniciada:
+            return
+        self.camara.iniciar()
+        self._thread = Thread(target=self._trabalhador, daemon=True)
+        self._thread.start()
+
+    def pedir(self, caminho):
+        """Pede uma fotografia sem bloquear; devolve False se a fila estiver cheia."""
+        self.pedidos += 1
+        try:
+            self.fila.put_nowait((self.relogio(), caminho))
+        except Full:
+            self.descartadas += 1
+            return False
+        return True
+
+    def _trabalhador(self):
+        while True:
+            pedido = self.fila.get()
+            if pedido is None:
+                break
+            instante, caminho = pedido
+            try:
+                frame = self.camara.capturar()
+                self.camara.guardar(frame, caminho)
+            except Exception as e:
+                self.falhadas += 1
+                print(f"[CAMARA] Erro ao guardar {caminho}: {e}")
+            else:
+                latencia = self.relogio() - instante
+                self.capturadas += 1
+                self.latencia_total += latencia
+                self.latencia_maxima = max(self.latencia_maxima, latencia)
+                print(f"[CAMARA] Fotografia tirada: {caminho} ({latencia * 1000:.0f} ms)")
+            finally:
+                self.fila.task_done()
+
+    def parar(self, esperar=True):
+        if not self.iniciada:
+            return
+        if esperar:
+            self.fila.join()
+        else:
+            # Esvaziar os pedidos pendentes para a paragem ser imediata
+            try:
+                while True:
+                    self.fila.get_nowait()
+                    self.fila.task_done()
+            except Empty:
+                pass
+        self.fila.put(None)
+        self._thread.join()
+        self._thread = None
+        self.camara.fechar()
+
+    def estatisticas(self):
+        return {
+            "pedidos": self.pedidos,
+            "capturadas": self.capturadas,
+            "descartadas": self.descartadas,
+            "falhadas": self.falhadas,
+            "em_fila": self.fila.qsize(),
+            "latencia_media": self.latencia_total / self.capturadas if self.capturadas else 0.0,
+            "latencia_maxima": self.latencia_maxima,
+        }
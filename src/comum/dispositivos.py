@@ -0,0 +1,132 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Registo de dispositivos com inicializacao diferida *****
+#
+# Os scripts de voo registam uma fabrica por dispositivo (UART, BMP,
+# GPIO, camara, ...) e so importam as bibliotecas pesadas (board, busio,
+# adafruit_*, picamera2, numpy) quando o dispositivo e pedido:
+#
+#   dispositivos.registar("camara", criar_camara)
+#   dispositivos.preparar("camara")        # em segundo plano, nao bloqueia
+#   captura = dispositivos.obter("camara") # cria agora se ainda nao existir
+#   dispositivos.falhou("camara")          # a criacao lancou excecao (ver erros)
+#
+# Cada importacao e cada inicializacao e cronometrada; relatorio()
+# devolve as linhas do perfil de arranque, com os marcos (ex.: primeira
+# trama de telemetria) medidos desde o inicio do script.
+#
+# Perfil das importacoes feitas so por carregar um script de voo:
+#   python3 dispositivos.py perfil ../mati1/mati1_controlo_voo_CORRIGIDO.py
+import importlib
+import sys
+import time
+from threading import Lock, Thread
+
+
+class RegistoDispositivos:
+    def __init__(self, inicio=None, relogio=time.monotonic):
+        self.relogio = relogio
+        self.inicio = relogio() if inicio is None else inicio
+        self.fabricas = {}
+        self.instancias = {}
+        self.erros = {}
+        self.tempos_importacao = {}  # modulo -> segundos
+        self.tempos_inicializacao = {}  # dispositivo -> segundos (inclui importacoes)
+        self.marcos = {}  # nome -> segundos desde o inicio
+        self._locks = {}
+
+    def registar(self, nome, fabrica):
+        self.fabricas[nome] = fabrica
+        self._locks[nome] = Lock()
+
+    def importar(self, nome_modulo):
+        """importlib.import_module cronometrado (so a primeira importacao conta)."""
+        if nome_modulo in sys.modules:
+            return sys.modules[nome_modulo]
+        inicio = self.relogio()
+        modulo = importlib.import_module(nome_modulo)
+        self.tempos_importacao[nome_modulo] = self.relogio() - inicio
+        return modulo
+
+    def obter(self, nome):
+        """Devolve o dispositivo, criando-o na primeira chamada (bloqueia ate estar pronto)."""
+        if nome in self.instancias:
+            return self.instancias[nome]
+        with self._locks[nome]:
+            if nome not in self.instancias:
+                inicio = self.relogio()
+                try:
+                    self.instancias[nome] = self.fabricas[nome]()
+                except Exception as e:
+                    self.erros[nome] = e
+                    raise
+                finally:
+                    self.tempos_inicializacao[nome] = self.relogio() - inicio
+        return self.instancias[nome]
+
+    def preparar(self, nome):
+        """Cria o dispositivo numa thread, se ainda nao existir; nao bloqueia."""
+        if nome in self.instancias or self._locks[nome].locked():
+            return
+
+        def criar():
+            try:
+                self.obter(nome)
+            except Exception as e:
+                print(f"[DISPOSITIVOS] Falha ao preparar {nome}: {e}")
+
+        Thread(target=criar, daemon=True).start()
+
+    def pronto(self, nome):
+        return nome in self.instancias
+
+    def falhou(self, nome):
+        """True se a ultima tentativa de criar o dispositivo lancou uma excecao."""
+        return nome in self.erros and nome not in self.instancias
+
+    def marcar(self, nome):
+        self.marcos[nome] = self.relogio() - self.inicio
+        return self.marcos[nome]
+
+    def relatorio(self):
+        linhas = []
+        for nome, segundos in self.marcos.items():
+            linhas.append(f"{nome}: {segundos * 1000:.0f} ms desde o inicio")
+        for nome in self.fabricas:
+            if nome in self.tempos_inicializacao:
+                estado = "falhou" if nome in self.erros else "pronto"
+                linhas.append(f"{nome}: {self.tempos_inicializacao[nome] * 1000:.0f} ms ({estado})")
+            else:
+                linhas.append(f"{nome}: nao inicializado")
+        for modulo, segundos in sorted(self.tempos_importacao.items(), key=lambda m: -m[1]):
+            linhas.append(f"import {modulo}: {segundos * 1000:.0f} ms")
+        return linhas
+
+
+def perfil_importacoes(caminho, n=15):
+    """Corre python -X importtime sobre o carregamento de um script (sem principal())."""
+    import subprocess  # so usado nesta ferramenta, nao no arranque do voo
+    codigo = f"import runpy; runpy.run_path({caminho!r}, run_name='perfil')"
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                               capture_output=True, text=True)
+    total = time.perf_counter() - inicio
+    importacoes = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        importacoes.append((int(cumulativo), nome.strip()))
+    return total, sorted(importacoes, reverse=True)[:n], resultado.returncode
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "perfil":
+        print("Uso: python3 dispositivos.py perfil SCRIPT.py")
+        sys.exit(1)
+    total, importacoes, codigo = perfil_importacoes(sys.argv[2])
+    print(f"[PERFIL] Carregar {sys.argv[2]}: {total * 1000:.0f} ms (processo completo)")
+    if codigo != 0:
+        print("[PERFIL] O script falhou ao carregar (bibliotecas em falta?)")
+    for cumulativo, nome in importacoes:
+        print(f"  {cumulativo / 1000:8.1f} ms  {nome}")
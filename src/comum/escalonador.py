@@ -0,0 +1,129 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Escalonador periodico com prazos absolutos *************
+#
+# Substitui o "trabalho + sleep(1)" do ciclo de voo: cada tarefa tem o
+# seu periodo e o proximo prazo e calculado a partir do anterior (e nao
+# de quando a tarefa acabou), por isso o periodo nao deriva com o tempo
+# gasto em I2C, UART, CSV ou fotografias.
+#
+# O relogio e a funcao de espera sao injetados; com o RelogioFalso o
+# escalonador corre sem hardware e sem esperas reais (ver
+# src/tests/benchmarks/escalonador_prazos.py, que confirma os atrasos,
+# ultrapassagens e prazos perdidos contados).
+import time
+
+
+class Tarefa:
+    def __init__(self, nome, periodo, funcao, proximo):
+        self.nome = nome
+        self.periodo = periodo
+        self.funcao = funcao
+        self.proximo = proximo
+        self.execucoes = 0
+        self.ultrapassagens = 0  # execucoes que acabaram depois do prazo seguinte
+        self.prazos_perdidos = 0  # periodos saltados por atraso
+        self.atraso_maximo = 0.0  # maior atraso do inicio em relacao ao prazo
+        self.soma_atrasos = 0.0
+        self.duracao_maxima = 0.0
+
+    def estatisticas(self):
+        return {
+            "periodo": self.periodo,
+            "execucoes": self.execucoes,
+            "ultrapassagens": self.ultrapassagens,
+            "prazos_perdidos": self.prazos_perdidos,
+            "atraso_maximo": self.atraso_maximo,
+            "atraso_medio": self.soma_atrasos / self.execucoes if self.execucoes else 0.0,
+            "duracao_maxima": self.duracao_maxima,
+        }
+
+
+class Escalonador:
+    def __init__(self, relogio=time.monotonic, dormir=time.sleep):
+        self.relogio = relogio
+        self.dormir = dormir
+        self.tarefas = []
+        self._pontuais = []
+        self.ativo = True
+
+    def adicionar(self, nome, periodo, funcao, atraso=0.0):
+        tarefa = Tarefa(nome, periodo, funcao, self.relogio() + atraso)
+        self.tarefas.append(tarefa)
+        return tarefa
+
+    def remover(self, tarefa):
+        if tarefa in self.tarefas:
+            self.tarefas.remove(tarefa)
+
+    def agendar(self, atraso, funcao):
+        """Executa funcao uma unica vez daqui a atraso segundos (ex.: desligar o buzzer)."""
+        self._pontuais.append((self.relogio() + atraso, funcao))
+
+    def _proximo_prazo(self):
+        prazos = [t.proximo for t in self.tarefas] + [p for (p, _) in self._pontuais]
+        return min(prazos) if prazos else None
+
+    def passo(self):
+        """Espera pelo proximo prazo e executa tudo o que estiver vencido."""
+        prazo = self._proximo_prazo()
+        if prazo is None:
+            return
+        espera = prazo - self.relogio()
+        if espera > 0:
+            self.dormir(espera)
+
+        agora = self.relogio()
+        vencidas = [p for p in self._pontuais if p[0] <= agora]
+        for pontual in vencidas:
+            self._pontuais.remove(pontual)
+            pontual[1]()
+
+        for tarefa in list(self.tarefas):
+            if tarefa.proximo > self.relogio():
+                continue
+            inicio = self.relogio()
+            atraso = inicio - tarefa.proximo
+            tarefa.funcao()
+            fim = self.relogio()
+
+            tarefa.execucoes += 1
+            tarefa.soma_atrasos += atraso
+            tarefa.atraso_maximo = max(tarefa.atraso_maximo, atraso)
+            tarefa.duracao_maxima = max(tarefa.duracao_maxima, fim - inicio)
+
+            tarefa.proximo += tarefa.periodo
+            if fim > tarefa.proximo:
+                tarefa.ultrapassagens += 1
+                # Nao tentar recuperar execucoes em atraso: saltar para o
+                # proximo prazo no futuro, mantendo a grelha de tempo
+                saltados = int((fim - tarefa.proximo) // tarefa.periodo) + 1
+                tarefa.prazos_perdidos += saltados
+                tarefa.proximo += saltados * tarefa.periodo
+
+    def correr(self, duracao=None):
+        fim = None if duracao is None else self.relogio() + duracao
+        while self.ativo and (fim is None or self.relogio() < fim):
+            self.passo()
+
+    def parar(self):
+        self.ativo = False
+
+    def estatisticas(self):
+        return {t.nome: t.estatisticas() for t in self.tarefas}
+
+
+class RelogioFalso:
+    """Relogio controlado pelo teste: dormir() avanca o tempo sem esperar."""
+
+    def __init__(self, inicio=0.0):
+        self.agora = inicio
+
+    def __call__(self):
+        return self.agora
+
+    def avancar(self, segundos):
+        self.agora += segundos
+
+    def dormir(self, segundos):
+        self.agora += segundos
@@ -0,0 +1,56 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Estado partilhado entre threads (instantaneos imutaveis) *
+#
+# Quem publica (thread do GPS, tarefa das fases) cria um Instantaneo
+# novo e troca a referencia de uma so vez; quem le (radio, registo,
+# fases) obtem com ler() um Instantaneo coerente, sem locks. Os
+# escritores usam um lock entre si para nao perderem atualizacoes uns
+# dos outros, mas o caminho de leitura nunca bloqueia.
+#
+# Cada valor guarda o tempo (monotonic) em que foi adquirido, para os
+# consumidores saberem a idade dos dados.
+import time
+from collections import namedtuple
+from threading import Lock
+
+Instantaneo = namedtuple("Instantaneo", "versao gps estimativa")
+Estimativa = namedtuple("Estimativa", "tempo altitude velocidade")
+
+
+class EstadoSensores:
+    def __init__(self, relogio=time.monotonic):
+        self.relogio = relogio
+        self._instantaneo = Instantaneo(0, None, None)
+        self._lock_escrita = Lock()
+
+    def ler(self):
+        return self._instantaneo
+
+    def publicar(self, **campos):
+        with self._lock_escrita:
+            atual = self._instantaneo
+            self._instantaneo = atual._replace(versao=atual.versao + 1, **campos)
+
+    def publicar_gps(self, fix):
+        self.publicar(gps=fix)
+
+    def idade(self, valor, agora=None):
+        """Segundos desde a aquisicao de um valor do instantaneo (None se nao existe)."""
+        if valor is None:
+            return None
+        return (self.relogio() if agora is None else agora) - valor.tempo
+
+    def gps_recente(self, instantaneo, idade_maxima):
+        """Fix do instantaneo, ou None se nao ha fix ou se tem mais de idade_maxima segundos."""
+        idade = self.idade(instantaneo.gps)
+        if idade is None or idade > idade_maxima:
+            return None
+        return instantaneo.gps
+
+
+def campos_gps(fix):
+    """(lat, lon, alt) de um fix, ou tres None sem fix."""
+    if fix is None:
+        return (None, None, None)
+    return (fix.lat, fix.lon, fix.alt)
@@ -0,0 +1,164 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Estimador de altitude e velocidade (filtro de Kalman) **
+#
+# Estado x = [h, v, a, b]
+#   h  altitude em relacao a rampa (m)
+#   v  velocidade vertical (m/s)
+#   a  aceleracao vertical (m/s^2)
+#   b  diferenca entre a altitude GPS e a altitude barometrica (m);
+#      o GPS mede altitude acima do nivel do mar, o BMP mede em relacao
+#      a pressao de referencia, e b aprende a diferenca
+#
+# Modelo de aceleracao constante com jerk aleatorio (ruido q_jerk) e
+# duas medidas de altitude com ruidos diferentes:
+#   BMP (alta frequencia)  z = h        sigma_baro
+#   GPS (baixa frequencia) z = h + b    sigma_gps
+#
+# EstimadorAltitude e o filtro incremental usado a bordo; filtrar_voo()
+# reprocessa um voo inteiro a partir de arrays numa so chamada. So as
+# matrizes F e Q de todos os passos sao calculadas vetorizadas: a
+# recursao do Kalman depende do passo anterior e continua a ser um ciclo
+# Python por amostra.
+import numpy as np
+
+_H_BARO = np.array([1.0, 0.0, 0.0, 0.0])
+_H_GPS = np.array([1.0, 0.0, 0.0, 1.0])
+
+
+def _transicao(dt):
+    return np.array([
+        [1.0, dt, dt * dt / 2, 0.0],
+        [0.0, 1.0, dt, 0.0],
+        [0.0, 0.0, 1.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ])
+
+
+def _ruido_processo(dt, q_jerk, q_desvio):
+    dt2 = dt * dt
+    dt3 = dt2 * dt
+    dt4 = dt3 * dt
+    dt5 = dt4 * dt
+    return np.array([
+        [dt5 / 20, dt4 / 8, dt3 / 6, 0.0],
+        [dt4 / 8, dt3 / 3, dt2 / 2, 0.0],
+        [dt3 / 6, dt2 / 2, dt, 0.0],
+        [0.0, 0.0, 0.0, 0.0],
+    ]) * q_jerk + np.diag([0.0, 0.0, 0.0, q_desvio * dt])
+
+
+class EstimadorAltitude:
+    def __init__(self, sigma_baro=0.5, sigma_gps=5.0, q_jerk=5.0, q_desvio=1e-3):
+        self.r_baro = sigma_baro ** 2
+        self.r_gps = sigma_gps ** 2
+        self.q_jerk = q_jerk
+        self.q_desvio = q_desvio
+        self.x = np.zeros(4)
+        self.P = np.diag([100.0, 100.0, 100.0, 1e6])
+        self.tempo = None
+
+    @property
+    def altitude(self):
+        return self.x[0]
+
+    @property
+    def velocidade(self):
+        return self.x[1]
+
+    @property
+    def aceleracao(self):
+        return self.x[2]
+
+    @property
+    def desvio_altitude(self):
+        return self.P[0, 0] ** 0.5
+
+    def _prever(self, tempo):
+        if self.tempo is None:
+            self.tempo = tempo
+            return
+        dt = tempo - self.tempo
+        if dt <= 0:
+            return
+        F = _transicao(dt)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + _ruido_processo(dt, self.q_jerk, self.q_desvio)
+        self.tempo = tempo
+
+    def _corrigir(self, H, z, r):
+        PHt = self.P @ H
+        S = H @ PHt + r
+        K = PHt / S
+        self.x = self.x + K * (z - H @ self.x)
+        self.P = self.P - np.outer(K, PHt)
+
+    def atualizar_baro(self, tempo, altitude):
+        primeira = self.tempo is None
+        self._prever(tempo)
+        if primeira:
+            self.x[0] = altitude
+        self._corrigir(_H_BARO, altitude, self.r_baro)
+
+    def atualizar_gps(self, tempo, altitude):
+        self._prever(tempo)
+        self._corrigir(_H_GPS, altitude, self.r_gps)
+
+
+def filtrar_voo(tempos, alt_baro, alt_gps=None, **parametros):
+    """Reprocessa um voo gravado (F e Q vetorizados, predicao/correcao amostra a amostra).
+
+    tempos, alt_baro e alt_gps sao arrays do mesmo tamanho; NaN marca a
+    ausencia de medida. Devolve (estados N x 4, covariancias N x 4 x 4).
+    """
+    tempos = np.asarray(tempos, dtype=float)
+    alt_baro = np.asarray(alt_baro, dtype=float)
+    n = len(tempos)
+    alt_gps = np.full(n, np.nan) if alt_gps is None else np.asarray(alt_gps, dtype=float)
+
+    estimador = EstimadorAltitude(**parametros)
+    r_baro = estimador.r_baro
+    r_gps = estimador.r_gps
+
+    # Matrizes de transicao e de ruido calculadas de uma vez para todos os passos
+    dts = np.diff(tempos, prepend=tempos[0] if n else 0.0)
+    dts[dts < 0] = 0.0
+    F = np.zeros((n, 4, 4))
+    F[:, 0, 0] = F[:, 1, 1] = F[:, 2, 2] = F[:, 3, 3] = 1.0
+    F[:, 0, 1] = F[:, 1, 2] = dts
+    F[:, 0, 2] = dts ** 2 / 2
+    Q = np.zeros((n, 4, 4))
+    coeficientes = (
+        ((0, 0), 5, 20), ((0, 1), 4, 8), ((0, 2), 3, 6),
+        ((1, 1), 3, 3), ((1, 2), 2, 2), ((2, 2), 1, 1),
+    )
+    for (i, j), potencia, divisor in coeficientes:
+        Q[:, i, j] = Q[:, j, i] = estimador.q_jerk * dts ** potencia / divisor
+    Q[:, 3, 3] = estimador.q_desvio * dts
+
+    tem_baro = ~np.isnan(alt_baro)
+    tem_gps = ~np.isnan(alt_gps)
+    estados = np.empty((n, 4))
+    covariancias = np.empty((n, 4, 4))
+
+    x = estimador.x.copy()
+    P = estimador.P.copy()
+    if tem_baro.any():
+        x[0] = alt_baro[np.argmax(tem_baro)]
+    # Recursao sequencial: cada passo precisa do x e do P do anterior
+    for k in range(n):
+        x = F[k] @ x
+        P = F[k] @ P @ F[k].T + Q[k]
+        if tem_baro[k]:
+            PHt = P[:, 0]
+            K = PHt / (PHt[0] + r_baro)
+            x = x + K * (alt_baro[k] - x[0])
+            P = P - np.outer(K, PHt)
+        if tem_gps[k]:
+            PHt = P[:, 0] + P[:, 3]
+            K = PHt / (PHt[0] + PHt[3] + r_gps)
+            x = x + K * (alt_gps[k] - x[0] - x[3])
+            P = P - np.outer(K, PHt)
+        estados[k] = x
+        covariancias[k] = P
+    return estados, covariancias
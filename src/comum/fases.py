@@ -0,0 +1,90 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Maquina de estados das fases de voo ********************
+#
+#   RAMPA -> SUBIDA -> APOGEU -> DESCIDA -> ATERRADO
+#
+# RAMPA -> SUBIDA     altitude acima de altitude_lancamento
+# SUBIDA -> APOGEU    altitude desce margem_apogeu abaixo do maximo
+#                     ou a velocidade vertical fica negativa
+# APOGEU -> DESCIDA   velocidade abaixo de -velocidade_descida
+# -> ATERRADO         (depois do lancamento) variacao na janela longa
+#                     menor que tolerancia_solo
+#
+# A aterragem vem da amplitude de uma janela longa (O(1), ver janela.py).
+# A velocidade vem do estimador de altitude quando e fornecida a
+# atualizar(); senao, do declive de uma janela curta.
+from janela import JanelaDeslizante
+
+RAMPA = "rampa"
+SUBIDA = "subida"
+APOGEU = "apogeu"
+DESCIDA = "descida"
+ATERRADO = "aterrado"
+FASES = (RAMPA, SUBIDA, APOGEU, DESCIDA, ATERRADO)
+
+
+class MaquinaFases:
+    def __init__(self, periodo, altitude_lancamento=30.0, tempo_solo=20.0, tolerancia_solo=1.0,
+                 tempo_velocidade=1.0, margem_apogeu=2.0, velocidade_descida=2.0):
+        self.altitude_lancamento = altitude_lancamento
+        self.tolerancia_solo = tolerancia_solo
+        self.margem_apogeu = margem_apogeu
+        self.velocidade_descida = velocidade_descida
+        self.janela_solo = JanelaDeslizante(max(round(tempo_solo / periodo), 2), periodo)
+        self.janela_velocidade = JanelaDeslizante(max(round(tempo_velocidade / periodo), 2), periodo)
+        self.fase = RAMPA
+        self.altitude_maxima = None
+        self.transicoes = []  # (tempo, fase)
+        self._velocidade = None
+
+    @property
+    def altitude(self):
+        return self.janela_velocidade.ultimo
+
+    @property
+    def velocidade(self):
+        if self._velocidade is not None:
+            return self._velocidade
+        return self.janela_velocidade.declive
+
+    @property
+    def lancado(self):
+        return self.fase != RAMPA
+
+    def retomar(self, fase, altitude_maxima):
+        """Repoe a fase de um ponto de controlo (reinicio a meio do voo)."""
+        self.fase = fase
+        self.altitude_maxima = altitude_maxima
+
+    def atualizar(self, tempo, altitude, velocidade=None):
+        """Acrescenta uma amostra; devolve a nova fase se houve transicao, senao None."""
+        self._velocidade = velocidade
+        self.janela_solo.adicionar(altitude)
+        self.janela_velocidade.adicionar(altitude)
+        if self.lancado:
+            self.altitude_maxima = max(self.altitude_maxima, altitude)
+
+        nova = self._proxima_fase(altitude)
+        if nova is None:
+            return None
+        self.fase = nova
+        self.transicoes.append((tempo, nova))
+        return nova
+
+    def _proxima_fase(self, altitude):
+        if self.fase == RAMPA:
+            if altitude > self.altitude_lancamento:
+                self.altitude_maxima = altitude
+                return SUBIDA
+            return None
+        if self.fase != ATERRADO and self.janela_solo.cheia and self.janela_solo.amplitude < self.tolerancia_solo:
+            return ATERRADO
+        if self.fase == SUBIDA:
+            if altitude < self.altitude_maxima - self.margem_apogeu or (
+                    (self._velocidade is not None or self.janela_velocidade.cheia) and self.velocidade < 0):
+                return APOGEU
+        elif self.fase == APOGEU:
+            if self.velocidade < -self.velocidade_descida:
+                return DESCIDA
+        return None
@@ -0,0 +1,276 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Correcao de erros (Reed-Solomon) sobre as tramas *******
+#
+# Camada opcional por cima das tramas de telemetria.py. Cada trama vai
+# num bloco Reed-Solomon sistematico sobre GF(256) com PARIDADE bytes de
+# paridade, que corrige ate PARIDADE/2 bytes errados por bloco (uma
+# rajada de ate ~25 bits com PARIDADE=8):
+#
+#   sync     2B  0xA5 0x5A
+#   tamanho  3B  bytes da trama sem sync, repetido 3 vezes (maioria bit a bit)
+#   trama        a trama de telemetria.py sem os 2 bytes de sync
+#   paridade     PARIDADE bytes Reed-Solomon sobre a trama
+#
+# O DescodificadorFEC corrige os blocos e devolve as tramas com o sync
+# original, para passarem pelo DescodificadorTramas como antes. Bytes
+# fora de blocos passam sem alteracao, por isso a estacao recebe do
+# mesmo modo um cansat com ou sem FEC.
+from telemetria import SYNC
+
+SYNC_FEC = b"\xA5\x5A"
+PARIDADE = 8
+TAMANHO_MINIMO = 4  # versao + ... + crc de uma trama sem sync
+TAMANHO_MAXIMO = 128
+CABECALHO_FEC = len(SYNC_FEC) + 3
+
+
+class ErroFEC(ValueError):
+    pass
+
+
+# ---------------------------------------------------------- GF(256)
+# Polinomio primitivo x^8 + x^4 + x^3 + x^2 + 1 (0x11d), gerador 2
+
+_EXP = [0] * 512
+_LOG = [0] * 256
+_x = 1
+for _i in range(255):
+    _EXP[_i] = _x
+    _LOG[_x] = _i
+    _x <<= 1
+    if _x & 0x100:
+        _x ^= 0x11D
+for _i in range(255, 512):
+    _EXP[_i] = _EXP[_i - 255]
+
+
+def _mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def _div(a, b):
+    if b == 0:
+        raise ZeroDivisionError()
+    if a == 0:
+        return 0
+    return _EXP[(_LOG[a] + 255 - _LOG[b]) % 255]
+
+
+def _poli_mul(p, q):
+    r = [0] * (len(p) + len(q) - 1)
+    for j, b in enumerate(q):
+        for i, a in enumerate(p):
+            r[i + j] ^= _mul(a, b)
+    return r
+
+
+def _poli_avaliar(p, x):
+    y = p[0]
+    for coeficiente in p[1:]:
+        y = _mul(y, x) ^ coeficiente
+    return y
+
+
+def _gerador(paridade):
+    g = [1]
+    for i in range(paridade):
+        g = _poli_mul(g, [1, _EXP[i]])
+    return g
+
+
+_GERADORES = {}
+
+
+def rs_codificar(mensagem, paridade=PARIDADE):
+    """Devolve os bytes de paridade Reed-Solomon da mensagem."""
+    gerador = _GERADORES.get(paridade)
+    if gerador is None:
+        gerador = _GERADORES[paridade] = _gerador(paridade)
+    resto = list(mensagem) + [0] * paridade
+    for i in range(len(mensagem)):
+        coeficiente = resto[i]
+        if coeficiente:
+            log_c = _LOG[coeficiente]
+            for j in range(1, len(gerador)):
+                if gerador[j]:
+                    resto[i + j] ^= _EXP[log_c + _LOG[gerador[j]]]
+    return bytes(resto[len(mensagem):])
+
+
+def _sindromes(bloco, paridade):
+    return [_poli_avaliar(bloco, _EXP[i]) for i in range(paridade)]
+
+
+def _poli_somar(p, q):
+    """Soma alinhada pelo termo de grau 0 (o ultimo)."""
+    r = [0] * max(len(p), len(q))
+    for i, c in enumerate(p):
+        r[i + len(r) - len(p)] = c
+    for i, c in enumerate(q):
+        r[i + len(r) - len(q)] ^= c
+    return r
+
+
+def _localizador(sindromes):
+    """Berlekamp-Massey: polinomio localizador de erros (grau maior primeiro)."""
+    localizador = [1]
+    anterior = [1]
+    for i, sindrome in enumerate(sindromes):
+        delta = sindrome
+        for j in range(1, min(len(localizador), i + 1)):
+            delta ^= _mul(localizador[-1 - j], sindromes[i - j])
+        anterior = anterior + [0]
+        if delta:
+            if len(anterior) > len(localizador):
+                novo = [_mul(c, delta) for c in anterior]
+                anterior = [_div(c, delta) for c in localizador]
+                localizador = novo
+            localizador = _poli_somar(localizador, [_mul(c, delta) for c in anterior])
+    while localizador and localizador[0] == 0:
+        del localizador[0]
+    return localizador
+
+
+def _magnitudes(sindromes, xs):
+    """Resolve S_j = soma(Y_k * X_k^j), j < len(xs), por eliminacao de Gauss."""
+    n = len(xs)
+    linhas = []
+    for j in range(n):
+        linha = [_EXP[(_LOG[x] * j) % 255] for x in xs]
+        linhas.append(linha + [sindromes[j]])
+    for coluna in range(n):
+        pivo = next((l for l in range(coluna, n) if linhas[l][coluna]), None)
+        if pivo is None:
+            raise ErroFEC("sistema singular")
+        linhas[coluna], linhas[pivo] = linhas[pivo], linhas[coluna]
+        inverso = _div(1, linhas[coluna][coluna])
+        linhas[coluna] = [_mul(c, inverso) for c in linhas[coluna]]
+        for l in range(n):
+            fator = linhas[l][coluna]
+            if l != coluna and fator:
+                linhas[l] = [a ^ _mul(fator, b) for a, b in zip(linhas[l], linhas[coluna])]
+    return [linha[n] for linha in linhas]
+
+
+def rs_corrigir(bloco, paridade=PARIDADE):
+    """Corrige mensagem + paridade. Devolve (mensagem, bytes corrigidos); ErroFEC se nao da."""
+    bloco = list(bloco)
+    if len(bloco) > 255 or len(bloco) <= paridade:
+        raise ErroFEC("tamanho de bloco invalido")
+    sindromes = _sindromes(bloco, paridade)
+    if not any(sindromes):
+        return bytes(bloco[:-paridade]), 0
+
+    localizador = _localizador(sindromes)
+    erros = len(localizador) - 1
+    if erros * 2 > paridade:
+        raise ErroFEC("demasiados erros")
+
+    # Chien: o localizador anula-se em X^-1 para cada posicao errada
+    n = len(bloco)
+    posicoes = [n - 1 - i for i in range(n) if _poli_avaliar(localizador, _EXP[(255 - i) % 255]) == 0]
+    if len(posicoes) != erros:
+        raise ErroFEC("localizador sem raizes suficientes")
+
+    magnitudes = _magnitudes(sindromes, [_EXP[n - 1 - posicao] for posicao in posicoes])
+    for posicao, magnitude in zip(posicoes, magnitudes):
+        bloco[posicao] ^= magnitude
+    if any(_sindromes(bloco, paridade)):
+        raise ErroFEC("correcao falhou")
+    return bytes(bloco[:-paridade]), erros
+
+
+# ---------------------------------------------------------- blocos
+
+class CodificadorFEC:
+    def __init__(self, paridade=PARIDADE):
+        self.paridade = paridade
+        self.sobrecusto = CABECALHO_FEC + paridade - len(SYNC)  # bytes a mais por trama
+
+    def proteger(self, trama):
+        """Trama de telemetria.py -> bloco FEC."""
+        if not trama.startswith(SYNC):
+            raise ValueError("trama sem sync")
+        mensagem = trama[len(SYNC):]
+        if not TAMANHO_MINIMO <= len(mensagem) <= TAMANHO_MAXIMO:
+            raise ValueError(f"trama com {len(mensagem)} bytes fora de {TAMANHO_MINIMO}..{TAMANHO_MAXIMO}")
+        return SYNC_FEC + bytes((len(mensagem),)) * 3 + mensagem + rs_codificar(mensagem, self.paridade)
+
+
+def _maioria(a, b, c):
+    return (a & b) | (a & c) | (b & c)
+
+
+class DescodificadorFEC:
+    """Corrige os blocos FEC de um fluxo de bytes; o resto passa sem alteracao."""
+
+    def __init__(self, paridade=PARIDADE):
+        self.paridade = paridade
+        self.buffer = bytearray()
+        self.blocos = 0
+        self.corrigidos = 0  # blocos com pelo menos um byte corrigido
+        self.bytes_corrigidos = 0
+        self.perdidos = 0  # blocos com erros a mais para corrigir
+        self.tentativas_falhadas = 0  # descodificacoes falhadas (inclui falsos syncs dentro de um bloco perdido)
+        self._posicao = 0  # posicao no fluxo do primeiro byte do buffer
+        self._fim_perdido = 0  # posicao no fluxo do fim do ultimo bloco perdido
+
+    def alimentar(self, dados):
+        self.buffer += dados
+        saida = bytearray()
+        while True:
+            inicio = self.buffer.find(SYNC_FEC)
+            if inicio < 0:
+                # Manter o ultimo byte: pode ser a primeira metade do sync
+                fim = max(len(self.buffer) - 1, 0)
+                saida += self.buffer[:fim]
+                del self.buffer[:fim]
+                self._posicao += fim
+                break
+            saida += self.buffer[:inicio]
+            del self.buffer[:inicio]
+            self._posicao += inicio
+            if len(self.buffer) < CABECALHO_FEC:
+                break
+            tamanho = _maioria(*self.buffer[2:5])
+            if not TAMANHO_MINIMO <= tamanho <= TAMANHO_MAXIMO:
+                saida += self.buffer[:1]
+                del self.buffer[:1]
+                self._posicao += 1
+                continue
+            fim = CABECALHO_FEC + tamanho + self.paridade
+            if len(self.buffer) < fim:
+                break
+            try:
+                mensagem, corrigidos = rs_corrigir(self.buffer[CABECALHO_FEC:fim], self.paridade)
+            except ErroFEC:
+                # Bloco perdido ou falso sync: seguir byte a byte. Os falsos
+                # syncs dentro de um bloco ja perdido nao contam outra vez
+                self.tentativas_falhadas += 1
+                if self._posicao >= self._fim_perdido:
+                    self.perdidos += 1
+                    self._fim_perdido = self._posicao + fim
+                saida += self.buffer[:1]
+                del self.buffer[:1]
+                self._posicao += 1
+                continue
+            del self.buffer[:fim]
+            self._posicao += fim
+            self.blocos += 1
+            if corrigidos:
+                self.corrigidos += 1
+                self.bytes_corrigidos += corrigidos
+            saida += SYNC + mensagem
+        return bytes(saida)
+
+    def estatisticas(self):
+        return {
+            "blocos": self.blocos,
+            "corrigidos": self.corrigidos,
+            "bytes_corrigidos": self.bytes_corrigidos,
+            "perdidos": self.perdidos,
+            "tentativas_falhadas": self.tentativas_falhadas,
+        }
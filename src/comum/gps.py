@@ -0,0 +1,202 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Leitura de NMEA do GPS (Air530) ************************
+#
+# Substitui o "buffer += texto; buffer.split('\r\n'); pynmea2.parse"
+# do iniciar_gps():
+#   - as linhas sao cortadas num bytearray, sem criar strings
+#   - as frases que nao sao GGA/RMC sao ignoradas so pelo tipo, antes
+#     de validar o checksum
+#   - o checksum e um XOR dos bytes feito sobre um inteiro
+#   - GGA e RMC sao lidos campo a campo, sem pynmea2
+#
+# Cada fix publicado leva o tempo monotonic da rececao, a qualidade do
+# fix e o numero de satelites.
+#
+# Para medir o custo num PC ou no Pi, com uma gravacao de NMEA:
+#   python3 gps.py gravacao.nmea
+import time
+from collections import namedtuple
+
+FixGPS = namedtuple("FixGPS", "tempo lat lon alt qualidade satelites velocidade rumo")
+
+TIPOS_USADOS = (b"GGA", b"RMC")
+NOS_PARA_MS = 0.514444
+
+
+def _xor_bytes(dados):
+    # XOR de todos os bytes: dobrar o inteiro ao meio ate sobrar um byte
+    x = int.from_bytes(dados, "little")
+    bytes_restantes = len(dados)
+    while bytes_restantes > 1:
+        metade = (bytes_restantes + 1) // 2
+        x = (x & ((1 << (metade * 8)) - 1)) ^ (x >> (metade * 8))
+        bytes_restantes = metade
+    return x
+
+
+def checksum_valido(linha):
+    """linha: bytes "$....*HH" sem o fim de linha."""
+    asterisco = linha.rfind(b"*")
+    if asterisco < 1 or len(linha) < asterisco + 3:
+        return False
+    try:
+        esperado = int(linha[asterisco + 1:asterisco + 3], 16)
+    except ValueError:
+        return False
+    return _xor_bytes(linha[1:asterisco]) == esperado
+
+
+def _graus(valor, hemisferio):
+    # ddmm.mmmm / dddmm.mmmm -> graus decimais
+    if not valor:
+        return None
+    ponto = valor.find(b".")
+    if ponto < 0:
+        ponto = len(valor)
+    graus = float(valor[:ponto - 2]) + float(valor[ponto - 2:]) / 60
+    if hemisferio in (b"S", b"W"):
+        graus = -graus
+    return graus
+
+
+class EnquadradorLinhas:
+    def __init__(self, tamanho_maximo=512):
+        self.buffer = bytearray()
+        self.tamanho_maximo = tamanho_maximo
+
+    def alimentar(self, dados):
+        self.buffer += dados
+        fim = self.buffer.rfind(b"\n")
+        if fim < 0:
+            if len(self.buffer) > self.tamanho_maximo:
+                # Lixo sem fim de linha (ex.: baud errado): nao crescer sem limite
+                self.buffer.clear()
+            return []
+        linhas = bytes(self.buffer[:fim]).split(b"\n")
+        del self.buffer[:fim + 1]
+        return [linha.rstrip(b"\r") for linha in linhas]
+
+
+class LeitorGPS:
+    def __init__(self, callback, relogio=time.monotonic):
+        self.callback = callback
+        self.relogio = relogio
+        self.enquadrador = EnquadradorLinhas()
+        self.linhas = 0
+        self.ignoradas = 0
+        self.invalidas = 0
+        self.fixes = 0
+        self.erros_callback = 0
+        self._rmc = (None, None)  # (velocidade m/s, rumo) do ultimo RMC valido
+
+    def alimentar(self, dados):
+        agora = self.relogio()
+        for linha in self.enquadrador.alimentar(dados):
+            self.linhas += 1
+            inicio = linha.find(b"$")
+            if inicio < 0 or linha[inicio + 3:inicio + 6] not in TIPOS_USADOS:
+                self.ignoradas += 1
+                continue
+            linha = linha[inicio:]
+            if not checksum_valido(linha):
+                self.invalidas += 1
+                continue
+            campos = linha[:linha.rfind(b"*")].split(b",")
+            try:
+                if campos[0][3:6] == b"GGA":
+                    self._gga(agora, campos)
+                else:
+                    self._rmc_campos(campos)
+            except (ValueError, IndexError):
+                self.invalidas += 1
+
+    def _gga(self, agora, campos):
+        # $xxGGA,hora,lat,N,lon,E,qualidade,satelites,hdop,alt,M,...
+        qualidade = int(campos[6] or 0)
+        if qualidade == 0 or not campos[2] or not campos[4] or not campos[9]:
+            return
+        velocidade, rumo = self._rmc
+        fix = FixGPS(
+            agora,
+            _graus(campos[2], campos[3]),
+            _graus(campos[4], campos[5]),
+            float(campos[9]),
+            qualidade,
+            int(campos[7] or 0),
+            velocidade,
+            rumo,
+        )
+        self.fixes += 1
+        try:
+            self.callback(fix)
+        except Exception as e:
+            # Um erro de quem recebe o fix nao pode parar a thread do GPS
+            self.erros_callback += 1
+            if self.erros_callback == 1:
+                print(f"[GPS] Erro no callback do fix (a continuar a ler): {e!r}")
+
+    def _rmc_campos(self, campos):
+        # $xxRMC,hora,estado,lat,N,lon,E,velocidade(nos),rumo,data,...
+        if campos[2] != b"A":
+            self._rmc = (None, None)
+            return
+        velocidade = float(campos[7]) * NOS_PARA_MS if campos[7] else None
+        rumo = float(campos[8]) if campos[8] else None
+        self._rmc = (velocidade, rumo)
+
+
+def ler_continuamente(ler, leitor, dormir=time.sleep, periodo_rajada=0.05, periodo_espera=0.25):
+    """Ciclo da thread do GPS.
+
+    O Air530 envia uma rajada de frases por segundo. Enquanto chegam
+    bytes le-se com intervalos curtos; sem dados espera-se mais tempo
+    (o buffer do bb_serial do pigpio guarda varios segundos de NMEA).
+    """
+    while True:
+        (count, dados) = ler()
+        if count > 0:
+            leitor.alimentar(dados)
+            dormir(periodo_rajada)
+        else:
+            dormir(periodo_espera)
+
+
+def main():
+    import sys
+    if len(sys.argv) != 2:
+        print("uso: python3 gps.py GRAVACAO.nmea")
+        sys.exit(1)
+    with open(sys.argv[1], "rb") as f:
+        dados = f.read()
+    fixes = []
+    leitor = LeitorGPS(fixes.append)
+    inicio = time.process_time()
+    for i in range(0, len(dados), 256):
+        leitor.alimentar(dados[i:i + 256])
+    cpu = time.process_time() - inicio
+    segundos_nmea = len(dados) / 960  # 9600 baud, 10 bits por byte
+    print(f"[GPS] {leitor.linhas} linhas, {leitor.fixes} fixes, {leitor.ignoradas} ignoradas, "
+          f"{leitor.invalidas} invalidas, {leitor.erros_callback} erros no callback")
+    print(f"[GPS] CPU: {cpu * 1000:.1f} ms para {segundos_nmea:.0f} s de NMEA "
+          f"({cpu / max(segundos_nmea, 1e-9) * 1000:.3f} ms por segundo)")
+    if fixes:
+        print(f"[GPS] Ultimo fix: {fixes[-1]}")
+    try:
+        import pynmea2
+    except ImportError:
+        return
+    inicio = time.process_time()
+    texto = dados.decode("utf-8", errors="ignore")
+    for linha in texto.split("\r\n"):
+        if linha.startswith("$"):
+            try:
+                pynmea2.parse(linha)
+            except Exception:
+                pass
+    cpu_pynmea2 = time.process_time() - inicio
+    print(f"[GPS] pynmea2 (ciclo antigo): {cpu_pynmea2 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
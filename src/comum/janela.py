@@ -0,0 +1,108 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Estatisticas de janela deslizante em O(1) **************
+#
+# Substitui "lista.append; lista = lista[-N:]; max(lista) - min(lista)":
+# cada nova amostra custa O(1) amortizado, sem copiar a janela.
+#
+#   minimo / maximo   deques monotonicos
+#   media / variancia somas acumuladas (desviadas da 1a amostra, para
+#                     reduzir o cancelamento numerico)
+#   declive           regressao linear sobre a posicao na janela, em
+#                     unidades por segundo se for dado o periodo
+from collections import deque
+
+
+class JanelaDeslizante:
+    def __init__(self, tamanho, periodo=1.0):
+        self.tamanho = tamanho
+        self.periodo = periodo
+        self.valores = deque()
+        self._minimos = deque()  # (indice, valor) com valores crescentes
+        self._maximos = deque()  # (indice, valor) com valores decrescentes
+        self._indice = 0  # indice absoluto da proxima amostra
+        self._referencia = None
+        self._soma = 0.0
+        self._soma_quadrados = 0.0
+        self._soma_xy = 0.0  # x = posicao na janela (0 = mais antiga)
+
+    def __len__(self):
+        return len(self.valores)
+
+    @property
+    def cheia(self):
+        return len(self.valores) >= self.tamanho
+
+    def adicionar(self, valor):
+        if self._referencia is None:
+            self._referencia = valor
+        y = valor - self._referencia
+        self._soma_xy += len(self.valores) * y
+        self._soma += y
+        self._soma_quadrados += y * y
+        self.valores.append(valor)
+
+        i = self._indice
+        self._indice += 1
+        while self._minimos and self._minimos[-1][1] >= valor:
+            self._minimos.pop()
+        self._minimos.append((i, valor))
+        while self._maximos and self._maximos[-1][1] <= valor:
+            self._maximos.pop()
+        self._maximos.append((i, valor))
+
+        if len(self.valores) > self.tamanho:
+            y_antigo = self.valores.popleft() - self._referencia
+            self._soma -= y_antigo
+            self._soma_quadrados -= y_antigo * y_antigo
+            # Todas as posicoes recuam uma unidade
+            self._soma_xy -= self._soma
+            inicio = self._indice - self.tamanho
+            if self._minimos[0][0] < inicio:
+                self._minimos.popleft()
+            if self._maximos[0][0] < inicio:
+                self._maximos.popleft()
+
+    def limpar(self):
+        self.__init__(self.tamanho, self.periodo)
+
+    @property
+    def minimo(self):
+        return self._minimos[0][1] if self._minimos else None
+
+    @property
+    def maximo(self):
+        return self._maximos[0][1] if self._maximos else None
+
+    @property
+    def amplitude(self):
+        return self.maximo - self.minimo if self.valores else None
+
+    @property
+    def ultimo(self):
+        return self.valores[-1] if self.valores else None
+
+    @property
+    def media(self):
+        if not self.valores:
+            return None
+        return self._referencia + self._soma / len(self.valores)
+
+    @property
+    def variancia(self):
+        n = len(self.valores)
+        if n < 2:
+            return 0.0
+        media = self._soma / n
+        return max(self._soma_quadrados / n - media * media, 0.0) * n / (n - 1)
+
+    @property
+    def declive(self):
+        """Variacao por segundo estimada por minimos quadrados (0 com menos de 2 amostras)."""
+        n = len(self.valores)
+        if n < 2:
+            return 0.0
+        soma_x = n * (n - 1) / 2
+        soma_xx = (n - 1) * n * (2 * n - 1) / 6
+        denominador = n * soma_xx - soma_x * soma_x
+        return (n * self._soma_xy - soma_x * self._soma) / denominador / self.periodo
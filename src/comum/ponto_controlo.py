@@ -0,0 +1,124 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Ponto de controlo do voo para retomar apos um reinicio *
+#
+# Se o Pi reiniciar a meio do voo (corte de energia), o script arranca
+# de novo. O ponto de controlo guarda o que nao se pode recalcular no ar:
+# fase de voo, pressao de referencia, altitude maxima, contadores de
+# fotografias e de tramas e a posicao do registo de voo.
+#
+# Ficheiro de tamanho fixo com duas posicoes (A/B) de 64 bytes:
+#   seq (uint32) + estado + crc32 (uint32)
+# Cada gravacao escreve por cima da posicao mais antiga (pwrite) e faz
+# fdatasync. O tamanho do ficheiro nunca muda, por isso nao ha escrita de
+# metadados nem rename; se a escrita ficar cortada, o CRC falha e vale a
+# outra posicao. ler() devolve a posicao valida com o seq mais alto.
+import os
+import struct
+import time
+from binascii import crc32
+from collections import namedtuple
+from math import isnan, nan
+
+from fases import FASES, SUBIDA, APOGEU, DESCIDA
+
+EstadoVoo = namedtuple("EstadoVoo", (
+    "tempo",               # time.time() da gravacao
+    "fase",                # uma de fases.FASES
+    "pressao_referencia",  # Pa, None antes de a calibracao terminar
+    "altitude_maxima",     # m, None antes do lancamento
+    "fotos",               # fotografias pedidas
+    "seq_telemetria",      # proxima trama a enviar
+    "registos",            # registos de voo escritos
+    "offset_registo",      # bytes do registo de voo ja em disco
+))
+
+_ESTADO = struct.Struct("<IdBddIIIQ")  # seq + campos de EstadoVoo
+_CRC = struct.Struct("<I")
+TAMANHO_POSICAO = 64
+
+_sincronizar = getattr(os, "fdatasync", os.fsync)
+
+
+def _codificar(seq, estado):
+    fase = FASES.index(estado.fase)
+    dados = _ESTADO.pack(
+        seq, estado.tempo, fase,
+        nan if estado.pressao_referencia is None else estado.pressao_referencia,
+        nan if estado.altitude_maxima is None else estado.altitude_maxima,
+        estado.fotos, estado.seq_telemetria, estado.registos, estado.offset_registo,
+    )
+    dados += _CRC.pack(crc32(dados))
+    return dados.ljust(TAMANHO_POSICAO, b"\x00")
+
+
+def _descodificar(dados):
+    """Devolve (seq, EstadoVoo) ou None se a posicao estiver vazia ou cortada."""
+    if len(dados) < _ESTADO.size + _CRC.size:
+        return None
+    corpo = dados[:_ESTADO.size]
+    (crc,) = _CRC.unpack_from(dados, _ESTADO.size)
+    if crc != crc32(corpo):
+        return None
+    seq, tempo, fase, pressao, altitude, *contadores = _ESTADO.unpack(corpo)
+    if seq == 0 or fase >= len(FASES):
+        return None
+    return seq, EstadoVoo(
+        tempo, FASES[fase],
+        None if isnan(pressao) else pressao,
+        None if isnan(altitude) else altitude,
+        *contadores,
+    )
+
+
+class PontoControlo:
+    def __init__(self, caminho, sincronizar=True):
+        self.caminho = caminho
+        self.sincronizar = sincronizar
+        self.fd = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size < 2 * TAMANHO_POSICAO:
+            os.ftruncate(self.fd, 2 * TAMANHO_POSICAO)
+            _sincronizar(self.fd)
+        ultimo = self._ler_posicoes()
+        self.seq = ultimo[0] if ultimo else 0
+        self.gravacoes = 0
+
+    def _ler_posicoes(self):
+        posicoes = [_descodificar(os.pread(self.fd, TAMANHO_POSICAO, i * TAMANHO_POSICAO)) for i in (0, 1)]
+        validas = [p for p in posicoes if p is not None]
+        return max(validas, key=lambda p: p[0]) if validas else None
+
+    def ler(self):
+        """Ultimo EstadoVoo valido, ou None."""
+        ultimo = self._ler_posicoes()
+        return ultimo[1] if ultimo else None
+
+    def retomar(self, idade_maxima=3600.0, relogio=time.time):
+        """EstadoVoo a retomar: so se foi gravado em voo ha menos de idade_maxima segundos.
+
+        Depois de ATERRADO (ou ainda na RAMPA) um reinicio e um arranque
+        normal. Sem RTC o relogio pode recuar apos o reinicio, por isso a
+        idade conta nos dois sentidos.
+        """
+        estado = self.ler()
+        if estado is None or estado.fase not in (SUBIDA, APOGEU, DESCIDA):
+            return None
+        if abs(relogio() - estado.tempo) > idade_maxima:
+            return None
+        return estado
+
+    def guardar(self, estado):
+        self.seq += 1
+        os.pwrite(self.fd, _codificar(self.seq, estado), (self.seq % 2) * TAMANHO_POSICAO)
+        if self.sincronizar:
+            _sincronizar(self.fd)
+        self.gravacoes += 1
+
+    def fechar(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
@@ -0,0 +1,194 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Registo de voo binario, em blocos e resistente a cortes *
+#
+# Ficheiro:  CABECALHO (8 bytes) seguido de registos
+# Registo:   tamanho (uint16) + crc32 (uint32) + dados
+# Amostra:   timestamp, t, p, h, la, lo, hG como 7 doubles (NaN = sem valor)
+#
+# Os registos ficam num buffer em memoria e so sao escritos (write +
+# fsync) quando o buffer enche um bloco ou quando passa o intervalo de
+# sincronizacao. Se a energia falhar a meio de uma escrita, o ultimo
+# registo pode ficar cortado; recuperar() trunca o ficheiro depois do
+# ultimo registo valido. Um registo danificado a meio do ficheiro (erro
+# no cartao SD) e saltado: a leitura procura o registo valido seguinte
+# (tamanho certo e CRC certo) e os registos depois dele nao se perdem.
+#
+# Utilizacao pos-voo:
+#   python3 registo.py recuperar registo_mati1.bin
+#   python3 registo.py csv registo_mati1.bin > registo_mati1.csv
+import os
+import struct
+import sys
+import time
+from binascii import crc32
+from math import isnan, nan
+
+CABECALHO = b"MATIREG\x01"
+CAMPOS = ("timestamp", "t", "p", "h", "la", "lo", "hG")
+
+_REGISTO = struct.Struct("<HI")
+_AMOSTRA = struct.Struct("<7d")
+
+
+def codificar_amostra(*valores):
+    dados = _AMOSTRA.pack(*(nan if v is None else v for v in valores))
+    return _REGISTO.pack(len(dados), crc32(dados)) + dados
+
+
+def descodificar_amostra(dados):
+    return tuple(None if isnan(v) else v for v in _AMOSTRA.unpack(dados))
+
+
+class RegistoVoo:
+    def __init__(self, caminho, tamanho_bloco=4096, intervalo_sync=1.0, novo=True, relogio=time.monotonic):
+        self.caminho = caminho
+        self.tamanho_bloco = tamanho_bloco
+        self.intervalo_sync = intervalo_sync
+        self.relogio = relogio
+        self.registos = 0  # registos ja sincronizados ou em buffer
+        if novo or not os.path.exists(caminho):
+            self.ficheiro = open(caminho, "wb")
+            self.ficheiro.write(CABECALHO)
+            self._sincronizar_ficheiro()
+        else:
+            self.registos, _ = recuperar(caminho)
+            self.ficheiro = open(caminho, "ab")
+        self.offset = self.ficheiro.tell()  # bytes ja em disco (apos fsync)
+        self.buffer = bytearray()
+        self.ultimo_sync = self.relogio()
+        self.sincronizacoes = 0
+
+    def escrever(self, *valores):
+        self.buffer += codificar_amostra(*valores)
+        self.registos += 1
+        if len(self.buffer) >= self.tamanho_bloco or self.relogio() - self.ultimo_sync >= self.intervalo_sync:
+            self.sincronizar()
+
+    def sincronizar(self):
+        if self.buffer:
+            self.ficheiro.write(self.buffer)
+            self.offset += len(self.buffer)
+            self.buffer.clear()
+            self._sincronizar_ficheiro()
+            self.sincronizacoes += 1
+        self.ultimo_sync = self.relogio()
+
+    def _sincronizar_ficheiro(self):
+        self.ficheiro.flush()
+        os.fsync(self.ficheiro.fileno())
+
+    def fechar(self):
+        self.sincronizar()
+        self.ficheiro.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+_MARCA_TAMANHO = struct.pack("<H", _AMOSTRA.size)
+
+
+def _registo_valido(dados, pos):
+    """Fim do registo que comeca em pos, ou None se nao e um registo valido."""
+    if pos + _REGISTO.size > len(dados):
+        return None
+    tamanho, crc = _REGISTO.unpack_from(dados, pos)
+    fim = pos + _REGISTO.size + tamanho
+    if tamanho != _AMOSTRA.size or fim > len(dados) or crc32(dados[pos + _REGISTO.size:fim]) != crc:
+        return None
+    return fim
+
+
+def _percorrer(dados):
+    """Gera (fim_do_registo, amostra) de cada registo valido.
+
+    Num registo invalido, procura o proximo offset com o tamanho e o CRC
+    certos e continua dai; so a cauda sem nenhum registo valido fica de fora.
+    """
+    pos = len(CABECALHO)
+    while pos + _REGISTO.size <= len(dados):
+        fim = _registo_valido(dados, pos)
+        if fim is None:
+            pos = dados.find(_MARCA_TAMANHO, pos + 1)
+            if pos < 0:
+                return
+            continue
+        yield fim, descodificar_amostra(bytes(dados[pos + _REGISTO.size:fim]))
+        pos = fim
+
+
+def ler_registo(caminho):
+    """Devolve a lista de amostras validas do ficheiro."""
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    if not dados.startswith(CABECALHO):
+        raise ValueError(f"{caminho} nao e um registo de voo")
+    return [amostra for _, amostra in _percorrer(dados)]
+
+
+def recuperar(caminho):
+    """Trunca a cauda danificada (depois do ultimo registo valido).
+
+    Registos danificados a meio ficam no ficheiro e sao saltados na
+    leitura. Devolve (registos validos, bytes cortados).
+    """
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    if not dados.startswith(CABECALHO):
+        raise ValueError(f"{caminho} nao e um registo de voo")
+    validos = 0
+    fim_valido = len(CABECALHO)
+    for fim, _ in _percorrer(dados):
+        validos += 1
+        fim_valido = fim
+    cortados = len(dados) - fim_valido
+    if cortados:
+        with open(caminho, "r+b") as f:
+            f.truncate(fim_valido)
+            f.flush()
+            os.fsync(f.fileno())
+    return validos, cortados
+
+
+def guardar_anterior(caminho):
+    """Guarda o registo de um arranque anterior como caminho.anterior.N (primeiro N livre).
+
+    Nunca substitui uma copia ja guardada: reinicios repetidos depois da
+    aterragem nao podem apagar o registo do voo. Um registo sem nenhuma
+    amostra (so o cabecalho) e apagado. Devolve o novo caminho ou None.
+    """
+    if not os.path.exists(caminho):
+        return None
+    if os.path.getsize(caminho) <= len(CABECALHO):
+        os.remove(caminho)
+        return None
+    n = 1
+    while os.path.exists(f"{caminho}.anterior.{n}"):
+        n += 1
+    destino = f"{caminho}.anterior.{n}"
+    os.replace(caminho, destino)
+    return destino
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] not in ("recuperar", "csv"):
+        print("uso: python3 registo.py recuperar|csv FICHEIRO")
+        sys.exit(1)
+    caminho = sys.argv[2]
+    if sys.argv[1] == "recuperar":
+        validos, cortados = recuperar(caminho)
+        print(f"[REGISTO] {validos} registos validos, {cortados} bytes cortados")
+    else:
+        from csv import writer
+        writer_csv = writer(sys.stdout)
+        writer_csv.writerow(CAMPOS)
+        for amostra in ler_registo(caminho):
+            writer_csv.writerow(["" if v is None else v for v in amostra])
+
+
+if __name__ == "__main__":
+    main()
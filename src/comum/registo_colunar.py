@@ -0,0 +1,264 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Registo colunar para analise pos-voo *******************
+#
+# Ficheiro .col (little-endian, so acrescentado no fim):
+#
+#   CABECALHO "MATICOL1"
+#   pedaco:  "PDCO" + n linhas (uint32)
+#            para cada campo de CAMPOS, n valores do seu tipo,
+#            com enchimento ate multiplo de 8 bytes
+#   pedaco ...
+#
+# Indice (ficheiro.col.idx): por pedaco, offset (uint64) + n (uint64).
+# Se o indice faltar ou estiver desatualizado, e reconstruido a partir
+# dos cabecalhos dos pedacos.
+#
+# O LeitorColunar mapeia o ficheiro em memoria e devolve arrays NumPy que
+# apontam diretamente para o mapa (sem copias).
+#
+# Conversao dos registos existentes:
+#   python3 registo_colunar.py converter registo_mati1.csv registo_mati1.col
+#   python3 registo_colunar.py converter registo_ground_station_X.csv gs.col
+#   python3 registo_colunar.py converter registo_mati1.bin registo_mati1.col
+#   python3 registo_colunar.py info registo_mati1.col
+import os
+import struct
+import sys
+import time
+from array import array
+from csv import reader
+from math import nan
+
+import numpy as np
+
+CABECALHO = b"MATICOL1"
+MARCA_PEDACO = b"PDCO"
+CAMPOS = (
+    ("timestamp", "d"),
+    ("t", "f"),
+    ("p", "f"),
+    ("h", "f"),
+    ("la", "d"),
+    ("lo", "d"),
+    ("hG", "f"),
+)
+NOMES = tuple(nome for nome, _ in CAMPOS)
+_TIPOS_NUMPY = {"d": "<f8", "f": "<f4"}
+_PEDACO = struct.Struct("<4sI")
+_INDICE = struct.Struct("<QQ")
+
+
+def _enchimento(tamanho):
+    return -tamanho % 8
+
+
+class EscritorColunar:
+    """Acumula linhas e escreve-as em pedacos de tamanho_pedaco linhas.
+
+    Por omissao o ficheiro (e o indice) e criado de novo, apagando o que
+    existia; continuar=True acrescenta pedacos a um registo existente.
+    """
+
+    def __init__(self, caminho, tamanho_pedaco=4096, continuar=False):
+        self.caminho = caminho
+        self.tamanho_pedaco = tamanho_pedaco
+        self.colunas = [array(tipo) for _, tipo in CAMPOS]
+        novo = not continuar or not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        modo = "wb" if novo else "ab"
+        self.ficheiro = open(caminho, modo)
+        if novo:
+            self.ficheiro.write(CABECALHO)
+        self.indice = open(caminho + ".idx", modo)
+
+    def escrever(self, *valores):
+        for coluna, valor in zip(self.colunas, valores):
+            coluna.append(nan if valor is None else valor)
+        if len(self.colunas[0]) >= self.tamanho_pedaco:
+            self.despejar()
+
+    def escrever_colunas(self, colunas):
+        """Escreve um pedaco com colunas inteiras (sequencias da mesma dimensao)."""
+        self.despejar()
+        for coluna, valores in zip(self.colunas, colunas):
+            coluna.extend(nan if v is None else v for v in valores)
+        self.despejar()
+
+    def despejar(self):
+        n = len(self.colunas[0])
+        if n == 0:
+            return
+        offset = self.ficheiro.seek(0, os.SEEK_END)
+        partes = [_PEDACO.pack(MARCA_PEDACO, n), bytes(_enchimento(_PEDACO.size))]
+        for coluna in self.colunas:
+            if sys.byteorder != "little":
+                coluna.byteswap()
+            dados = coluna.tobytes()
+            partes.append(dados)
+            partes.append(bytes(_enchimento(len(dados))))
+        self.ficheiro.write(b"".join(partes))
+        self.ficheiro.flush()
+        self.indice.write(_INDICE.pack(offset, n))
+        self.indice.flush()
+        self.colunas = [array(tipo) for _, tipo in CAMPOS]
+
+    def fechar(self):
+        self.despejar()
+        self.ficheiro.close()
+        self.indice.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.fechar()
+
+
+def _tamanho_pedaco(n):
+    tamanho = _PEDACO.size + _enchimento(_PEDACO.size)
+    for _, tipo in CAMPOS:
+        dados = n * np.dtype(_TIPOS_NUMPY[tipo]).itemsize
+        tamanho += dados + _enchimento(dados)
+    return tamanho
+
+
+class LeitorColunar:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.mapa = np.memmap(caminho, dtype=np.uint8, mode="r")
+        if bytes(self.mapa[:len(CABECALHO)]) != CABECALHO:
+            raise ValueError(f"{caminho} nao e um registo colunar")
+        self.pedacos = self._ler_indice()
+        if self.pedacos is None:
+            self.pedacos = self._reconstruir_indice()
+
+    def _pedaco_valido(self, offset, n):
+        if offset + _tamanho_pedaco(n) > len(self.mapa):
+            return False
+        marca, contagem = _PEDACO.unpack(bytes(self.mapa[offset:offset + _PEDACO.size]))
+        return marca == MARCA_PEDACO and contagem == n
+
+    def _ler_indice(self):
+        try:
+            with open(self.caminho + ".idx", "rb") as f:
+                dados = f.read()
+        except OSError:
+            return None
+        pedacos = [
+            _INDICE.unpack_from(dados, i)
+            for i in range(0, len(dados) - len(dados) % _INDICE.size, _INDICE.size)
+        ]
+        if not all(self._pedaco_valido(offset, n) for offset, n in pedacos):
+            return None
+        # Indice atrasado em relacao ao ficheiro: nao confiar nele
+        fim = pedacos[-1][0] + _tamanho_pedaco(pedacos[-1][1]) if pedacos else len(CABECALHO)
+        if fim != len(self.mapa):
+            return None
+        return pedacos
+
+    def _reconstruir_indice(self):
+        pedacos = []
+        offset = len(CABECALHO)
+        while offset + _PEDACO.size <= len(self.mapa):
+            marca, n = _PEDACO.unpack(bytes(self.mapa[offset:offset + _PEDACO.size]))
+            if marca != MARCA_PEDACO or not self._pedaco_valido(offset, n):
+                break  # pedaco incompleto no fim do ficheiro
+            pedacos.append((offset, n))
+            offset += _tamanho_pedaco(n)
+        return pedacos
+
+    def __len__(self):
+        return sum(n for _, n in self.pedacos)
+
+    def pedacos_coluna(self, nome):
+        """Lista de arrays (um por pedaco) que apontam para o ficheiro mapeado."""
+        indice_campo = NOMES.index(nome)
+        vistas = []
+        for offset, n in self.pedacos:
+            pos = offset + _PEDACO.size + _enchimento(_PEDACO.size)
+            for i, (_, tipo) in enumerate(CAMPOS):
+                dtype = np.dtype(_TIPOS_NUMPY[tipo])
+                if i == indice_campo:
+                    vistas.append(np.frombuffer(self.mapa, dtype=dtype, count=n, offset=pos))
+                    break
+                dados = n * dtype.itemsize
+                pos += dados + _enchimento(dados)
+        return vistas
+
+    def coluna(self, nome):
+        """Coluna inteira; sem copia quando o ficheiro tem um so pedaco."""
+        vistas = self.pedacos_coluna(nome)
+        if len(vistas) == 1:
+            return vistas[0]
+        if not vistas:
+            return np.empty(0, dtype=_TIPOS_NUMPY[dict(CAMPOS)[nome]])
+        return np.concatenate(vistas)
+
+    def colunas(self):
+        return {nome: self.coluna(nome) for nome in NOMES}
+
+
+def _numero(texto):
+    texto = texto.strip()
+    if texto in ("", "None", "null", "nan"):
+        return nan
+    return float(texto)
+
+
+def _timestamp(texto):
+    texto = texto.strip()
+    try:
+        return time.mktime(time.strptime(texto, "%Y%m%d_%H%M%S"))
+    except ValueError:
+        return _numero(texto)
+
+
+def ler_csv(caminho):
+    """Le um CSV do mati1 (timestamp,t,p,h,la,lo,hG) ou da ground station."""
+    with open(caminho, newline="") as f:
+        linhas = reader(f)
+        cabecalho = next(linhas)
+        if cabecalho[0] == "tempo (min)":
+            # tempo (min),timestamp,temperatura,pressao,alt_bmp,alt_gps,latitude,longitude
+            ordem = (1, 2, 3, 4, 6, 7, 5)
+        else:
+            ordem = (0, 1, 2, 3, 4, 5, 6)
+        for linha in linhas:
+            if len(linha) < len(ordem):
+                continue
+            yield (_timestamp(linha[ordem[0]]),) + tuple(_numero(linha[i]) for i in ordem[1:])
+
+
+def converter(entrada, saida):
+    if entrada.endswith(".bin"):
+        from registo import ler_registo
+        linhas = ler_registo(entrada)
+    else:
+        linhas = list(ler_csv(entrada))
+    # Um unico pedaco: a leitura posterior fica sem copias
+    with EscritorColunar(saida, tamanho_pedaco=max(len(linhas), 1)) as escritor:
+        escritor.escrever_colunas(list(zip(*linhas)) if linhas else [[] for _ in CAMPOS])
+    return len(linhas)
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "converter":
+        n = converter(sys.argv[2], sys.argv[3])
+        print(f"[REGISTO] {n} linhas convertidas para {sys.argv[3]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "info":
+        inicio = time.perf_counter()
+        leitor = LeitorColunar(sys.argv[2])
+        colunas = leitor.colunas()
+        duracao = time.perf_counter() - inicio
+        print(f"[REGISTO] {len(leitor)} linhas em {len(leitor.pedacos)} pedacos, carregado em {duracao * 1000:.1f} ms")
+        for nome, valores in colunas.items():
+            if len(valores):
+                print(f"  {nome:>9}: min={np.nanmin(valores):.6g} max={np.nanmax(valores):.6g}")
+    else:
+        print("uso: python3 registo_colunar.py converter ENTRADA(.csv|.bin) SAIDA.col")
+        print("     python3 registo_colunar.py info FICHEIRO.col")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
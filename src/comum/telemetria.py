@@ -0,0 +1,389 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Trama binaria de telemetria (cansat -> ground station) *
+#
+# Formato v1 (little-endian, 36 bytes):
+#
+#   sync    2B  0xAA 0x55
+#   versao  1B  VERSAO_TRAMA
+#   n       2B  numero de sequencia (uint16, da a volta)
+#   seg     4B  tempo unix em segundos (uint32)
+#   ms      2B  milissegundos (uint16)
+#   t       2B  temperatura em centesimos de grau (int16)
+#   p       4B  pressao em decimos de Pa (uint32)
+#   h       4B  altitude BMP em cm (int32)
+#   la      4B  latitude em 1e-7 graus (int32)
+#   lo      4B  longitude em 1e-7 graus (int32)
+#   hG      4B  altitude GPS em cm (int32)
+#   flags   1B  bit 0 = GPS com fix
+#   crc     2B  CRC-16/CCITT de versao..flags
+#
+# O JSON antigo gastava ~110 bytes por amostra; a 9600 baud (~960 B/s)
+# esta trama permite 5-10 Hz com folga.
+#
+# Formato v2 (multicanal, tamanho variavel): so leva os canais que o
+# escalonador de telemetria escolheu (ver telemetria_adaptativa.py).
+#
+#   sync    2B  0xAA 0x55
+#   versao  1B  VERSAO_MULTICANAL
+#   n       2B  numero de sequencia
+#   seg/ms  6B  como na v1
+#   mascara 1B  bit i = canal CANAIS[i] presente
+#   canais      valores dos canais presentes, pela ordem de CANAIS
+#   crc     2B  CRC-16/CCITT de versao..canais
+#
+# O descodificador guarda o ultimo valor de cada canal, por isso cada
+# trama v2 e devolvida como um dicionario completo (com "canais" = os
+# canais que vieram nesta trama).
+#
+# Formato v3 (delta): os valores inteiros dos canais (e o tempo em ms)
+# vao como diferenca para a ultima trama chave, em zigzag + varint
+# (1 byte ate +-63, 2 bytes ate +-8191, ...). A trama chave e uma v2 com
+# todos os canais, enviada a cada periodo_chave segundos. Como cada delta
+# depende so da chave e nao da trama anterior, perder uma delta nao
+# afeta as seguintes; perder a chave so afeta ate a chave seguinte.
+#
+#   sync    2B  0xAA 0x55
+#   versao  1B  VERSAO_DELTA
+#   tamanho 1B  bytes de n..deltas
+#   n       2B  numero de sequencia
+#   chave   1B  n & 0xFF da trama chave de referencia
+#   mascara 1B  como na v2
+#   deltas      varint(zigzag(ms - ms_chave)), depois um varint por valor
+#   crc     2B  CRC-16/CCITT de versao..deltas
+import struct
+from binascii import crc_hqx
+from time import strftime, localtime
+
+from fases import FASES
+
+SYNC = b"\xAA\x55"
+VERSAO_TRAMA = 1
+VERSAO_MULTICANAL = 2
+VERSAO_DELTA = 3
+FLAG_GPS = 0x01
+SEM_FIX = -0x80000000  # la/lo/hG no canal gps quando nao ha fix
+
+_CORPO = struct.Struct("<BHIHhIiiiiB")
+_CRC = struct.Struct("<H")
+TAMANHO_TRAMA = len(SYNC) + _CORPO.size + _CRC.size
+
+# Canais da trama v2: (nome, formato, (campo, escala) por valor)
+CANAIS = (
+    ("t", struct.Struct("<h"), (("t", 100),)),
+    ("p", struct.Struct("<I"), (("p", 10),)),
+    ("h", struct.Struct("<i"), (("h", 100),)),
+    ("v", struct.Struct("<h"), (("v", 100),)),
+    ("gps", struct.Struct("<iii"), (("la", 1e7), ("lo", 1e7), ("hG", 100))),
+    ("fase", struct.Struct("<B"), (("f", 1),)),
+)
+TAMANHO_CANAL = {nome: formato.size for nome, formato, _ in CANAIS}
+_CABECALHO_MC = struct.Struct("<BHIHB")
+CUSTO_TRAMA_MULTICANAL = len(SYNC) + _CABECALHO_MC.size + _CRC.size
+_CABECALHO_DELTA = struct.Struct("<BBHBB")
+
+
+def _inteiro(valor, escala):
+    return int(round(valor * escala))
+
+
+def codificar_trama(seq, tempo, temperatura, pressao, altitude, lat=None, lon=None, alt_gps=None):
+    flags = 0
+    if lat is not None and lon is not None and alt_gps is not None:
+        flags |= FLAG_GPS
+    else:
+        lat = lon = alt_gps = 0.0
+    segundos = int(tempo)
+    corpo = _CORPO.pack(
+        VERSAO_TRAMA,
+        seq & 0xFFFF,
+        segundos,
+        int((tempo - segundos) * 1000),
+        _inteiro(temperatura, 100),
+        _inteiro(pressao, 10),
+        _inteiro(altitude, 100),
+        _inteiro(lat, 1e7),
+        _inteiro(lon, 1e7),
+        _inteiro(alt_gps, 100),
+        flags,
+    )
+    return SYNC + corpo + _CRC.pack(crc_hqx(corpo, 0xFFFF))
+
+
+def _inteiros_canal(nome, valor, campos):
+    """Valor de um canal -> inteiros escalados (gps e (la, lo, hG) ou None, fase e um nome)."""
+    if nome == "fase":
+        return (FASES.index(valor),)
+    if nome == "gps":
+        if valor is None:
+            return (SEM_FIX,) * 3
+        return tuple(_inteiro(v, escala) for v, (_, escala) in zip(valor, campos))
+    return (_inteiro(valor, campos[0][1]),)
+
+
+def _campos_canal(nome, inteiros, campos):
+    """Inteiros escalados de um canal -> {campo: valor}."""
+    if nome == "fase":
+        return {"f": FASES[inteiros[0]] if 0 <= inteiros[0] < len(FASES) else None}
+    if nome == "gps" and inteiros[0] == SEM_FIX:
+        return {"la": None, "lo": None, "hG": None}
+    return {campo: inteiro / escala for inteiro, (campo, escala) in zip(inteiros, campos)}
+
+
+def _tempo_ms(tempo):
+    segundos = int(tempo)
+    return segundos * 1000 + int((tempo - segundos) * 1000)
+
+
+def codificar_trama_multicanal(seq, tempo, valores):
+    """valores: canal -> valor; gps e (la, lo, hG) ou None, fase e um nome de fases.FASES."""
+    segundos = int(tempo)
+    mascara = 0
+    partes = []
+    for i, (nome, formato, campos) in enumerate(CANAIS):
+        if nome not in valores:
+            continue
+        mascara |= 1 << i
+        partes.append(formato.pack(*_inteiros_canal(nome, valores[nome], campos)))
+    corpo = _CABECALHO_MC.pack(VERSAO_MULTICANAL, seq & 0xFFFF, segundos, int((tempo - segundos) * 1000), mascara)
+    corpo += b"".join(partes)
+    return SYNC + corpo + _CRC.pack(crc_hqx(corpo, 0xFFFF))
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def _dezigzag(z):
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+
+def _escrever_varint(n, saida):
+    while n >= 0x80:
+        saida.append((n & 0x7F) | 0x80)
+        n >>= 7
+    saida.append(n)
+
+
+def _ler_varint(dados, pos):
+    n = 0
+    deslocamento = 0
+    while True:
+        if pos >= len(dados) or deslocamento > 63:
+            raise ValueError("varint cortado")
+        byte = dados[pos]
+        pos += 1
+        n |= (byte & 0x7F) << deslocamento
+        if not byte & 0x80:
+            return n, pos
+        deslocamento += 7
+
+
+class CompressorTelemetria:
+    """Codifica tramas delta (v3) contra a ultima trama chave (v2 com todos os canais)."""
+
+    def __init__(self, periodo_chave=5.0):
+        self.periodo_chave = periodo_chave
+        self.chave = None  # (n & 0xFF, ms, {canal: inteiros})
+        self.tempo_chave = None
+        self.chaves = 0
+        self.deltas = 0
+
+    def precisa_chave(self, tempo, canais=()):
+        if self.chave is None or tempo - self.tempo_chave >= self.periodo_chave:
+            return True
+        return any(canal not in self.chave[2] for canal in canais)
+
+    def codificar(self, seq, tempo, valores, todos=None):
+        """Devolve (trama, valores enviados). Uma trama chave leva todos (ou so valores)."""
+        if self.precisa_chave(tempo, valores):
+            valores = dict(todos if todos is not None else valores)
+            inteiros = {nome: _inteiros_canal(nome, valores[nome], campos)
+                        for nome, _, campos in CANAIS if nome in valores}
+            self.chave = (seq & 0xFF, _tempo_ms(tempo), inteiros)
+            self.tempo_chave = tempo
+            self.chaves += 1
+            return codificar_trama_multicanal(seq, tempo, valores), valores
+
+        referencia, ms_chave, inteiros_chave = self.chave
+        mascara = 0
+        deltas = bytearray()
+        _escrever_varint(_zigzag(_tempo_ms(tempo) - ms_chave), deltas)
+        for i, (nome, _, campos) in enumerate(CANAIS):
+            if nome not in valores:
+                continue
+            mascara |= 1 << i
+            for inteiro, base in zip(_inteiros_canal(nome, valores[nome], campos), inteiros_chave[nome]):
+                _escrever_varint(_zigzag(inteiro - base), deltas)
+        tamanho = _CABECALHO_DELTA.size - 2 + len(deltas)
+        corpo = _CABECALHO_DELTA.pack(VERSAO_DELTA, tamanho, seq & 0xFFFF, referencia, mascara) + deltas
+        self.deltas += 1
+        return SYNC + corpo + _CRC.pack(crc_hqx(corpo, 0xFFFF)), dict(valores)
+
+
+def descodificar_delta(corpo, chaves):
+    """Devolve (n, ts, {campo: valor}, canais, inteiros por canal).
+
+    chaves: n & 0xFF -> (ms, {canal: inteiros}) das tramas chave recebidas.
+    KeyError se a chave de referencia nao foi recebida.
+    """
+    _, _, seq, referencia, mascara = _CABECALHO_DELTA.unpack_from(corpo)
+    ms_chave, inteiros_chave = chaves[referencia]
+    delta_ms, pos = _ler_varint(corpo, _CABECALHO_DELTA.size)
+    campos_trama = {}
+    canais = []
+    for i, (nome, formato, campos) in enumerate(CANAIS):
+        if not mascara & (1 << i):
+            continue
+        inteiros = []
+        for base in inteiros_chave[nome]:
+            delta, pos = _ler_varint(corpo, pos)
+            inteiros.append(base + _dezigzag(delta))
+        canais.append(nome)
+        campos_trama.update(_campos_canal(nome, inteiros, campos))
+    if pos != len(corpo):
+        raise ValueError("tamanho da trama delta inconsistente")
+    return seq, (ms_chave + _dezigzag(delta_ms)) / 1000, campos_trama, tuple(canais)
+
+
+def _tamanho_canais(mascara):
+    """Bytes dos canais presentes na mascara, ou None se tiver bits desconhecidos."""
+    if mascara >> len(CANAIS):
+        return None
+    return sum(formato.size for i, (_, formato, _) in enumerate(CANAIS) if mascara & (1 << i))
+
+
+def descodificar_multicanal(corpo, chaves=None):
+    """Devolve (n, ts, {campo: valor}, canais) de um corpo v2 ja validado.
+
+    Se for dado o dicionario chaves, a trama fica guardada como referencia
+    para as tramas delta (v3).
+    """
+    _, seq, segundos, ms, mascara = _CABECALHO_MC.unpack_from(corpo)
+    pos = _CABECALHO_MC.size
+    campos_trama = {}
+    canais = []
+    inteiros_trama = {}
+    for i, (nome, formato, campos) in enumerate(CANAIS):
+        if not mascara & (1 << i):
+            continue
+        inteiros = formato.unpack_from(corpo, pos)
+        pos += formato.size
+        canais.append(nome)
+        inteiros_trama[nome] = inteiros
+        campos_trama.update(_campos_canal(nome, inteiros, campos))
+    if chaves is not None:
+        chaves.pop(seq & 0xFF, None)  # a mais recente fica no fim
+        chaves[seq & 0xFF] = (segundos * 1000 + ms, inteiros_trama)
+    return seq, segundos + ms / 1000, campos_trama, tuple(canais)
+
+
+def descodificar_corpo(corpo):
+    (_, seq, segundos, ms, t, p, h, la, lo, hg, flags) = _CORPO.unpack(corpo)
+    tempo = segundos + ms / 1000
+    gps = bool(flags & FLAG_GPS)
+    return {
+        "n": seq,
+        "ts": tempo,
+        "d": strftime("%Y%m%d_%H%M%S", localtime(segundos)),
+        "t": t / 100,
+        "p": p / 10,
+        "h": h / 100,
+        "la": la / 1e7 if gps else None,
+        "lo": lo / 1e7 if gps else None,
+        "hG": hg / 100 if gps else None,
+    }
+
+
+class DescodificadorTramas:
+    """Extrai tramas de um fluxo de bytes e ressincroniza apos bytes corrompidos."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.ultimos = dict.fromkeys(("t", "p", "h", "v", "la", "lo", "hG", "f"))
+        self.chaves = {}  # tramas v2 recebidas, referencia das tramas delta
+        self.sem_chave = 0  # tramas delta descartadas por falta da trama chave
+        self.tramas_ok = 0
+        self.erros_crc = 0
+        self.bytes_descartados = 0
+        self.tramas_perdidas = 0
+        self._ultimo_seq = None
+
+    def alimentar(self, dados):
+        self.buffer += dados
+        tramas = []
+        while True:
+            inicio = self.buffer.find(SYNC)
+            if inicio < 0:
+                # Manter o ultimo byte: pode ser a primeira metade do sync
+                descartar = max(len(self.buffer) - 1, 0)
+                self.bytes_descartados += descartar
+                del self.buffer[:descartar]
+                break
+            if inicio > 0:
+                self.bytes_descartados += inicio
+                del self.buffer[:inicio]
+            tamanho = self._tamanho_trama()
+            if tamanho == 0:
+                break  # ainda faltam bytes do cabecalho
+            if tamanho is not None:
+                if len(self.buffer) < tamanho:
+                    break
+                fim_corpo = tamanho - _CRC.size
+                corpo = bytes(self.buffer[2:fim_corpo])
+                (crc,) = _CRC.unpack_from(self.buffer, fim_corpo)
+            if tamanho is None or crc_hqx(corpo, 0xFFFF) != crc:
+                # Falso sync ou trama danificada: saltar um byte e procurar de novo
+                self.erros_crc += 1
+                self.bytes_descartados += 1
+                del self.buffer[:1]
+                continue
+            del self.buffer[:tamanho]
+            if corpo[0] == VERSAO_TRAMA:
+                dados_trama = descodificar_corpo(corpo)
+                self.ultimos.update((c, dados_trama[c]) for c in ("t", "p", "h", "la", "lo", "hG"))
+            else:
+                if corpo[0] == VERSAO_MULTICANAL:
+                    seq, tempo, campos, canais = descodificar_multicanal(corpo, self.chaves)
+                    while len(self.chaves) > 4:
+                        del self.chaves[next(iter(self.chaves))]
+                else:
+                    try:
+                        seq, tempo, campos, canais = descodificar_delta(corpo, self.chaves)
+                    except (KeyError, ValueError):
+                        self.sem_chave += 1
+                        continue
+                self.ultimos.update(campos)
+                dados_trama = {"n": seq, "ts": tempo, "d": strftime("%Y%m%d_%H%M%S", localtime(int(tempo))),
+                               **self.ultimos, "canais": canais}
+            self._contar_perdidas(dados_trama["n"])
+            self.tramas_ok += 1
+            tramas.append(dados_trama)
+        return tramas
+
+    def _tamanho_trama(self):
+        """Tamanho da trama no inicio do buffer; 0 se ainda nao se sabe, None se invalida."""
+        if len(self.buffer) < 3:
+            return 0
+        versao = self.buffer[2]
+        if versao == VERSAO_TRAMA:
+            return TAMANHO_TRAMA
+        if versao == VERSAO_DELTA:
+            if len(self.buffer) < 4:
+                return 0
+            if self.buffer[3] < _CABECALHO_DELTA.size - 2 + 1:
+                return None
+            return len(SYNC) + 2 + self.buffer[3] + _CRC.size
+        if versao != VERSAO_MULTICANAL:
+            return None
+        if len(self.buffer) < len(SYNC) + _CABECALHO_MC.size:
+            return 0
+        canais = _tamanho_canais(self.buffer[len(SYNC) + _CABECALHO_MC.size - 1])
+        if canais is None:
+            return None
+        return CUSTO_TRAMA_MULTICANAL + canais
+
+    def _contar_perdidas(self, seq):
+        if self._ultimo_seq is not None:
+            self.tramas_perdidas += (seq - self._ultimo_seq - 1) & 0xFFFF
+        self._ultimo_seq = seq
@@ -0,0 +1,194 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Escalonador de telemetria multicanal e adaptativo ******
+#
+# Em vez de enviar todos os campos a cada segundo, cada canal (ver
+# telemetria.CANAIS) tem:
+#
+#   prioridade    ordem na fila quando o orcamento nao chega para todos
+#   periodo_min   nao e enviado mais do que uma vez por periodo_min
+#   periodo_max   e reenviado pelo menos uma vez por periodo_max
+#   limiar        variacao minima desde o ultimo envio para contar como
+#                 mudanca (um numero, ou um por componente no gps)
+#   periodo_voo   periodo_min durante SUBIDA/APOGEU/DESCIDA
+#
+# Um canal fica devido quando muda (e ja passou periodo_min) ou quando
+# passa periodo_max. Um valor None (gps sem fix, enviado como SEM_FIX)
+# so e enviado quando aparece, sem reenvios por periodo_max.
+#
+# A cada oportunidade de envio, os canais devidos entram numa fila de
+# prioridade e vao para a trama enquanto houver creditos (balde de
+# tokens a orcamento bytes/s). O que nao coube fica para a proxima
+# trama, e o atraso conta como latencia do canal.
+#
+# Com um telemetria.CompressorTelemetria, as tramas vao em delta (v3) e,
+# a cada periodo_chave, numa trama chave com todos os canais que ja tem
+# valor. O custo de cada canal e estimado pelo tamanho absoluto (o pior
+# caso) e aos creditos desconta-se o tamanho real da trama.
+#
+# Com um fec.CodificadorFEC, cada trama segue num bloco Reed-Solomon e o
+# sobrecusto do bloco conta para o orcamento.
+import heapq
+import time
+from numbers import Number
+
+from fases import SUBIDA, APOGEU, DESCIDA
+from telemetria import TAMANHO_CANAL, CUSTO_TRAMA_MULTICANAL, codificar_trama_multicanal
+
+FASES_RAPIDAS = (SUBIDA, APOGEU, DESCIDA)
+
+
+class Canal:
+    def __init__(self, nome, prioridade, periodo_min, periodo_max, limiar=0.0, periodo_voo=None):
+        self.nome = nome
+        self.prioridade = prioridade
+        self.periodo_min = periodo_min
+        self.periodo_max = periodo_max
+        self.limiar = limiar
+        self.periodo_voo = periodo_min if periodo_voo is None else periodo_voo
+        self.tamanho = TAMANHO_CANAL[nome]
+        self.valor = None
+        self.tem_valor = False
+        self.enviado = None
+        self.ultimo_envio = None
+        self.mudou_em = None  # primeira mudanca ainda por enviar
+        self.enviados = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+
+    def _mudou(self, valor):
+        if not isinstance(valor, (Number, tuple)) or not isinstance(self.enviado, (Number, tuple)):
+            return valor != self.enviado
+        if isinstance(valor, Number):
+            return abs(valor - self.enviado) >= self.limiar
+        limiares = self.limiar if isinstance(self.limiar, tuple) else (self.limiar,) * len(valor)
+        return any(abs(a - b) >= l for a, b, l in zip(valor, self.enviado, limiares))
+
+    def atualizar(self, agora, valor):
+        self.valor = valor
+        self.tem_valor = True
+        if self.mudou_em is None and self.ultimo_envio is not None and self._mudou(valor):
+            self.mudou_em = agora
+
+    def prazo(self, em_voo):
+        """Instante em que o canal fica devido (None se ainda nao tem valor)."""
+        if not self.tem_valor:
+            return None
+        if self.ultimo_envio is None:
+            return 0.0
+        if self.valor is None and self.mudou_em is None:
+            return None  # "sem valor" ja enviado: so volta a ficar devido quando mudar
+        prazo = self.ultimo_envio + self.periodo_max
+        if self.mudou_em is not None:
+            periodo = self.periodo_voo if em_voo else self.periodo_min
+            prazo = min(prazo, max(self.ultimo_envio + periodo, self.mudou_em))
+        return prazo
+
+    def marcar_enviado(self, agora, prazo):
+        latencia = max(agora - prazo, 0.0) if self.ultimo_envio is not None else 0.0
+        self.enviado = self.valor
+        self.ultimo_envio = agora
+        self.mudou_em = None
+        self.enviados += 1
+        self.latencia_total += latencia
+        self.latencia_maxima = max(self.latencia_maxima, latencia)
+
+    def estatisticas(self):
+        return {
+            "enviados": self.enviados,
+            "latencia_media": self.latencia_total / self.enviados if self.enviados else 0.0,
+            "latencia_maxima": self.latencia_maxima,
+        }
+
+
+class TelemetriaAdaptativa:
+    def __init__(self, canais, orcamento=480.0, rajada=None, relogio=time.monotonic, compressor=None,
+                 fec=None):
+        self.canais = {canal.nome: canal for canal in canais}
+        self.orcamento = orcamento  # bytes por segundo
+        self.rajada = orcamento if rajada is None else rajada
+        self.relogio = relogio
+        self.compressor = compressor
+        self.fec = fec
+        self.creditos = self.rajada
+        self.em_voo = False
+        self.tramas = 0
+        self.bytes = 0
+        self.adiados = 0  # canais devidos que ficaram para a trama seguinte
+        self._inicio = None
+        self._ultimo = None
+
+    def definir_fase(self, fase):
+        self.em_voo = fase in FASES_RAPIDAS
+
+    def atualizar(self, agora=None, **valores):
+        agora = self.relogio() if agora is None else agora
+        for nome, valor in valores.items():
+            self.canais[nome].atualizar(agora, valor)
+
+    def _repor_creditos(self, agora):
+        if self._ultimo is not None:
+            self.creditos = min(self.rajada, self.creditos + (agora - self._ultimo) * self.orcamento)
+        self._ultimo = agora
+
+    def proxima_trama(self, seq, tempo, agora=None):
+        """Devolve (trama, valores enviados) ou None se nada esta devido ou nao cabe."""
+        agora = self.relogio() if agora is None else agora
+        if self._inicio is None:
+            self._inicio = agora
+        self._repor_creditos(agora)
+
+        fila = []
+        for canal in self.canais.values():
+            prazo = canal.prazo(self.em_voo)
+            if prazo is not None and prazo <= agora:
+                heapq.heappush(fila, (-canal.prioridade, prazo, canal.nome))
+        if not fila:
+            return None
+
+        custo = CUSTO_TRAMA_MULTICANAL + (self.fec.sobrecusto if self.fec is not None else 0)
+        escolhidos = []
+        while fila:
+            _, prazo, nome = heapq.heappop(fila)
+            canal = self.canais[nome]
+            if custo + canal.tamanho > self.creditos:
+                self.adiados += 1
+                continue
+            custo += canal.tamanho
+            escolhidos.append((canal, prazo))
+        if not escolhidos:
+            return None
+
+        valores = {canal.nome: canal.valor for canal, _ in escolhidos}
+        if self.compressor is None:
+            trama = codificar_trama_multicanal(seq, tempo, valores)
+        else:
+            todos = {canal.nome: canal.valor for canal in self.canais.values() if canal.tem_valor}
+            trama, valores = self.compressor.codificar(seq, tempo, valores, todos)
+            # Numa trama chave seguem tambem os canais que nao estavam devidos
+            prazos = dict((canal.nome, prazo) for canal, prazo in escolhidos)
+            escolhidos = [(self.canais[nome], prazos.get(nome, agora)) for nome in valores]
+        if self.fec is not None:
+            trama = self.fec.proteger(trama)
+        for canal, prazo in escolhidos:
+            canal.marcar_enviado(agora, prazo)
+        self.creditos -= len(trama)
+        self.tramas += 1
+        self.bytes += len(trama)
+        return trama, valores
+
+    def estatisticas(self, agora=None):
+        agora = self.relogio() if agora is None else agora
+        duracao = agora - self._inicio if self._inicio is not None else 0.0
+        estatisticas = {
+            "tramas": self.tramas,
+            "bytes": self.bytes,
+            "bytes_por_segundo": self.bytes / duracao if duracao > 0 else 0.0,
+            "orcamento": self.orcamento,
+            "adiados": self.adiados,
+            "canais": {nome: canal.estatisticas() for nome, canal in self.canais.items()},
+        }
+        if self.compressor is not None:
+            estatisticas["chaves"] = self.compressor.chaves
+            estatisticas["deltas"] = self.compressor.deltas
+        return estatisticas
@@ -0,0 +1,279 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Destinos das tramas recebidas (ground station) *********
+#
+# Cada destino recebe lotes de tramas ja descodificadas (dicionarios de
+# DescodificadorTramas, com "tempo_min" acrescentado pela ingestao). O
+# mesmo dicionario vai para todos os destinos, por isso nenhum o altera.
+#
+#   DestinoCSV        CSV da ground station (mesmas colunas de sempre)
+#   DestinoRegisto    registo binario, mesmo formato do mati1 (registo.py)
+#   DestinoColunar    registo colunar para analise (registo_colunar.py)
+#   DestinoDifusao    linhas JSON para os clientes TCP ligados
+#   DestinoConsola    [TRAMA] e [MAPA] no terminal
+#
+# Cada destino corre num Trabalhador (thread + fila limitada). A thread
+# de rececao so poe a trama nas filas; um destino lento (cartao SD,
+# cliente de rede, terminal) atrasa-se sozinho e, com a fila cheia,
+# perde as tramas mais antigas em vez de parar o radio.
+import csv
+import json
+import queue
+import socket
+import sys
+import time
+from threading import Thread
+
+from registo import RegistoVoo
+from registo_colunar import EscritorColunar
+
+COLUNAS_CSV = ["tempo (min)", "timestamp", "temperatura", "pressao", "alt_bmp", "alt_gps", "latitude", "longitude"]
+
+
+class Destino:
+    nome = "destino"
+
+    def escrever_lote(self, tramas):
+        for trama in tramas:
+            self.escrever(trama)
+
+    def escrever(self, trama):
+        raise NotImplementedError
+
+    def fechar(self):
+        pass
+
+
+class DestinoCSV(Destino):
+    nome = "csv"
+
+    def __init__(self, caminho):
+        self.ficheiro = open(caminho, "w", newline="")
+        self.escritor = csv.writer(self.ficheiro)
+        self.escritor.writerow(COLUNAS_CSV)
+
+    def escrever_lote(self, tramas):
+        self.escritor.writerows([
+            f"{round(dados['tempo_min'], 2):.2f}", dados["d"], dados["t"], dados["p"], dados["h"], dados["hG"],
+            dados.get("la"), dados.get("lo"),
+        ] for dados in tramas)
+        # Um flush por lote e nao por trama
+        self.ficheiro.flush()
+
+    def fechar(self):
+        self.ficheiro.close()
+
+
+class DestinoRegisto(Destino):
+    nome = "bin"
+
+    def __init__(self, caminho):
+        self.registo = RegistoVoo(caminho)
+
+    def escrever(self, dados):
+        self.registo.escrever(dados["ts"], dados["t"], dados["p"], dados["h"], dados["la"], dados["lo"], dados["hG"])
+
+    def fechar(self):
+        self.registo.fechar()
+
+
+class DestinoColunar(Destino):
+    nome = "colunar"
+
+    def __init__(self, caminho, intervalo_despejo=10.0, relogio=time.monotonic):
+        """Escreve um pedaco pelo menos a cada intervalo_despejo segundos."""
+        self.escritor = EscritorColunar(caminho)
+        self.intervalo_despejo = intervalo_despejo
+        self.relogio = relogio
+        self._ultimo_despejo = relogio()
+
+    def escrever_lote(self, tramas):
+        for dados in tramas:
+            self.escritor.escrever(dados["ts"], dados["t"], dados["p"], dados["h"], dados["la"], dados["lo"],
+                                   dados["hG"])
+        # Os pedacos so enchem ao fim de muitos minutos a 5 Hz: despejar
+        # periodicamente para nao perder dados se a estacao cair
+        if self.relogio() - self._ultimo_despejo >= self.intervalo_despejo:
+            self.escritor.despejar()
+            self._ultimo_despejo = self.relogio()
+
+    def fechar(self):
+        self.escritor.fechar()
+
+
+class DestinoDifusao(Destino):
+    """Servidor TCP local: uma linha JSON por trama para cada cliente ligado.
+
+    Os envios nao bloqueiam; um cliente com mais de limite_pendente bytes
+    por enviar e desligado.
+    """
+
+    nome = "tcp"
+
+    def __init__(self, endereco="127.0.0.1", porta=8765, limite_pendente=256 * 1024):
+        self.servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.servidor.bind((endereco, porta))
+        self.servidor.listen()
+        self.servidor.setblocking(False)
+        self.endereco = self.servidor.getsockname()
+        self.limite_pendente = limite_pendente
+        self.clientes = {}  # socket -> bytes por enviar
+        self.desligados = 0
+
+    def _aceitar(self):
+        while True:
+            try:
+                cliente, origem = self.servidor.accept()
+            except BlockingIOError:
+                return
+            cliente.setblocking(False)
+            self.clientes[cliente] = bytearray()
+            print(f"[DIFUSAO] Cliente ligado: {origem[0]}:{origem[1]} ({len(self.clientes)} ligados)")
+
+    def _desligar(self, cliente, motivo):
+        del self.clientes[cliente]
+        cliente.close()
+        self.desligados += 1
+        print(f"[DIFUSAO] Cliente desligado ({motivo}), {len(self.clientes)} ligados")
+
+    def escrever_lote(self, tramas):
+        self._aceitar()
+        if not self.clientes:
+            return
+        linhas = "".join(json.dumps(dados) + "\n" for dados in tramas).encode("utf-8")
+        for cliente, pendente in list(self.clientes.items()):
+            pendente += linhas
+            try:
+                enviados = cliente.send(pendente)
+            except BlockingIOError:
+                enviados = 0
+            except OSError:
+                self._desligar(cliente, "ligacao fechada")
+                continue
+            del pendente[:enviados]
+            if len(pendente) > self.limite_pendente:
+                self._desligar(cliente, "demasiado lento")
+
+    def fechar(self):
+        for cliente in list(self.clientes):
+            cliente.close()
+        self.clientes.clear()
+        self.servidor.close()
+
+
+class DestinoConsola(Destino):
+    nome = "consola"
+
+    def __init__(self, saida=None, tramas=True, mapa=True):
+        self.saida = saida
+        self.tramas = tramas
+        self.mapa = mapa
+        self.ultima_posicao = None
+
+    def escrever_lote(self, tramas):
+        linhas = []
+        for dados in tramas:
+            if self.tramas:
+                linhas.append(f"[TRAMA] {json.dumps(dados)}")
+            lat = dados.get("la")
+            lon = dados.get("lo")
+            if self.mapa and lat is not None and lon is not None and (lat, lon) != self.ultima_posicao:
+                self.ultima_posicao = (lat, lon)
+                linhas.append(f"[MAPA] Posicao atual: https://www.google.com/maps?q={lat},{lon}")
+        if linhas:
+            print("\n".join(linhas), file=self.saida or sys.stdout, flush=True)
+
+
+class Trabalhador(Thread):
+    """Corre um destino na sua propria thread, alimentado por uma fila limitada."""
+
+    def __init__(self, destino, capacidade=1000, tamanho_lote=256, relogio=time.monotonic):
+        super().__init__(daemon=True, name=f"destino-{destino.nome}")
+        self.destino = destino
+        self.fila = queue.Queue(capacidade)
+        self.tamanho_lote = tamanho_lote
+        self.relogio = relogio
+        self.entregues = 0
+        self.escritas = 0
+        self.descartadas = 0
+        self.erros = 0
+        self.erro = None
+        self.profundidade_maxima = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+
+    def entregar(self, trama):
+        """Chamado pela thread de rececao; nunca bloqueia."""
+        self.entregues += 1
+        item = (self.relogio(), trama)
+        while True:
+            try:
+                self.fila.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.fila.get_nowait()
+                    self.descartadas += 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        while True:
+            item = self.fila.get()
+            self.profundidade_maxima = max(self.profundidade_maxima, self.fila.qsize() + 1)
+            lote = []
+            while item is not None:
+                lote.append(item)
+                if len(lote) >= self.tamanho_lote:
+                    break
+                try:
+                    item = self.fila.get_nowait()
+                except queue.Empty:
+                    break
+            if lote:
+                self._escrever(lote)
+            if item is None:
+                break
+        self.destino.fechar()
+
+    def _escrever(self, lote):
+        try:
+            self.destino.escrever_lote([trama for _, trama in lote])
+        except Exception as e:
+            self.erros += 1
+            if self.erro is None:
+                print(f"[ERRO] Destino {self.destino.nome}: {e}")
+            self.erro = e
+            return
+        agora = self.relogio()
+        self.escritas += len(lote)
+        for entregue, _ in lote:
+            latencia = agora - entregue
+            self.latencia_total += latencia
+            self.latencia_maxima = max(self.latencia_maxima, latencia)
+
+    def estatisticas(self):
+        return {
+            "entregues": self.entregues,
+            "escritas": self.escritas,
+            "descartadas": self.descartadas,
+            "erros": self.erros,
+            "profundidade_maxima": self.profundidade_maxima,
+            "latencia_media": self.latencia_total / self.escritas if self.escritas else 0.0,
+            "latencia_maxima": self.latencia_maxima,
+        }
+
+    def parar(self, espera=5.0):
+        """Escreve o que ainda esta na fila, fecha o destino e termina."""
+        while True:
+            try:
+                self.fila.put(None, timeout=espera)
+                break
+            except queue.Full:
+                try:
+                    self.fila.get_nowait()
+                    self.descartadas += 1
+                except queue.Empty:
+                    pass
+        self.join(espera)
@@ -0,0 +1,143 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Graficos em tempo real com blitting (ground station) ***
+#
+# Em vez de ax.clear() + plot de todas as amostras a cada frame, cada
+# serie e uma Line2D criada uma vez, com os dados num buffer circular de
+# tamanho fixo. A cada frame so se atualizam os dados das linhas e se
+# redesenham as linhas sobre o fundo guardado (eixos, grelha, legendas):
+#
+#   restore_region(fundo) -> draw_artist(linha) -> blit
+#
+# O desenho completo (que recalcula o fundo) so acontece quando um valor
+# sai dos limites dos eixos ou o tempo chega ao fim do eixo x; os limites
+# novos levam folga para isso ser raro. Os dados vem de um historico de
+# tamanho limitado (ver historico.py), por isso o custo de cada frame nao
+# depende da duracao do voo. Se ainda houver mais de 4 pontos por coluna
+# de pixeis, cada coluna e reduzida ao primeiro, minimo, maximo e ultimo
+# (M4) antes de desenhar.
+import numpy as np
+
+from historico import HistoricoMultiResolucao, decimar_para_ecra
+
+FOLGA_X = 0.2  # fracao da janela de tempo deixada livre a direita
+FOLGA_Y = 0.1  # margem acima e abaixo dos valores
+
+
+class GraficoVivo:
+    """Um eixo por serie; atualizar() desenha um frame com blitting."""
+
+    def __init__(self, fig, eixos, series, criar_serie=HistoricoMultiResolucao, janela_x=1.0):
+        """series: lista de (nome, legenda, rotulo_y), uma por eixo.
+
+        criar_serie() devolve o armazenamento de cada serie (adicionar(x, y)
+        e dados()); janela_x e a largura minima do eixo x (nas unidades de x).
+        """
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.eixos = list(eixos)
+        self.janela_x = janela_x
+        self.series = {}
+        self.linhas = {}
+        self._eixo_de = {}
+        self._limites_y = {}
+        for ax, (nome, legenda, rotulo) in zip(self.eixos, series):
+            self.series[nome] = criar_serie()
+            (linha,) = ax.plot([], [], label=legenda, animated=True)
+            self.linhas[nome] = linha
+            self._eixo_de[nome] = ax
+            self._limites_y[nome] = None
+            ax.set_ylabel(rotulo)
+            ax.legend(loc="upper left")
+            ax.grid(True)
+        self._limites_x = None
+        self._fundo = None
+        # O tight_layout e a parte mais cara do desenho completo; so e
+        # refeito quando os limites y mudam (e com eles a largura dos numeros)
+        self._layout = fig.get_layout_engine()
+        self.desenhos_completos = 0
+        self.frames = 0
+        # Redimensionar a janela (ou qualquer desenho completo) invalida o fundo
+        self._ligacao = self.canvas.mpl_connect("draw_event", self._ao_desenhar)
+
+    def adicionar(self, x, **valores):
+        for nome, valor in valores.items():
+            self.series[nome].adicionar(x, valor)
+
+    def _ao_desenhar(self, evento):
+        self._fundo = self.canvas.copy_from_bbox(self.fig.bbox)
+        for nome, linha in self.linhas.items():
+            self._eixo_de[nome].draw_artist(linha)
+
+    def _novos_limites_x(self, dados):
+        """Limites do eixo x, ou None se os atuais ainda servem."""
+        extremos = [x for x, _ in dados.values() if len(x)]
+        if not extremos:
+            return None
+        primeiro = min(x[0] for x in extremos)
+        ultimo = max(x[-1] for x in extremos)
+        if self._limites_x is not None:
+            esquerda, direita = self._limites_x
+            if esquerda <= primeiro and ultimo <= direita:
+                # So volta a ajustar quando o buffer ja descartou muito do inicio
+                if primeiro - esquerda <= (direita - esquerda) * FOLGA_X:
+                    return None
+        largura = max(ultimo - primeiro, self.janela_x)
+        return primeiro, primeiro + largura * (1 + FOLGA_X)
+
+    def _novos_limites_y(self, nome, y):
+        if not len(y) or np.isnan(y).all():
+            return None
+        minimo = float(np.nanmin(y))
+        maximo = float(np.nanmax(y))
+        margem = max(maximo - minimo, abs(maximo) * 1e-3, 1e-3) * FOLGA_Y
+        novos = minimo - margem, maximo + margem
+        atuais = self._limites_y[nome]
+        if atuais is not None and atuais[0] <= minimo and maximo <= atuais[1]:
+            # Encolher so quando os dados ja ocupam menos de um quarto do eixo
+            if (novos[1] - novos[0]) * 4 >= atuais[1] - atuais[0]:
+                return None
+        return novos
+
+    def atualizar(self):
+        """Desenha um frame; devolve True se foi preciso um desenho completo."""
+        self.frames += 1
+        dados = {nome: serie.dados() for nome, serie in self.series.items()}
+
+        completo = self._fundo is None
+        refazer_layout = completo
+        limites_x = self._novos_limites_x(dados)
+        if limites_x is not None:
+            self._limites_x = limites_x
+            for ax in self.eixos:
+                ax.set_xlim(*limites_x)
+            completo = True
+        for nome in self.linhas:
+            limites_y = self._novos_limites_y(nome, dados[nome][1])
+            if limites_y is not None:
+                self._limites_y[nome] = limites_y
+                self._eixo_de[nome].set_ylim(*limites_y)
+                completo = refazer_layout = True
+
+        for nome, linha in self.linhas.items():
+            x, y = dados[nome]
+            if self._limites_x is not None:
+                colunas = max(int(self._eixo_de[nome].bbox.width), 1)
+                x, y = decimar_para_ecra(x, y, *self._limites_x, colunas)
+            linha.set_data(x, y)
+        if completo:
+            # O draw_event guarda o fundo novo e desenha as linhas por cima
+            self.desenhos_completos += 1
+            if self._layout is not None:
+                self.fig.set_layout_engine(self._layout if refazer_layout else "none")
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._fundo)
+            for nome, linha in self.linhas.items():
+                self._eixo_de[nome].draw_artist(linha)
+        self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+        return completo
+
+    def fechar(self):
+        self.canvas.mpl_disconnect(self._ligacao)
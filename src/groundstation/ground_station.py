@@ -1,36 +1,34 @@
 import serial
-import json
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import webbrowser
 import time
-import csv
 import signal
 import sys
 from datetime import datetime
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(abspath(__file__)), "..", "comum"))
+from graficos import GraficoVivo
+from historico import HistoricoMultiResolucao
+from ingestao import Ingestao, criar_destinos
+from mapa import MapaVivo
+from mapa_tiles import CacheTiles, PASTA_TILES
+from previsao import PrevisorAterragem
 
 # CONFIGURACOES
 PORTA_COM = "COM5"
 BAUD_RATE = 9600
-
-# Gerar nome do ficheiro de log no momento do arranque
+INTERVALO_GRAFICO = 250 # ms entre frames dos graficos
+RECENTE_GRAFICO = 1500 # pontos em resolucao total por grafico (5 min a 5 Hz)
+PERIODO_METRICAS = 30 # s entre relatorios da fila de rececao
+PERIODO_PREVISAO = 5 # s entre mensagens [PREVISAO] no terminal
+PASTA_MAPA = PASTA_TILES # tiles descarregadas antes com mapa_tiles.py prefetch
+MAPA_ONLINE = False # True para descarregar tiles em falta em segundo plano (so com rede)
+DESTINOS = ["csv", "bin", "web", "consola"] # ver ingestao.py (colunar, tcp); web em http://127.0.0.1:8080/
+
+# Gerar nome dos ficheiros de log no momento do arranque
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-FICHEIRO_LOG = f"registo_ground_station_{timestamp}.csv"
-
-# Inicializar ficheiro de log
-f_log = open(FICHEIRO_LOG, "w", newline="")
-log_writer = csv.writer(f_log)
-log_writer.writerow(["tempo (min)", "timestamp", "temperatura", "pressao", "alt_bmp", "alt_gps", "latitude", "longitude"])
-
-# Dados para os graficos
-tempos = []
-temperaturas = []
-pressoes = []
-altitudes_bmp = []
-altitudes_gps = []
-coordenadas = []
-
-t0 = time.time()
+PREFIXO_LOG = f"registo_ground_station_{timestamp}"
 
 # Inicializar porta serial
 try:
@@ -40,73 +38,85 @@ except serial.SerialException:
     print(f"[ERRO] Porta {PORTA_COM} nao encontrada.")
     sys.exit()
 
+# Registo (CSV, .bin, terminal) nas threads da ingestao: todas as tramas
+# ficam registadas mesmo que o grafico se atrase
+ingestao = Ingestao(ser, criar_destinos(DESTINOS, PREFIXO_LOG), capacidade_grafico=10000)
+rececao = ingestao.rececao
+
 # Encerramento gracioso
 def terminar(signal_received, frame):
     print("\n[ENCERRAR] Ctrl+C detetado. A fechar ficheiro e terminar programa.")
-    f_log.close()
-    ser.close()
+    ingestao.parar()
     plt.close('all')
     sys.exit(0)
 
 signal.signal(signal.SIGINT, terminar)
 
-# Inicializar figura
-fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(10, 8), tight_layout=True)
-
-def atualizar(frame):
-    try:
-        linha = ser.readline().decode("utf-8").strip()
-        if linha:
-            dados = json.loads(linha)
-
-            tempo_min = (time.time() - t0) / 60
-            tempo_min_arredondado = round(tempo_min, 2)
-
-            print(f"[JSON] {json.dumps(dados)}")
-
-            temperaturas.append(dados["t"])
-            pressoes.append(dados["p"])
-            altitudes_bmp.append(dados["h"])
-            altitudes_gps.append(dados["hG"])
-            tempos.append(tempo_min_arredondado)
-
-            log_writer.writerow([
-                f"{tempo_min_arredondado:.2f}", dados["d"], dados["t"], dados["p"], dados["h"], dados["hG"],
-                dados.get("la"), dados.get("lo")
-            ])
-            f_log.flush()
-
-            ax1.clear()
-            ax2.clear()
-            ax3.clear()
-            ax4.clear()
-
-            ax1.plot(tempos, temperaturas, label="Temperatura (°C)")
-            ax2.plot(tempos, pressoes, label="Pressao (Pa)")
-            ax3.plot(tempos, altitudes_bmp, label="Altitude BMP (m)")
-            ax4.plot(tempos, altitudes_gps, label="Altitude GPS (m)")
-
-            ax1.set_ylabel("Temperatura")
-            ax2.set_ylabel("Pressao")
-            ax3.set_ylabel("Alt. BMP")
-            ax4.set_ylabel("Alt. GPS")
-            ax4.set_xlabel("Tempo (min)")
-
-            for ax in (ax1, ax2, ax3, ax4):
-                ax.legend()
-                ax.grid(True)
-
-            lat = dados.get("la")
-            lon = dados.get("lo")
-            if lat and lon and (lat, lon) != coordenadas[-1:] if coordenadas else (None, None):
-                coordenadas.append((lat, lon))
-                url = f"https://www.google.com/maps?q={lat},{lon}"
-                #print(f"[MAPA] Posicao atual: {lat}, {lon}")
-                print(f"[MAPA] Posicao atual: https://www.google.com/maps?q={lat},{lon}")
-                #webbrowser.open(url, new=0, autoraise=False)
-
-    except (json.JSONDecodeError, KeyError, UnicodeDecodeError) as e:
-        print("[ERRO] Linha invalida ou dados incompletos:", linha)
+# Inicializar figura: linhas criadas uma vez, atualizadas com blitting
+fig, eixos = plt.subplots(4, 1, figsize=(10, 8), tight_layout=True)
+eixos[3].set_xlabel("Tempo (min)")
+grafico = GraficoVivo(fig, eixos, [
+    ("t", "Temperatura (°C)", "Temperatura"),
+    ("p", "Pressao (Pa)", "Pressao"),
+    ("h", "Altitude BMP (m)", "Alt. BMP"),
+    ("hG", "Altitude GPS (m)", "Alt. GPS"),
+], criar_serie=lambda: HistoricoMultiResolucao(RECENTE_GRAFICO))
+
+# Mapa numa janela propria (o blitting de cada figura guarda o seu fundo)
+fig_mapa, eixo_mapa = plt.subplots(figsize=(7, 7), tight_layout=True)
+fig_mapa.canvas.manager.set_window_title("Mapa")
+mapa = MapaVivo(fig_mapa, eixo_mapa, CacheTiles(PASTA_MAPA, online=MAPA_ONLINE))
+previsor = PrevisorAterragem()
+ultima_previsao = 0.0
+
+ultimas_metricas = time.monotonic()
+
+def atualizar():
+    global ultimas_metricas, ultima_previsao
+    # So consome o que a thread de rececao ja descodificou e registou
+    tramas = rececao.consumir()
+    if rececao.erro is not None:
+        print(f"[ERRO] Rececao parada: {rececao.erro}")
+        rececao.erro = None
+    if time.monotonic() - ultimas_metricas >= PERIODO_METRICAS:
+        ultimas_metricas = time.monotonic()
+        m = rececao.estatisticas()
+        atraso = "" if m["atraso_voo"] is None else f", atraso desde o cansat {m['atraso_voo'] * 1000:.0f} ms"
+        print(f"[RECECAO] {m['tramas']} tramas, fila {m['profundidade']} (max {m['profundidade_maxima']}), "
+              f"latencia media {m['latencia_media'] * 1000:.0f} ms max {m['latencia_maxima'] * 1000:.0f} ms, "
+              f"descartadas {m['descartadas']}{atraso}")
+        ingestao.relatorio()
+    if not tramas:
+        return
+
+    for dados in tramas:
+        grafico.adicionar(dados["tempo_min"], t=dados["t"], p=dados["p"], h=dados["h"], hG=dados["hG"])
+        if dados.get("la") is not None and dados.get("lo") is not None:
+            mapa.adicionar(dados["la"], dados["lo"])
+        previsor.adicionar(dados)
+    # Monte Carlo uma vez por frame; depois de aterrar fica a ultima previsao
+    previsao = previsor.prever()
+    if previsao is not None:
+        mapa.definir_previsao(previsao["la"], previsao["lo"], previsao["raio"])
+        if time.monotonic() - ultima_previsao >= PERIODO_PREVISAO:
+            ultima_previsao = time.monotonic()
+            print(f"[PREVISAO] Aterragem em {previsao['la']:.6f}, {previsao['lo']:.6f} "
+                  f"(raio 95% {previsao['raio']:.0f} m) daqui a {previsao['tempo']:.0f} s "
+                  f"({previsao['tempo_p10']:.0f}-{previsao['tempo_p90']:.0f} s), "
+                  f"descida {previsao['descida']:.1f} m/s")
+    grafico.atualizar()
+    mapa.atualizar()
+
+ingestao.iniciar()
+
+temporizador = fig.canvas.new_timer(interval=INTERVALO_GRAFICO)
+temporizador.add_callback(atualizar)
+temporizador.start()
+try:
+    plt.show()
+finally:
+    # Fechar a janela tambem escreve o que esta nas filas dos destinos
+    # (e o buffer do .bin) e fecha o servidor web
+    ingestao.parar()
+    mapa.fechar()
 
-ani = FuncAnimation(fig, atualizar, interval=1000)
-plt.show()
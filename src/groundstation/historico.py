@@ -0,0 +1,142 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Historico de memoria limitada em varias resolucoes *****
+#
+# Cada serie guarda as ultimas amostras em resolucao total (buffer
+# circular) e o resto em niveis cada vez mais decimados:
+#
+#   nivel L-1 ... nivel 1, nivel 0, [resolucao total]
+#   <- mais antigo                   mais recente ->
+#
+# A amostra que sai do buffer entra no nivel 0. Cada nivel junta grupos
+# de `grupo` pontos e guarda so 4 de cada grupo (M4: primeiro, minimo,
+# maximo, ultimo), por isso picos e vales nunca desaparecem, mesmo
+# decimados. Quando um nivel enche, os pontos mais antigos descem para o
+# nivel seguinte; o ultimo nivel decima-se a si proprio. O total de
+# pontos nunca passa de recente + niveis * (capacidade_nivel + grupo),
+# seja qual for a duracao da sessao.
+import numpy as np
+
+
+class SerieCircular:
+    """Buffer circular (x, y) com vista contigua sem copias.
+
+    Cada valor e escrito em i e em i + capacidade, por isso as ultimas n
+    amostras estao sempre seguidas em dados[inicio:inicio + n].
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._x = np.full(2 * capacidade, np.nan)
+        self._y = np.full(2 * capacidade, np.nan)
+        self._proximo = 0
+        self.n = 0
+
+    def adicionar(self, x, y):
+        """Devolve o par (x, y) que saiu do buffer, ou None se ainda nao estava cheio."""
+        i = self._proximo
+        saiu = (self._x[i], self._y[i]) if self.n == self.capacidade else None
+        valor = np.nan if y is None else y
+        self._x[i] = self._x[i + self.capacidade] = x
+        self._y[i] = self._y[i + self.capacidade] = valor
+        self._proximo = (i + 1) % self.capacidade
+        self.n = min(self.n + 1, self.capacidade)
+        return saiu
+
+    def dados(self):
+        inicio = self._proximo + self.capacidade - self.n
+        return self._x[inicio:inicio + self.n], self._y[inicio:inicio + self.n]
+
+
+def decimar_m4(pontos):
+    """Primeiro, minimo, maximo e ultimo de uma lista de (x, y), por ordem de x."""
+    validos = [p for p in pontos if not np.isnan(p[1])]
+    if not validos:
+        return [pontos[0]]
+    escolhidos = {pontos[0], pontos[-1], min(validos, key=lambda p: p[1]), max(validos, key=lambda p: p[1])}
+    return sorted(escolhidos, key=lambda p: p[0])
+
+
+def decimar_para_ecra(x, y, x0, x1, colunas):
+    """M4 por coluna de pixeis: no maximo 4 pontos por coluna entre x0 e x1.
+
+    x tem de estar ordenado. Dentro de cada coluna o minimo e o maximo sao
+    desenhados no x do primeiro ponto, o que a esta escala nao se ve.
+    """
+    if len(x) <= 4 * colunas or x1 <= x0:
+        return x, y
+    coluna = ((x - x0) * (colunas / (x1 - x0))).astype(np.int64)
+    inicios = np.flatnonzero(np.diff(coluna, prepend=coluna[0] - 1))
+    fins = np.append(inicios[1:], len(x)) - 1
+    minimos = np.fmin.reduceat(y, inicios)
+    maximos = np.fmax.reduceat(y, inicios)
+    xs = np.column_stack((x[inicios], x[inicios], x[inicios], x[fins])).ravel()
+    ys = np.column_stack((y[inicios], minimos, maximos, y[fins])).ravel()
+    return xs, ys
+
+
+class HistoricoMultiResolucao:
+    def __init__(self, recente=1500, capacidade_nivel=500, niveis=3, grupo=16):
+        self.recente = SerieCircular(recente)
+        self.capacidade_nivel = capacidade_nivel
+        self.grupo = grupo
+        self.niveis = [[] for _ in range(niveis)]
+        self._pendentes = [[] for _ in range(niveis)]  # grupo por fechar de cada nivel
+        self._antigos = None  # cache dos niveis em arrays (refeita quando um grupo fecha)
+        self.amostras = 0
+
+    @property
+    def n(self):
+        return self.recente.n + sum(len(nivel) + len(pendentes)
+                                    for nivel, pendentes in zip(self.niveis, self._pendentes))
+
+    def adicionar(self, x, y):
+        self.amostras += 1
+        saiu = self.recente.adicionar(x, y)
+        if saiu is not None:
+            self._entrar(0, (float(saiu[0]), float(saiu[1])))
+
+    def _entrar(self, nivel, ponto):
+        pendentes = self._pendentes[nivel]
+        pendentes.append(ponto)
+        if len(pendentes) < self.grupo:
+            return
+        self._antigos = None
+        pontos = self.niveis[nivel]
+        pontos.extend(decimar_m4(pendentes))
+        pendentes.clear()
+        if len(pontos) <= self.capacidade_nivel:
+            return
+        if nivel + 1 < len(self.niveis):
+            excesso = len(pontos) - self.capacidade_nivel
+            for ponto in pontos[:excesso]:
+                self._entrar(nivel + 1, ponto)
+            del pontos[:excesso]
+        else:
+            # Ultimo nivel: decimar-se a si proprio (1/4 dos pontos por grupo)
+            pontos[:] = [p for i in range(0, len(pontos), self.grupo)
+                         for p in decimar_m4(pontos[i:i + self.grupo])]
+
+    def dados(self):
+        """Arrays (x, y) do mais antigo para o mais recente."""
+        if self._antigos is None:
+            # Tudo menos o grupo por fechar do nivel 0, que muda a cada amostra
+            antigos = []
+            for i in reversed(range(len(self.niveis))):
+                antigos.extend(self.niveis[i])
+                if i:
+                    antigos.extend(self._pendentes[i])
+            self._antigos = _arrays(antigos)
+        x, y = self.recente.dados()
+        pendentes = _arrays(self._pendentes[0])
+        if not len(self._antigos[0]) and not len(pendentes[0]):
+            return x, y
+        return (np.concatenate((self._antigos[0], pendentes[0], x)),
+                np.concatenate((self._antigos[1], pendentes[1], y)))
+
+
+def _arrays(pontos):
+    if not pontos:
+        return np.empty(0), np.empty(0)
+    x, y = zip(*pontos)
+    return np.array(x), np.array(y)
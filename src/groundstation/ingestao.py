@@ -0,0 +1,163 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Ingestao da telemetria sem interface grafica ***********
+#
+# Le a porta serie (ou um pty), descodifica as tramas (FEC + tramas,
+# ver rececao.py) e distribui-as pelos destinos (ver destinos.py), cada
+# um na sua thread. Corre sem ecra, por exemplo num portatil ou num Pi
+# na estacao, e e tambem o que a ground_station.py usa por baixo dos
+# graficos.
+#
+#   python3 src/groundstation/ingestao.py --porta /dev/ttyUSB0
+#   python3 src/groundstation/ingestao.py --porta COM5 --destinos csv,bin,tcp
+#   python3 src/groundstation/ingestao.py --porta /dev/pts/3 --destinos colunar,tcp --tcp-porta 9000
+#   python3 src/groundstation/ingestao.py --porta COM5 --destinos csv,bin,web --web-endereco 0.0.0.0
+#
+# Destinos: csv, bin, colunar, tcp, web, consola. Os ficheiros ficam em
+# <prefixo>.csv / .bin / .col; tcp envia uma linha JSON por trama a cada
+# cliente ligado (ex. nc 127.0.0.1 8765); web serve uma pagina e um
+# WebSocket a varios browsers (ver servidor_web.py).
+import argparse
+import signal
+import sys
+import time
+from datetime import datetime
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(abspath(__file__)), "..", "comum"))
+from destinos import (DestinoCSV, DestinoColunar, DestinoConsola, DestinoDifusao, DestinoRegisto,
+                      Trabalhador)
+from rececao import Rececao
+
+BAUD_RATE = 9600
+DESTINOS = ("csv", "bin", "colunar", "tcp", "web", "consola")
+DESTINOS_OMISSAO = "csv,bin,colunar,web,consola"
+CAPACIDADE_DESTINO = 1000  # tramas em espera por destino (mais de 3 min a 5 Hz)
+PERIODO_METRICAS = 30  # s entre relatorios
+
+
+class Ingestao:
+    """Rececao + um Trabalhador por destino.
+
+    capacidade_grafico: tamanho da fila de Rececao para quem desenha
+    (rececao.consumir()); None quando ninguem consome.
+    """
+
+    def __init__(self, porta, destinos, capacidade_destino=CAPACIDADE_DESTINO, capacidade_grafico=None,
+                 relogio_parede=time.time):
+        self.relogio_parede = relogio_parede
+        self.t0 = relogio_parede()
+        self.trabalhadores = [Trabalhador(destino, capacidade_destino) for destino in destinos]
+        self.rececao = Rececao(porta, self._distribuir, capacidade_grafico, relogio_parede=relogio_parede)
+        self.parada = False
+
+    def _distribuir(self, dados):
+        # Na thread de rececao: so acrescenta o tempo e poe nas filas
+        dados["tempo_min"] = (self.relogio_parede() - self.t0) / 60
+        for trabalhador in self.trabalhadores:
+            trabalhador.entregar(dados)
+
+    def iniciar(self):
+        for trabalhador in self.trabalhadores:
+            trabalhador.start()
+        self.rececao.start()
+
+    def parar(self):
+        """Para a rececao e espera que cada destino escreva o que tem em fila (so a primeira chamada)."""
+        if self.parada:
+            return
+        self.parada = True
+        self.rececao.ativa = False
+        if self.rececao.porta is not None:
+            try:
+                self.rececao.porta.close()
+            except Exception:
+                pass
+        if self.rececao.is_alive():
+            self.rececao.join(1.0)
+        for trabalhador in self.trabalhadores:
+            trabalhador.parar()
+
+    def estatisticas(self):
+        m = self.rececao.estatisticas()
+        m["destinos"] = {t.destino.nome: t.estatisticas() for t in self.trabalhadores}
+        return m
+
+    def relatorio(self):
+        m = self.estatisticas()
+        destinos = ", ".join(
+            f"{nome} {d['escritas']} (atraso max {d['latencia_maxima'] * 1000:.0f} ms, "
+            f"fila max {d['profundidade_maxima']}, descartadas {d['descartadas']})"
+            for nome, d in m["destinos"].items())
+        print(f"[INGESTAO] {m['tramas']} tramas, {m['bytes']} bytes; {destinos}")
+
+
+def criar_destinos(nomes, prefixo, tcp_endereco="127.0.0.1", tcp_porta=8765, web_endereco="127.0.0.1",
+                   web_porta=8080, consola=None):
+    destinos = []
+    for nome in nomes:
+        if nome == "csv":
+            destinos.append(DestinoCSV(f"{prefixo}.csv"))
+        elif nome == "bin":
+            destinos.append(DestinoRegisto(f"{prefixo}.bin"))
+        elif nome == "colunar":
+            destinos.append(DestinoColunar(f"{prefixo}.col"))
+        elif nome == "tcp":
+            destinos.append(DestinoDifusao(tcp_endereco, tcp_porta))
+        elif nome == "web":
+            from servidor_web import ServidorWeb
+            destinos.append(ServidorWeb(web_endereco, web_porta))
+        elif nome == "consola":
+            destinos.append(consola or DestinoConsola())
+        else:
+            raise ValueError(f"destino desconhecido: {nome} (opcoes: {', '.join(DESTINOS)})")
+    return destinos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rececao da telemetria sem graficos")
+    parser.add_argument("--porta", required=True, help="porta serie ou pty (ex. COM5, /dev/ttyUSB0)")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--destinos", default=DESTINOS_OMISSAO, help=f"lista de {', '.join(DESTINOS)}")
+    parser.add_argument("--prefixo", help="prefixo dos ficheiros (por omissao registo_ground_station_<data>)")
+    parser.add_argument("--tcp-endereco", default="127.0.0.1")
+    parser.add_argument("--tcp-porta", type=int, default=8765)
+    parser.add_argument("--web-endereco", default="127.0.0.1", help="0.0.0.0 para outros PCs/telemoveis na rede")
+    parser.add_argument("--web-porta", type=int, default=8080)
+    parser.add_argument("--metricas", type=float, default=PERIODO_METRICAS, help="s entre relatorios")
+    args = parser.parse_args()
+
+    import serial
+    try:
+        porta = serial.Serial(args.porta, args.baud, timeout=1)
+        print(f"[SERIAL] Ligado à porta {args.porta} a {args.baud} baud.")
+    except serial.SerialException:
+        print(f"[ERRO] Porta {args.porta} nao encontrada.")
+        sys.exit(1)
+
+    prefixo = args.prefixo or f"registo_ground_station_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    nomes = [nome.strip() for nome in args.destinos.split(",") if nome.strip()]
+    ingestao = Ingestao(porta, criar_destinos(nomes, prefixo, args.tcp_endereco, args.tcp_porta,
+                                              args.web_endereco, args.web_porta))
+
+    def terminar(sinal, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminar)
+    ingestao.iniciar()
+    try:
+        while ingestao.rececao.is_alive():
+            ingestao.rececao.join(args.metricas)
+            ingestao.relatorio()
+    except KeyboardInterrupt:
+        print("\n[ENCERRAR] A fechar os destinos e terminar.")
+    erro = ingestao.rececao.erro
+    ingestao.parar()
+    ingestao.relatorio()
+    if erro is not None:
+        print(f"[ERRO] Rececao parada: {erro}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
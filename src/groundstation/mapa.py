@@ -0,0 +1,238 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Mapa em tempo real: trajeto, ultima posicao, previsao **
+#
+# Desenha sobre as tiles da cache offline (ver mapa_tiles.py), em
+# coordenadas Web Mercator normalizadas (y para baixo):
+#
+#   trajeto        todas as posicoes GPS recebidas
+#   ultima         ultima posicao (marcador)
+#   previsao       ponto de aterragem previsto e raio de incerteza
+#
+# O trajeto fica "cozido" no fundo: a cada frame so se desenham sobre o
+# fundo guardado os segmentos novos, e o fundo passa a inclui-los
+#
+#   restore_region(fundo) -> segmentos novos -> copy_from_bbox(fundo)
+#   -> ultima + previsao -> blit
+#
+# por isso o custo de um frame depende das posicoes novas e nao do
+# tamanho do trajeto. O desenho completo (tiles e trajeto inteiro) so
+# acontece quando algo sai da vista, que e entao alargada com folga,
+# quando a janela muda de tamanho ou quando chegam tiles descarregadas em
+# segundo plano (cache online: a rede nunca bloqueia o timer do grafico).
+import math
+
+import numpy as np
+from matplotlib.patches import Circle
+
+from mapa_tiles import TAMANHO_TILE, CacheTiles, mercator, metros_por_unidade, tiles_da_regiao
+
+FOLGA = 0.5  # fracao da extensao do conteudo deixada livre de cada lado
+ZOOM_MAXIMO = 16  # o mesmo do prefetch por omissao
+VISTA_MINIMA_M = 400.0  # largura minima da vista (m)
+ZOOMS_ALTERNATIVOS = 4  # sem tiles no zoom ideal, tentar ate 4 zooms abaixo
+
+
+class MapaVivo:
+    def __init__(self, fig, ax, cache=None, zoom_maximo=ZOOM_MAXIMO, capacidade=1024):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.ax = ax
+        self.cache = cache if cache is not None else CacheTiles()
+        self.zoom_maximo = zoom_maximo
+        self.zoom = None
+        self._zoom_ideal = None  # zoom para a vista; self.zoom pode ser menor enquanto faltam tiles
+        # Trajeto num buffer que duplica quando enche (acrescentar e O(1) amortizado)
+        self._x = np.empty(capacidade)
+        self._y = np.empty(capacidade)
+        self.n = 0
+        self._no_trajeto = 0  # pontos no Line2D do trajeto (ultimo desenho completo)
+        self._no_fundo = 0  # pontos ja desenhados no fundo guardado
+        self._previsao = None  # (x, y, raio em unidades normalizadas)
+        self._vista = None  # (x0, y0, x1, y1)
+        self._tamanho = None  # tamanho do eixo em pixeis quando a vista foi calculada
+        self._tiles = {}  # (z, x, y) -> AxesImage
+        self._fundo = None
+        self.desenhos_completos = 0
+        self.frames = 0
+
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_facecolor("#dddddd")
+        (self.trajeto,) = ax.plot([], [], "-", color="tab:red", linewidth=1.5, zorder=3)
+        (self.segmento,) = ax.plot([], [], "-", color="tab:red", linewidth=1.5, zorder=3, animated=True)
+        (self.ultima,) = ax.plot([], [], "o", color="tab:blue", markersize=8, zorder=5, animated=True,
+                                 label="Ultima posicao")
+        (self.previsao,) = ax.plot([], [], "X", color="tab:green", markersize=10, zorder=5, animated=True,
+                                   label="Aterragem prevista")
+        self.incerteza = Circle((0, 0), 0, fill=False, color="tab:green", linestyle="--", zorder=4,
+                                animated=True)
+        ax.add_patch(self.incerteza)
+        ax.legend(handles=[self.ultima, self.previsao], loc="upper left")
+        self._ligacao = self.canvas.mpl_connect("draw_event", self._ao_desenhar)
+
+    # ------------------------------------------------ dados
+
+    def adicionar(self, lat, lon):
+        x, y = mercator(lat, lon)
+        if self.n and x == self._x[self.n - 1] and y == self._y[self.n - 1]:
+            return  # as tramas sem GPS novo repetem a ultima posicao
+        if self.n == len(self._x):
+            self._x = np.resize(self._x, 2 * self.n)
+            self._y = np.resize(self._y, 2 * self.n)
+        self._x[self.n] = x
+        self._y[self.n] = y
+        self.n += 1
+
+    def definir_previsao(self, lat, lon, raio_m=0.0):
+        """Ponto de aterragem previsto (lat None para esconder) e raio de incerteza em metros."""
+        if lat is None or lon is None:
+            self._previsao = None
+            return
+        x, y = mercator(lat, lon)
+        self._previsao = (float(x), float(y), raio_m / metros_por_unidade(lat))
+
+    # ------------------------------------------------ vista
+
+    def _extremos(self, inicio):
+        """(x0, y0, x1, y1) do trajeto desde inicio e da previsao; None se nao ha nada."""
+        caixas = []
+        if self.n > inicio:
+            x, y = self._x[inicio:self.n], self._y[inicio:self.n]
+            caixas.append((x.min(), y.min(), x.max(), y.max()))
+        if self._previsao is not None:
+            x, y, raio = self._previsao
+            caixas.append((x - raio, y - raio, x + raio, y + raio))
+        if not caixas:
+            return None
+        return (min(c[0] for c in caixas), min(c[1] for c in caixas),
+                max(c[2] for c in caixas), max(c[3] for c in caixas))
+
+    def _cabe(self):
+        if self._vista is None or self._tamanho != self._tamanho_eixo():
+            return False
+        # Basta ver o que mudou desde o ultimo frame: o resto ja la estava
+        novos = self._extremos(self._no_fundo)
+        if novos is None:
+            return True
+        x0, y0, x1, y1 = self._vista
+        return x0 <= novos[0] and y0 <= novos[1] and novos[2] <= x1 and novos[3] <= y1
+
+    def _tamanho_eixo(self):
+        caixa = self.ax.bbox
+        return max(round(caixa.width), 1), max(round(caixa.height), 1)
+
+    def _nova_vista(self):
+        x0, y0, x1, y1 = self._extremos(0)
+        largura_pixeis, altura_pixeis = self._tamanho_eixo()
+        centro_y = (y0 + y1) / 2
+        minima = VISTA_MINIMA_M / metros_por_unidade(math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * centro_y)))))
+        largura = max((x1 - x0) * (1 + 2 * FOLGA), minima)
+        altura = max((y1 - y0) * (1 + 2 * FOLGA), minima)
+        # Mesma escala nos dois eixos, a ocupar o eixo todo
+        largura = max(largura, altura * largura_pixeis / altura_pixeis)
+        altura = largura * altura_pixeis / largura_pixeis
+        centro_x = (x0 + x1) / 2
+        vista = (centro_x - largura / 2, centro_y - altura / 2, centro_x + largura / 2, centro_y + altura / 2)
+        # Menor zoom em que as tiles nao ficam ampliadas no ecra
+        zoom = math.ceil(math.log2(largura_pixeis / (TAMANHO_TILE * largura)))
+        return vista, max(0, min(zoom, self.zoom_maximo))
+
+    def _zoom_com_tiles(self, zoom):
+        """O zoom pedido, ou o mais proximo abaixo com a tile do centro da vista em cache.
+
+        So as tiles do zoom pedido vao a rede (em _mostrar_tiles); os zooms
+        abaixo servem enquanto elas nao chegam.
+        """
+        x0, y0, x1, y1 = self._vista
+        for z in range(zoom, max(zoom - ZOOMS_ALTERNATIVOS, 0) - 1, -1):
+            n = 2 ** z
+            if self.cache.tem(z, int((x0 + x1) / 2 * n), int((y0 + y1) / 2 * n)):
+                return z
+        return zoom
+
+    def _mostrar_tiles(self):
+        x0, y0, x1, y1 = self._vista
+        n = 2 ** self.zoom
+        visiveis = {(self.zoom, tx, ty) for tx, ty in tiles_da_regiao(x0, y0, x1, y1, self.zoom)}
+        for chave in list(self._tiles):
+            if chave not in visiveis:
+                self._tiles.pop(chave).remove()
+        for chave in visiveis - set(self._tiles):
+            z, tx, ty = chave
+            if z != self._zoom_ideal and not self.cache.tem(z, tx, ty):
+                continue  # zoom alternativo: so o que ja esta em cache
+            imagem = self.cache.obter(z, tx, ty, bloquear=False)
+            if imagem is not None:
+                self._tiles[chave] = self.ax.imshow(imagem, extent=(tx / n, (tx + 1) / n, (ty + 1) / n, ty / n),
+                                                    aspect="auto", interpolation="bilinear", zorder=1)
+        if self.zoom != self._zoom_ideal:
+            # Com rede, pedir o zoom certo; quando chegar, cache.chegadas() forca um desenho completo
+            for tx, ty in tiles_da_regiao(x0, y0, x1, y1, self._zoom_ideal):
+                self.cache.pedir(self._zoom_ideal, tx, ty)
+
+    # ------------------------------------------------ desenho
+
+    def _ao_desenhar(self, evento):
+        # O fundo tem o trajeto ate ao ultimo desenho completo; os pontos
+        # seguintes voltam a ser desenhados como segmentos no proximo frame
+        self._fundo = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._no_fundo = self._no_trajeto
+        self._desenhar_marcadores()
+
+    def _desenhar_marcadores(self):
+        if self.n:
+            self.ultima.set_data([self._x[self.n - 1]], [self._y[self.n - 1]])
+            self.ax.draw_artist(self.ultima)
+        if self._previsao is not None:
+            x, y, raio = self._previsao
+            self.previsao.set_data([x], [y])
+            self.ax.draw_artist(self.previsao)
+            if raio > 0:
+                self.incerteza.set_center((x, y))
+                self.incerteza.set_radius(raio)
+                self.ax.draw_artist(self.incerteza)
+
+    def atualizar(self):
+        """Desenha um frame; devolve True se foi preciso um desenho completo."""
+        self.frames += 1
+        if not self.n and self._previsao is None:
+            return False
+        # Tiles que chegaram da rede: novo desenho completo para as mostrar
+        chegadas = self.cache.chegadas()
+        completo = self._fundo is None or bool(chegadas) or not self._cabe()
+        if completo:
+            self._tamanho = self._tamanho_eixo()
+            self._vista, zoom = self._nova_vista()
+            self._zoom_ideal = zoom
+            self.zoom = self._zoom_com_tiles(zoom)
+            self._mostrar_tiles()
+            x0, y0, x1, y1 = self._vista
+            self.ax.set_xlim(x0, x1)
+            self.ax.set_ylim(y1, y0)  # y para baixo, como nas tiles
+            # Copia do trajeto inteiro so aqui (set_data copia os arrays)
+            self.trajeto.set_data(self._x[:self.n], self._y[:self.n])
+            self._no_trajeto = self.n
+            self.desenhos_completos += 1
+            self.canvas.draw()  # o draw_event guarda o fundo e desenha os marcadores
+        else:
+            self.canvas.restore_region(self._fundo)
+            if self.n > self._no_fundo:
+                # Segmentos novos, a partir do ultimo ponto ja desenhado
+                inicio = max(self._no_fundo - 1, 0)
+                self.segmento.set_data(self._x[inicio:self.n], self._y[inicio:self.n])
+                self.ax.draw_artist(self.segmento)
+                self._fundo = self.canvas.copy_from_bbox(self.ax.bbox)
+                self._no_fundo = self.n
+            self._desenhar_marcadores()
+        self.canvas.blit(self.ax.bbox)
+        self.canvas.flush_events()
+        return completo
+
+    def estatisticas(self):
+        return {"pontos": self.n, "frames": self.frames, "desenhos_completos": self.desenhos_completos,
+                "zoom": self.zoom, "tiles": len(self._tiles), **self.cache.estatisticas()}
+
+    def fechar(self):
+        self.canvas.mpl_disconnect(self._ligacao)
+        self.cache.fechar()
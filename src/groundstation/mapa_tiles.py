@@ -0,0 +1,285 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Cache de tiles de mapa para usar sem rede **************
+#
+# Tiles "slippy map" (Web Mercator, 256x256 px, z/x/y como no
+# OpenStreetMap) guardadas em disco em <pasta>/<z>/<x>/<y>.png e,
+# descodificadas, numa camada LRU em memoria:
+#
+#   obter(z, x, y):  memoria (LRU) -> disco -> rede (so se online=True)
+#
+# Com bloquear=False (o que o mapa da ground station usa, no timer da
+# interface) uma tile que nao esta em disco e pedida a uma thread de
+# descarga e obter() devolve logo None; chegadas() diz quais ja chegaram
+# para o mapa as mostrar no frame seguinte.
+#
+# No local de lancamento normalmente nao ha rede: descarregar a regiao
+# antes, com rede, e usar a cache offline na ground station.
+#
+#   python3 src/groundstation/mapa_tiles.py prefetch --centro 38.6775,-9.1617 --raio 5 --zoom 10-16
+#   python3 src/groundstation/mapa_tiles.py info
+#
+# Respeitar a politica de uso do servidor de tiles (no OSM: poucos
+# pedidos em paralelo, User-Agent identificado, nada de descarregar
+# regioes grandes). --url aceita outro servidor.
+import argparse
+import math
+import os
+import sys
+import time
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from os.path import dirname, abspath, join
+
+import numpy as np
+
+PASTA_TILES = join(dirname(abspath(__file__)), "tiles")
+URL_TILES = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+AGENTE = "MatiSat-GroundStation/1.0 (CanSat Equipa Argos)"
+TAMANHO_TILE = 256
+LIMITE_PREFETCH = 5000  # tiles; acima disto pedir --forcar
+DESCARGAS_PARALELAS = 2  # como no prefetch: a politica do OSM pede poucos pedidos em paralelo
+NOVA_TENTATIVA = 30.0  # s antes de voltar a pedir uma tile cuja descarga falhou
+RAIO_TERRA = 6378137.0
+
+
+def mercator(lat, lon):
+    """Coordenadas Web Mercator normalizadas: x, y em [0, 1), y para baixo (escalares ou arrays)."""
+    return (np.asarray(lon) + 180.0) / 360.0, (1.0 - np.arcsinh(np.tan(np.radians(lat))) / math.pi) / 2.0
+
+
+def inverso_mercator(x, y):
+    lon = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y))))
+    return lat, lon
+
+
+def metros_por_unidade(lat):
+    """Metros no terreno por unidade de coordenada Mercator normalizada, a esta latitude."""
+    return 2 * math.pi * RAIO_TERRA * math.cos(math.radians(lat))
+
+
+def tiles_da_regiao(x0, y0, x1, y1, zoom):
+    """(x, y) das tiles que cobrem o retangulo em coordenadas normalizadas."""
+    n = 2 ** zoom
+    tx0, tx1 = max(int(x0 * n), 0), min(int(x1 * n), n - 1)
+    ty0, ty1 = max(int(y0 * n), 0), min(int(y1 * n), n - 1)
+    return [(tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)]
+
+
+class CacheTiles:
+    """Tiles em disco + LRU de tiles descodificadas (arrays RGB uint8) em memoria."""
+
+    def __init__(self, pasta=PASTA_TILES, url=URL_TILES, memoria=128, online=False, tempo_limite=10.0):
+        self.pasta = pasta
+        self.url = url
+        self.memoria = memoria
+        self.online = online
+        self.tempo_limite = tempo_limite
+        self._lru = OrderedDict()
+        self._executor = None  # criado no primeiro pedido em segundo plano
+        self._pedidos = set()  # tiles a descarregar em segundo plano
+        self._chegadas = deque()  # (chave, descarregada) escritas pelas threads de descarga
+        self._falhas = {}  # chave -> instante da ultima descarga falhada
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.descarregadas = 0
+        self.em_falta = 0
+        self.invalidas = 0
+
+    def caminho(self, z, x, y):
+        return join(self.pasta, str(z), str(x), f"{y}.png")
+
+    def obter(self, z, x, y, bloquear=True):
+        """Array RGB da tile, ou None se nao esta em cache e nao ha rede.
+
+        bloquear=False: sem a tile em disco, pede-a em segundo plano (so
+        se online) e devolve None sem esperar pela rede.
+        """
+        chave = (z, x, y)
+        imagem = self._lru.get(chave)
+        if imagem is not None:
+            self._lru.move_to_end(chave)
+            self.acertos_memoria += 1
+            return imagem
+        dados = self._ler_disco(z, x, y)
+        if dados is not None:
+            self.acertos_disco += 1
+        elif self.online and not bloquear:
+            self.pedir(z, x, y)
+            return None
+        elif self.online:
+            dados = self.descarregar(z, x, y)
+        if dados is None:
+            self.em_falta += 1
+            return None
+        try:
+            imagem = _descodificar(dados)
+        except Exception as e:
+            # Ficheiro cortado ou que nao e imagem: tile em falta, e sai da
+            # cache para voltar a ser descarregada
+            print(f"[MAPA] Tile {z}/{x}/{y} invalida, apagada da cache: {e}")
+            self.invalidas += 1
+            self.em_falta += 1
+            try:
+                os.remove(self.caminho(z, x, y))
+            except OSError:
+                pass
+            return None
+        self._lru[chave] = imagem
+        while len(self._lru) > self.memoria:
+            self._lru.popitem(last=False)
+        return imagem
+
+    def tem(self, z, x, y):
+        """True se a tile esta em memoria ou em disco (nunca vai a rede)."""
+        return (z, x, y) in self._lru or os.path.exists(self.caminho(z, x, y))
+
+    def _ler_disco(self, z, x, y):
+        try:
+            with open(self.caminho(z, x, y), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def pedir(self, z, x, y):
+        """Descarrega a tile numa thread, se online e ainda nao esta em cache; nao bloqueia."""
+        chave = (z, x, y)
+        if not self.online or chave in self._pedidos or self.tem(z, x, y):
+            return
+        if time.monotonic() - self._falhas.get(chave, -NOVA_TENTATIVA) < NOVA_TENTATIVA:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(DESCARGAS_PARALELAS, thread_name_prefix="tiles")
+        self._pedidos.add(chave)
+        futuro = self._executor.submit(self.descarregar, *chave)
+        futuro.add_done_callback(
+            lambda f: self._chegadas.append((chave, not f.cancelled() and f.exception() is None
+                                             and f.result() is not None)))
+
+    def chegadas(self):
+        """Tiles descarregadas em segundo plano desde a ultima chamada (ja em disco)."""
+        chegadas = []
+        while self._chegadas:
+            chave, descarregada = self._chegadas.popleft()
+            self._pedidos.discard(chave)
+            if descarregada:
+                self._falhas.pop(chave, None)
+                chegadas.append(chave)
+            else:
+                self._falhas[chave] = time.monotonic()
+        return chegadas
+
+    def fechar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def descarregar(self, z, x, y):
+        """Descarrega uma tile para o disco; devolve os bytes ou None."""
+        pedido = urllib.request.Request(self.url.format(z=z, x=x, y=y), headers={"User-Agent": AGENTE})
+        try:
+            with urllib.request.urlopen(pedido, timeout=self.tempo_limite) as resposta:
+                dados = resposta.read()
+        except OSError as e:
+            print(f"[MAPA] Falha a descarregar tile {z}/{x}/{y}: {e}")
+            return None
+        try:
+            # Um 200 que nao e imagem (portal cativo, pagina de limite de
+            # pedidos) nunca entra na cache
+            _descodificar(dados)
+        except Exception as e:
+            print(f"[MAPA] Resposta para a tile {z}/{x}/{y} nao e uma imagem: {e}")
+            return None
+        caminho = self.caminho(z, x, y)
+        os.makedirs(dirname(caminho), exist_ok=True)
+        # Escrever e renomear: uma tile meio escrita nunca fica na cache
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+        self.descarregadas += 1
+        return dados
+
+    def prefetch(self, lat0, lon0, lat1, lon1, zooms, paralelo=2, forcar=False):
+        """Descarrega para o disco as tiles da regiao em cada zoom; salta as que ja existem."""
+        x0, y0 = mercator(max(lat0, lat1), min(lon0, lon1))
+        x1, y1 = mercator(min(lat0, lat1), max(lon0, lon1))
+        pedidos = [(z, x, y) for z in zooms for x, y in tiles_da_regiao(float(x0), float(y0), float(x1), float(y1), z)]
+        if len(pedidos) > LIMITE_PREFETCH and not forcar:
+            raise ValueError(f"{len(pedidos)} tiles (limite {LIMITE_PREFETCH}): reduzir a regiao/zoom ou --forcar")
+        falta = [p for p in pedidos if not os.path.exists(self.caminho(*p))]
+        print(f"[MAPA] {len(pedidos)} tiles na regiao, {len(pedidos) - len(falta)} ja em cache, "
+              f"a descarregar {len(falta)}")
+        with ThreadPoolExecutor(paralelo) as executor:
+            resultados = list(executor.map(lambda p: self.descarregar(*p), falta))
+        falhas = sum(r is None for r in resultados)
+        return {"tiles": len(pedidos), "descarregadas": len(falta) - falhas, "falhas": falhas}
+
+    def estatisticas(self):
+        return {
+            "memoria": len(self._lru),
+            "acertos_memoria": self.acertos_memoria,
+            "acertos_disco": self.acertos_disco,
+            "descarregadas": self.descarregadas,
+            "em_falta": self.em_falta,
+            "invalidas": self.invalidas,
+            "pendentes": len(self._pedidos),
+        }
+
+
+def _descodificar(dados):
+    from PIL import Image
+    with Image.open(BytesIO(dados)) as imagem:
+        return np.asarray(imagem.convert("RGB"))
+
+
+def _zooms(texto):
+    if "-" in texto:
+        inicio, fim = texto.split("-")
+        return list(range(int(inicio), int(fim) + 1))
+    return [int(z) for z in texto.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache de tiles de mapa para a ground station")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("prefetch", help="descarregar as tiles de uma regiao (com rede, antes do lancamento)")
+    p.add_argument("--centro", required=True, help="lat,lon do local de lancamento")
+    p.add_argument("--raio", type=float, default=5.0, help="km a volta do centro")
+    p.add_argument("--zoom", default="10-16", help="ex. 10-16 ou 12,14,16")
+    p.add_argument("--paralelo", type=int, default=2)
+    p.add_argument("--forcar", action="store_true")
+    sub.add_parser("info", help="tiles em cache por zoom")
+    for s in sub.choices.values():
+        s.add_argument("--pasta", default=PASTA_TILES)
+        s.add_argument("--url", default=URL_TILES)
+    args = parser.parse_args()
+
+    cache = CacheTiles(args.pasta, args.url, online=True)
+    if args.comando == "prefetch":
+        lat, lon = (float(v) for v in args.centro.split(","))
+        dlat = args.raio * 1000 / 111320.0
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        inicio = time.perf_counter()
+        try:
+            r = cache.prefetch(lat - dlat, lon - dlon, lat + dlat, lon + dlon, _zooms(args.zoom), args.paralelo,
+                               args.forcar)
+        except ValueError as e:
+            print(f"[ERRO] {e}")
+            sys.exit(1)
+        print(f"[MAPA] {r['descarregadas']} descarregadas, {r['falhas']} falhas "
+              f"em {time.perf_counter() - inicio:.1f} s ({args.pasta})")
+    else:
+        if not os.path.isdir(args.pasta):
+            print(f"[MAPA] Sem cache em {args.pasta}")
+            return
+        for z in sorted(os.listdir(args.pasta), key=lambda s: int(s) if s.isdigit() else -1):
+            pasta_z = join(args.pasta, z)
+            n = sum(len(ficheiros) for _, _, ficheiros in os.walk(pasta_z))
+            print(f"  zoom {z:>2s}: {n} tiles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Previsao do ponto de aterragem (ground station) ********
+#
+# A cada trama (campos ts, h, hG, la, lo):
+#   - altitude e velocidade vertical pelo EstimadorAltitude (Kalman do
+#     BMP + GPS, ver estimador.py), com a incerteza da velocidade
+#   - deriva horizontal por regressao linear das posicoes GPS dos
+#     ultimos janela_gps segundos (plano local em metros), com o erro
+#     padrao do declive
+#
+# prever() corre uma vez por frame um Monte Carlo vetorizado de
+# `amostras` descidas:
+#
+#   descida   ~ N(-v, desvio de v), no minimo VELOCIDADE_MINIMA
+#   tempo     = (h - altitude_solo) / descida
+#   vento     ~ deriva + N(0, erro da regressao^2 + sigma_vento^2)
+#   aterragem = posicao atual + vento * tempo
+#
+# e devolve a media, o raio que contem 95% das aterragens e os
+# percentis do tempo ate ao impacto. As variaveis normais sao sorteadas
+# uma so vez: de frame para frame a previsao so muda com os dados, sem
+# saltar com o sorteio, e cada frame custa so contas sobre arrays.
+import math
+import sys
+from collections import deque
+from os.path import dirname, abspath, join
+
+import numpy as np
+
+sys.path.insert(0, join(dirname(abspath(__file__)), "..", "comum"))
+from estimador import EstimadorAltitude
+
+RAIO_TERRA = 6371000.0
+VELOCIDADE_MINIMA = 0.5  # m/s; abaixo disto nao esta a descer
+VELOCIDADE_DESCIDA = -1.0  # m/s; v acima disto: a subir ou parado, sem previsao
+
+
+class PrevisorAterragem:
+    def __init__(self, janela_gps=10.0, amostras=2000, sigma_vento=1.0, altitude_solo=0.0, semente=1):
+        """sigma_vento: incerteza (m/s, por eixo) da mudanca do vento ate ao solo.
+
+        altitude_solo: altitude do local de aterragem em relacao a rampa (m).
+        """
+        self.janela_gps = janela_gps
+        self.sigma_vento = sigma_vento
+        self.altitude_solo = altitude_solo
+        self.estimador = EstimadorAltitude()
+        self.origem = None  # (lat, lon) da primeira posicao: plano local
+        self._cos_lat = 1.0
+        self.fixes = deque()  # (ts, este, norte) dentro da janela
+        self._ultima_gps = None
+        aleatorio = np.random.default_rng(semente)
+        self._normais = aleatorio.standard_normal((3, amostras))
+        self.previsoes = 0
+
+    # ------------------------------------------------ dados
+
+    def adicionar(self, dados):
+        """Atualiza o estado com uma trama descodificada (O(1) amortizado)."""
+        ts = dados["ts"]
+        if dados.get("h") is not None:
+            self.estimador.atualizar_baro(ts, dados["h"])
+        gps = (dados.get("la"), dados.get("lo"), dados.get("hG"))
+        if None in gps or gps == self._ultima_gps:
+            return  # sem GPS ou repeticao da ultima posicao (tramas v2/v3)
+        self._ultima_gps = gps
+        la, lo, hG = gps
+        if self.origem is None:
+            self.origem = (la, lo)
+            self._cos_lat = math.cos(math.radians(la))
+        este, norte = self._plano(la, lo)
+        self.fixes.append((ts, este, norte))
+        while self.fixes and self.fixes[0][0] < ts - self.janela_gps:
+            self.fixes.popleft()
+        self.estimador.atualizar_gps(ts, hG)
+
+    def _plano(self, la, lo):
+        lat0, lon0 = self.origem
+        return (math.radians(lo - lon0) * RAIO_TERRA * self._cos_lat, math.radians(la - lat0) * RAIO_TERRA)
+
+    def _geografico(self, este, norte):
+        lat0, lon0 = self.origem
+        return (lat0 + np.degrees(norte / RAIO_TERRA), lon0 + np.degrees(este / (RAIO_TERRA * self._cos_lat)))
+
+    def deriva(self):
+        """((este, norte) agora, (ve, vn), erro padrao da velocidade) ou None com poucos fixes."""
+        if len(self.fixes) < 3 or self.fixes[-1][0] - self.fixes[0][0] < 2.0:
+            return None
+        t, e, n = np.array(self.fixes).T
+        t = t - t[-1]
+        A = np.column_stack((t, np.ones_like(t)))
+        (ve, e0), residuos_e, _, _ = np.linalg.lstsq(A, e, rcond=None)
+        (vn, n0), residuos_n, _, _ = np.linalg.lstsq(A, n, rcond=None)
+        # Erro padrao do declive: sigma_residuos / sqrt(soma (t - media)^2)
+        graus = max(len(t) - 2, 1)
+        residuo = ((residuos_e.sum() if len(residuos_e) else 0.0) +
+                   (residuos_n.sum() if len(residuos_n) else 0.0)) / (2 * graus)
+        erro = math.sqrt(residuo / max(((t - t.mean()) ** 2).sum(), 1e-9))
+        return (e0, n0), (ve, vn), erro
+
+    # ------------------------------------------------ previsao
+
+    def prever(self, agora=None):
+        """Dicionario com a previsao, ou None se o cansat nao esta a descer ou faltam fixes.
+
+        la, lo      ponto de aterragem medio
+        raio        raio (m) que contem 95% das aterragens simuladas
+        tempo       s ate ao impacto (mediana), tempo_p10 / tempo_p90
+        descida     velocidade de descida (m/s), deriva (ve, vn) em m/s
+        """
+        estimador = self.estimador
+        deriva = self.deriva()
+        if deriva is None or estimador.tempo is None or estimador.velocidade > VELOCIDADE_DESCIDA:
+            return None
+        (e0, n0), (ve, vn), erro = deriva
+        # Posicao e altitude trazidas ate agora
+        tempo_fix = self.fixes[-1][0]
+        agora = estimador.tempo if agora is None else agora
+        altura = estimador.altitude + estimador.velocidade * (agora - estimador.tempo) - self.altitude_solo
+        if altura <= 0:
+            return None
+        e0 += ve * (agora - tempo_fix)
+        n0 += vn * (agora - tempo_fix)
+
+        z_descida, z_este, z_norte = self._normais
+        descida = np.maximum(-estimador.velocidade + math.sqrt(estimador.P[1, 1]) * z_descida, VELOCIDADE_MINIMA)
+        tempo = altura / descida
+        sigma = math.sqrt(erro ** 2 + self.sigma_vento ** 2)
+        este = e0 + (ve + sigma * z_este) * tempo
+        norte = n0 + (vn + sigma * z_norte) * tempo
+
+        este_medio = este.mean()
+        norte_medio = norte.mean()
+        raio = float(np.percentile(np.hypot(este - este_medio, norte - norte_medio), 95))
+        lat, lon = self._geografico(este_medio, norte_medio)
+        p10, p50, p90 = np.percentile(tempo, (10, 50, 90))
+        self.previsoes += 1
+        return {
+            "ts": agora,
+            "la": float(lat),
+            "lo": float(lon),
+            "raio": raio,
+            "tempo": float(p50),
+            "tempo_p10": float(p10),
+            "tempo_p90": float(p90),
+            "altura": float(altura),
+            "descida": float(-estimador.velocidade),
+            "deriva": (float(ve), float(vn)),
+        }
@@ -0,0 +1,128 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Rececao da telemetria numa thread (ground station) *****
+#
+# A thread esvazia a porta serie continuamente (FEC + descodificador de
+# tramas), chama ao_receber(trama) para cada trama (registo em CSV/bin)
+# e poe-na numa fila. O grafico consome de cada vez tudo o que chegou
+# desde o ultimo frame, por isso desenhar nunca atrasa a leitura da porta
+# nem o registo.
+#
+# Metricas:
+#   profundidade  tramas na fila quando o grafico as consumiu (e maximo)
+#   latencia      da leitura da porta ao consumo pelo grafico
+#   atraso_voo    relogio do PC - ts da ultima trama (so faz sentido com
+#                 os dois relogios acertados, ex. por GPS/NTP)
+#   descartadas   tramas mais antigas tiradas da fila cheia (ja registadas)
+#
+# Sem ninguem a consumir (ingestao sem grafico), capacidade=None desliga
+# a fila e as tramas so vao para ao_receber.
+import queue
+import time
+from threading import Thread
+
+from telemetria import DescodificadorTramas
+from fec import DescodificadorFEC
+
+
+class Rececao(Thread):
+    def __init__(self, porta, ao_receber=None, capacidade=10000, relogio=time.monotonic,
+                 relogio_parede=time.time):
+        super().__init__(daemon=True)
+        self.porta = porta
+        self.ao_receber = ao_receber
+        self.relogio = relogio
+        self.relogio_parede = relogio_parede
+        self.fila = None if capacidade is None else queue.Queue(capacidade)
+        self.descodificador = DescodificadorTramas()
+        # Corrige os blocos Reed-Solomon; tramas sem FEC passam tal como chegam
+        self.fec = DescodificadorFEC()
+        self.ativa = True
+        self.bytes = 0
+        self.tramas = 0
+        self.descartadas = 0
+        self.erro = None
+        self.profundidade = 0
+        self.profundidade_maxima = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+        self.consumidas = 0
+        self.atraso_voo = None
+
+    def run(self):
+        while self.ativa:
+            try:
+                bloco = self.porta.read(self.porta.in_waiting or 1)
+            except Exception as e:  # porta fechada ou desligada
+                if self.ativa:
+                    self.erro = e
+                break
+            if bloco:
+                self.processar(bloco)
+
+    def processar(self, bloco):
+        """Descodifica um bloco de bytes; separado de run() para testes e benchmarks."""
+        recebido = self.relogio()
+        self.bytes += len(bloco)
+        d = self.descodificador
+        erros_antes, sem_chave_antes = d.erros_crc, d.sem_chave
+        corrigidos_antes, perdidos_antes = self.fec.corrigidos, self.fec.perdidos
+        tramas = d.alimentar(self.fec.alimentar(bloco))
+        if self.fec.corrigidos > corrigidos_antes or self.fec.perdidos > perdidos_antes:
+            print(f"[FEC] Tramas corrigidas: {self.fec.corrigidos} ({self.fec.bytes_corrigidos} bytes), "
+                  f"sem correcao possivel: {self.fec.perdidos}, perdidas (seq): {d.tramas_perdidas}")
+        if d.erros_crc > erros_antes:
+            print(f"[ERRO] Tramas invalidas: {d.erros_crc}, bytes descartados: {d.bytes_descartados}")
+        if d.sem_chave > sem_chave_antes:
+            print(f"[ERRO] Tramas delta sem trama chave: {d.sem_chave} (a espera da proxima chave)")
+        for trama in tramas:
+            if self.ao_receber is not None:
+                self.ao_receber(trama)
+            self.tramas += 1
+            while self.fila is not None:
+                try:
+                    self.fila.put_nowait((recebido, trama))
+                    break
+                except queue.Full:
+                    try:
+                        self.fila.get_nowait()
+                        self.descartadas += 1
+                    except queue.Empty:
+                        pass
+        return tramas
+
+    def consumir(self):
+        """Tudo o que chegou desde a ultima chamada (lista de tramas)."""
+        agora = self.relogio()
+        tramas = []
+        while True:
+            try:
+                recebido, trama = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            latencia = agora - recebido
+            self.latencia_total += latencia
+            self.latencia_maxima = max(self.latencia_maxima, latencia)
+            tramas.append(trama)
+        self.consumidas += len(tramas)
+        self.profundidade = len(tramas)
+        self.profundidade_maxima = max(self.profundidade_maxima, len(tramas))
+        if tramas:
+            self.atraso_voo = self.relogio_parede() - tramas[-1]["ts"]
+        return tramas
+
+    def estatisticas(self):
+        return {
+            "bytes": self.bytes,
+            "tramas": self.tramas,
+            "descartadas": self.descartadas,
+            "profundidade": self.profundidade,
+            "profundidade_maxima": self.profundidade_maxima,
+            "latencia_media": self.latencia_total / self.consumidas if self.consumidas else 0.0,
+            "latencia_maxima": self.latencia_maxima,
+            "atraso_voo": self.atraso_voo,
+        }
+
+    def parar(self, espera=1.0):
+        self.ativa = False
+        self.join(espera)
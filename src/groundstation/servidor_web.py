@@ -0,0 +1,259 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Servidor HTTP + WebSocket da telemetria ****************
+#
+# Destino da ingestao (ver destinos.py) que serve a telemetria a varios
+# browsers ao mesmo tempo, so com a biblioteca padrao (asyncio):
+#
+#   GET /            pagina com os ultimos valores (web/index.html)
+#   GET /historico   JSON com as ultimas `historico` tramas
+#   GET /estado      JSON com as estatisticas do servidor
+#   GET /ws          WebSocket: primeiro uma lista JSON com o historico
+#                    (quem chega tarde ve o voo ate ali), depois um
+#                    objeto JSON por trama
+#
+# Cada trama e convertida em JSON e num frame WebSocket uma so vez e o
+# mesmo bytes vai para todos os clientes. Cada cliente tem uma fila
+# limitada; um browser que nao acompanha (rede fraca, separador em
+# segundo plano) enche a sua fila e e desligado, sem atrasar a ingestao
+# nem os outros clientes.
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import struct
+from collections import deque
+from os.path import dirname, abspath, join
+from threading import Thread
+
+from destinos import Destino
+
+PAGINA = join(dirname(abspath(__file__)), "web", "index.html")
+GUID_WS = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TAMANHO_MAXIMO_PEDIDO = 8192  # bytes de um pedido HTTP e de um frame recebido de um cliente
+FECHO_DEMASIADO_GRANDE = 1009  # codigo de fecho WebSocket "message too big"
+# Buffer de envio fixo por cliente: sem isto o kernel aceita megabytes
+# para um browser parado e a fila do cliente demora muito a encher
+BUFFER_ENVIO = 64 * 1024
+
+
+def frame_ws(texto, opcode=0x1):
+    """Frame WebSocket do servidor (sem mascara, FIN=1)."""
+    dados = texto.encode("utf-8") if isinstance(texto, str) else texto
+    n = len(dados)
+    if n < 126:
+        cabecalho = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        cabecalho = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        cabecalho = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return cabecalho + dados
+
+
+class FrameDemasiadoGrande(ValueError):
+    pass
+
+
+async def ler_frame_ws(leitor, limite=None):
+    """(opcode, dados) do proximo frame; desfaz a mascara dos frames do cliente.
+
+    limite: tamanho maximo dos dados (bytes); acima disso lanca
+    FrameDemasiadoGrande antes de ler os dados.
+    """
+    b0, b1 = await leitor.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        (n,) = struct.unpack("!H", await leitor.readexactly(2))
+    elif n == 127:
+        (n,) = struct.unpack("!Q", await leitor.readexactly(8))
+    if limite is not None and n > limite:
+        raise FrameDemasiadoGrande(f"frame de {n} bytes (maximo {limite})")
+    mascara = await leitor.readexactly(4) if b1 & 0x80 else None
+    dados = await leitor.readexactly(n)
+    if mascara:
+        dados = bytes(b ^ mascara[i % 4] for i, b in enumerate(dados))
+    return b0 & 0x0F, dados
+
+
+def chave_aceite(chave):
+    return base64.b64encode(hashlib.sha1(chave.encode("ascii") + GUID_WS).digest()).decode("ascii")
+
+
+class _Cliente:
+    def __init__(self, escritor, capacidade):
+        self.escritor = escritor
+        self.fila = asyncio.Queue(capacidade)
+        self.origem = escritor.get_extra_info("peername")
+
+
+class ServidorWeb(Destino):
+    """Servidor numa thread propria com um loop asyncio.
+
+    historico: tramas guardadas para quem se liga a meio do voo.
+    capacidade_cliente: mensagens em espera por cliente antes de o desligar.
+    """
+
+    nome = "web"
+
+    def __init__(self, endereco="127.0.0.1", porta=8080, historico=1500, capacidade_cliente=256):
+        self.historico = deque(maxlen=historico)  # JSON de cada trama
+        self.capacidade_cliente = capacidade_cliente
+        self.clientes = set()
+        self.ligados = 0
+        self.desligados_lentos = 0
+        self.mensagens = 0
+        self.tramas = 0
+        self._loop = asyncio.new_event_loop()
+        self._servidor = self._loop.run_until_complete(asyncio.start_server(self._atender, endereco, porta))
+        self.endereco = self._servidor.sockets[0].getsockname()[:2]
+        self._thread = Thread(target=self._loop.run_forever, daemon=True, name="servidor-web")
+        self._thread.start()
+        print(f"[WEB] A servir em http://{self.endereco[0]}:{self.endereco[1]}/")
+
+    # ------------------------------------------------ lado da ingestao
+
+    def escrever_lote(self, tramas):
+        # Na thread do Trabalhador: serializar aqui, fora do loop
+        textos = [json.dumps(dados) for dados in tramas]
+        frames = [frame_ws(texto) for texto in textos]
+        self._loop.call_soon_threadsafe(self._difundir, textos, frames)
+
+    def _difundir(self, textos, frames):
+        self.historico.extend(textos)
+        self.tramas += len(textos)
+        for cliente in list(self.clientes):
+            for frame in frames:
+                try:
+                    cliente.fila.put_nowait(frame)
+                except asyncio.QueueFull:
+                    self._desligar(cliente, "demasiado lento")
+                    self.desligados_lentos += 1
+                    break
+
+    def _desligar(self, cliente, motivo):
+        if cliente not in self.clientes:
+            return
+        self.clientes.discard(cliente)
+        if not cliente.escritor.transport.is_closing():
+            cliente.escritor.transport.abort()
+        print(f"[WEB] Cliente desligado ({motivo}), {len(self.clientes)} ligados")
+
+    def estatisticas(self):
+        return {
+            "clientes": len(self.clientes),
+            "ligados": self.ligados,
+            "desligados_lentos": self.desligados_lentos,
+            "mensagens": self.mensagens,
+            "tramas": self.tramas,
+            "historico": len(self.historico),
+        }
+
+    def fechar(self, espera=2.0):
+        async def fechar():
+            self._servidor.close()
+            for cliente in list(self.clientes):
+                self._desligar(cliente, "servidor a fechar")
+            await self._servidor.wait_closed()
+
+        if not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(fechar(), self._loop).result(espera)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(espera)
+
+    # ------------------------------------------------ HTTP
+
+    async def _atender(self, leitor, escritor):
+        try:
+            pedido = await leitor.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            escritor.close()
+            return
+        linhas = pedido[:TAMANHO_MAXIMO_PEDIDO].decode("latin-1").split("\r\n")
+        partes = linhas[0].split()
+        cabecalhos = {}
+        for linha in linhas[1:]:
+            nome, _, valor = linha.partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        caminho = partes[1].split("?")[0] if len(partes) >= 2 else ""
+        if len(partes) < 2 or partes[0] != "GET":
+            await self._responder(escritor, 405, "text/plain", b"so GET\n")
+        elif caminho == "/ws" and cabecalhos.get("upgrade", "").lower() == "websocket":
+            await self._websocket(leitor, escritor, cabecalhos)
+        elif caminho == "/":
+            with open(PAGINA, "rb") as f:
+                await self._responder(escritor, 200, "text/html; charset=utf-8", f.read())
+        elif caminho == "/historico":
+            corpo = ("[" + ",".join(self.historico) + "]").encode("utf-8")
+            await self._responder(escritor, 200, "application/json", corpo)
+        elif caminho == "/estado":
+            await self._responder(escritor, 200, "application/json", json.dumps(self.estatisticas()).encode())
+        else:
+            await self._responder(escritor, 404, "text/plain", b"nao encontrado\n")
+
+    async def _responder(self, escritor, estado, tipo, corpo):
+        razao = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}[estado]
+        escritor.write(f"HTTP/1.1 {estado} {razao}\r\nContent-Type: {tipo}\r\n"
+                       f"Content-Length: {len(corpo)}\r\nCache-Control: no-store\r\n"
+                       f"Connection: close\r\n\r\n".encode("latin-1") + corpo)
+        try:
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        escritor.close()
+
+    # ------------------------------------------------ WebSocket
+
+    async def _websocket(self, leitor, escritor, cabecalhos):
+        chave = cabecalhos.get("sec-websocket-key")
+        if not chave:
+            await self._responder(escritor, 400, "text/plain", b"falta Sec-WebSocket-Key\n")
+            return
+        escritor.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                        f"Sec-WebSocket-Accept: {chave_aceite(chave)}\r\n\r\n").encode("latin-1"))
+        ligacao = escritor.get_extra_info("socket")
+        if ligacao is not None:
+            ligacao.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_ENVIO)
+        cliente = _Cliente(escritor, self.capacidade_cliente)
+        # Historico e entrada na lista no mesmo passo do loop: nenhuma
+        # trama fica de fora nem aparece duas vezes
+        cliente.fila.put_nowait(frame_ws("[" + ",".join(self.historico) + "]"))
+        self.clientes.add(cliente)
+        self.ligados += 1
+        print(f"[WEB] Cliente ligado: {cliente.origem}, {len(self.clientes)} ligados")
+        envio = asyncio.ensure_future(self._enviar(cliente))
+        motivo = "fechou a ligacao"
+        try:
+            while True:
+                # O cliente so manda close/ping: um tamanho grande e abuso
+                opcode, dados = await ler_frame_ws(leitor, TAMANHO_MAXIMO_PEDIDO)
+                if opcode == 0x8:  # close
+                    break
+                if opcode == 0x9:  # ping
+                    escritor.write(frame_ws(dados, 0xA))
+        except FrameDemasiadoGrande as e:
+            motivo = str(e)
+            envio.cancel()
+            escritor.write(frame_ws(struct.pack("!H", FECHO_DEMASIADO_GRANDE), 0x8))
+            escritor.close()  # close e nao abort: o frame de fecho ainda e enviado
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            envio.cancel()
+            self._desligar(cliente, motivo)
+
+    async def _enviar(self, cliente):
+        try:
+            while True:
+                frames = [await cliente.fila.get()]
+                while not cliente.fila.empty():
+                    frames.append(cliente.fila.get_nowait())
+                cliente.escritor.write(b"".join(frames))
+                self.mensagens += len(frames)
+                await cliente.escritor.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
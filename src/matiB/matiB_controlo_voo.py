@@ -1,139 +1,298 @@
 import time
-import board
-import busio
-import adafruit_bmp3xx
-from time import sleep, strftime, localtime
+INICIO = time.monotonic()
 from threading import Thread
-from json import dumps
-from csv import writer
 from os import makedirs
-from os.path import exists
-from serial import Serial
-from pigpio import pi, INPUT, OUTPUT
-import pynmea2
+from os.path import exists, dirname, abspath, join
 from math import pow
+import sys
+
+sys.path.insert(0, join(dirname(abspath(__file__)), "..", "comum"))
+from telemetria import CompressorTelemetria
+from fec import CodificadorFEC
+from telemetria_adaptativa import Canal, TelemetriaAdaptativa
+from gps import LeitorGPS, ler_continuamente
+from estado import EstadoSensores, Estimativa, campos_gps
+from amostragem import BufferCircular, Leitor, Amostrador
+from escalonador import Escalonador
+from calibracao import CalibracaoPressao
+from registo import RegistoVoo, guardar_anterior
+from fases import MaquinaFases, ATERRADO
+from dispositivos import RegistoDispositivos
+from ponto_controlo import PontoControlo, EstadoVoo
 
 PORTA_UART = "/dev/ttyAMA0"
 GPS_GPIO = 5
 GPIO_BUZZER = 12
 GPIO_SINAL = 17
 CAMINHO_REGISTOS = "/mnt/fotos"  # Mantém o caminho de registos
-FICHEIRO_CSV = CAMINHO_REGISTOS + "/registo_mati1.csv"
+FICHEIRO_REGISTO = CAMINHO_REGISTOS + "/registo_mati1.bin"
+FICHEIRO_CALIBRACAO = CAMINHO_REGISTOS + "/calibracao_matiB.json"
+FICHEIRO_PONTO_CONTROLO = CAMINHO_REGISTOS + "/ponto_controlo_matiB.bin"
+ALTITUDE_LANCAMENTO = 30.0
+IDADE_MAXIMA_GPS = 5.0 # fixes mais antigos sao enviados como sem fix, em segundos
 TEMPO_VERIFICACAO_SOLO = 20
+PERIODO_SLOT_TELEMETRIA = 0.2 # oportunidades de envio da telemetria, em segundos
+ORCAMENTO_TELEMETRIA = 480.0 # bytes/s, metade dos ~960 B/s do APC220 a 9600 baud
+PERIODO_TRAMA_CHAVE = 5.0 # trama completa entre as tramas delta, em segundos
+FEC_TELEMETRIA = True # cada trama num bloco Reed-Solomon (ver fec.py)
+PERIODO_REGISTO = 0.1 # em segundos (fsync em blocos, ver registo.py)
+PERIODO_FASES = 0.1 # verificacao das fases de voo, em segundos
+PERIODO_CALIBRACAO = 0.1 # consumo das amostras pela calibracao, em segundos
+PERIODO_ESTATISTICAS = 60.0 # relatorio de atrasos do escalonador
+PERIODO_PONTO_CONTROLO = 2.0 # gravacao do estado de voo para retomar apos reinicio
+IDADE_MAXIMA_RETOMA = 3600.0 # pontos de controlo mais antigos sao de outro voo, em segundos
+PERIODO_AMOSTRAGEM = 0.02 # 50 Hz, perto do ODR maximo do sensor
+DECIMACAO_FASES = 5 # fases de voo a 10 Hz (medias de 5 amostras)
+ATRASO_PRIMEIRA_TRAMA = 0.1 # tempo para o amostrador juntar as primeiras amostras
+
+# Bibliotecas de hardware e dispositivos so sao carregados quando pedidos
+dispositivos = RegistoDispositivos(INICIO)
+
+def criar_uart():
+    serial = dispositivos.importar("serial")
+    return serial.Serial(PORTA_UART, 9600, timeout=1)
+
+def criar_gpio():
+    pigpio = dispositivos.importar("pigpio")
+    pig = pigpio.pi()
+    pig.set_mode(GPIO_BUZZER, pigpio.OUTPUT)
+    pig.set_mode(GPIO_SINAL, pigpio.OUTPUT)
+    return pig
 
-def buzzer(pig):
+def criar_bmp():
+    board = dispositivos.importar("board")
+    busio = dispositivos.importar("busio")
+    adafruit_bmp3xx = dispositivos.importar("adafruit_bmp3xx")
+    i2c = busio.I2C(board.SCL, board.SDA)
+    bmp388 = adafruit_bmp3xx.BMP3XX_I2C(i2c, address=0x76)
+    bmp388.sea_level_pressure = 1013.25
+    bmp388.pressure_oversampling = 4
+    bmp388.temperature_oversampling = 1
+    return bmp388
+
+def criar_estimador():
+    # numpy e o import mais pesado do ciclo de voo
+    return dispositivos.importar("estimador").EstimadorAltitude()
+
+dispositivos.registar("uart", criar_uart)
+dispositivos.registar("gpio", criar_gpio)
+dispositivos.registar("bmp", criar_bmp)
+dispositivos.registar("estimador", criar_estimador)
+
+def pulso(pig, escalonador, gpio, duracao):
+    # O GPIO e desligado pelo escalonador, sem bloquear o ciclo de voo
+    pig.write(gpio, 1)
+    escalonador.agendar(duracao, lambda: pig.write(gpio, 0))
+
+def buzzer(pig, escalonador):
     print("[BUZZER] Ativar buzzer indefinidamente")
-    while True:
-        pig.write(GPIO_BUZZER, 1)
-        sleep(0.5)
-        pig.write(GPIO_BUZZER, 0)
-        sleep(0.5)
+    escalonador.adicionar("buzzer", 1.0, lambda: pulso(pig, escalonador, GPIO_BUZZER, 0.5))
 
-def sinal_mati2(pig):
-    pig.write(GPIO_SINAL, 1)
-    sleep(0.1)
-    pig.write(GPIO_SINAL, 0)
+def sinal_mati2(pig, escalonador):
+    pulso(pig, escalonador, GPIO_SINAL, 0.1)
+
+def canais_telemetria():
+    # nome, prioridade, periodo_min, periodo_max, limiar de mudanca, periodo_min em voo
+    return [
+        Canal("fase", 6, 0.2, 10.0),
+        Canal("h", 5, 1.0, 2.0, limiar=0.5, periodo_voo=0.2),
+        Canal("v", 4, 1.0, 5.0, limiar=0.5, periodo_voo=0.2),
+        Canal("gps", 3, 1.0, 5.0, limiar=(1e-5, 1e-5, 2.0)),
+        Canal("p", 2, 1.0, 5.0, limiar=5.0),
+        Canal("t", 1, 5.0, 30.0, limiar=0.2),
+    ]
 
 def calcular_altura(pressao, pressao_nivel_mar):
     return 44330 * (1.0 - pow(pressao / pressao_nivel_mar, 1 / 5.255))
 
-def iniciar_gps(gpio, callback):
-    pig = pi()
-    pig.set_mode(gpio, INPUT)
+def iniciar_gps(pig, gpio, callback):
+    pig.set_mode(gpio, dispositivos.importar("pigpio").INPUT)
     pig.bb_serial_read_open(gpio, 9600, 8)
-    def leitor():
-        buffer = ""
-        while True:
-            (count, dados) = pig.bb_serial_read(gpio)
-            if count > 0:
-                buffer += dados.decode('utf-8', errors='ignore')
-                linhas = buffer.split('\r\n')
-                buffer = linhas[-1]
-                for linha in linhas[:-1]:
-                    if linha.startswith('$'):
-                        try:
-                            msg = pynmea2.parse(linha)
-                            if isinstance(msg, pynmea2.types.talker.GGA):
-                                lat = msg.latitude
-                                lon = msg.longitude
-                                alt = msg.altitude
-                                if msg.lat_dir == 'S': lat = -lat
-                                if msg.lon_dir == 'W': lon = -lon
-                                callback((lat, lon, alt))
-                        except:
-                            pass
-            sleep(0.1)
-    thread = Thread(target=leitor)
+    leitor = LeitorGPS(callback)
+    thread = Thread(target=ler_continuamente, args=(lambda: pig.bb_serial_read(gpio), leitor))
     thread.daemon = True
     thread.start()
-    return pig
 
 def principal():
     print("[SISTEMA] Iniciar controlo de voo com BMP388...")
-    uart = Serial(PORTA_UART, 9600, timeout=1)
-    gps_dados = {"lat": None, "lon": None, "alt": None}
-    pig = iniciar_gps(GPS_GPIO, lambda d: gps_dados.update({"lat": d[0], "lon": d[1], "alt": d[2]}))
-    pig.set_mode(GPIO_BUZZER, OUTPUT)
-    pig.set_mode(GPIO_SINAL, OUTPUT)
-
-    i2c = busio.I2C(board.SCL, board.SDA)
-    bmp388 = adafruit_bmp3xx.BMP3XX_I2C(i2c, address=0x76)
-    bmp388.sea_level_pressure = 1013.25
-
-    print("A calcular pressão de referência local...")
-    valores_base = []
-    for i in range(26):
-        valores_base.append(bmp388.pressure * 100)
-        sleep(1)
-    pressao_base = sum(valores_base) / len(valores_base)
-    print(f"Pressão de referência: {pressao_base:.2f} Pa")
+    # So o que a primeira trama precisa: UART, BMP e GPIO (GPS)
+    uart = dispositivos.obter("uart")
+    bmp388 = dispositivos.obter("bmp")
 
     if not exists(CAMINHO_REGISTOS):
         makedirs(CAMINHO_REGISTOS)
 
-    with open(FICHEIRO_CSV, 'w', newline='') as f_csv:
-        writer_csv = writer(f_csv)
-        writer_csv.writerow(["timestamp", "t", "p", "h", "la", "lo", "hG"])
-        registo_altitudes = []
-        pouso_confirmado = False
-
-        while True:
-            agora = time.time()
-            timestamp = strftime("%Y%m%d_%H%M%S", localtime(agora))
-
-            temperatura = bmp388.temperature
-            pressao = bmp388.pressure * 100  # pressao em Pa
-            altitude = calcular_altura(pressao, pressao_base)
-
-            dados_json = {
-                "d": timestamp,
-                "t": round(temperatura, 2),
-                "p": round(pressao, 2),
-                "h": round(altitude, 2),
-                "la": gps_dados["lat"],
-                "lo": gps_dados["lon"],
-                "hG": gps_dados["alt"]
-            }
-
-            uart.write((dumps(dados_json) + "\n").encode("utf-8"))
-            print("[RADIO] Transmitido:", dados_json)
-
-            writer_csv.writerow([
-                timestamp, temperatura, pressao, altitude,
-                gps_dados["lat"], gps_dados["lon"], gps_dados["alt"]
-            ])
-            f_csv.flush()
-
-            registo_altitudes.append(altitude)
-            registo_altitudes = registo_altitudes[-TEMPO_VERIFICACAO_SOLO:]
-
-            if len(registo_altitudes) >= TEMPO_VERIFICACAO_SOLO:
-                if max(registo_altitudes) - min(registo_altitudes) < 1.0 and not pouso_confirmado:
+    buffer_bmp = BufferCircular(int(60 / PERIODO_AMOSTRAGEM))
+    amostrador = Amostrador(lambda: (bmp388.pressure * 100, bmp388.temperature), buffer_bmp, PERIODO_AMOSTRAGEM)
+    amostrador.start()
+    estado = EstadoSensores()
+    pig = dispositivos.obter("gpio")
+    iniciar_gps(pig, GPS_GPIO, estado.publicar_gps)
+    leitor_radio = Leitor(buffer_bmp)
+    leitor_fases = Leitor(buffer_bmp)
+
+    # Referencia guardada neste voo (reinicio) ou calibrada em segundo plano
+    calibracao = CalibracaoPressao(FICHEIRO_CALIBRACAO, PERIODO_AMOSTRAGEM)
+    leitor_calibracao = Leitor(buffer_bmp)
+    ponto_controlo = PontoControlo(FICHEIRO_PONTO_CONTROLO)
+    retoma = ponto_controlo.retomar(IDADE_MAXIMA_RETOMA)
+    if retoma is not None:
+        print(f"[RETOMA] Reinicio em voo: fase={retoma.fase} registos={retoma.registos} "
+              f"seq={retoma.seq_telemetria} fotos={retoma.fotos}")
+        calibracao.retomar(retoma.pressao_referencia)
+    else:
+        # Voo novo: o registo anterior e guardado (.anterior.N) em vez de ser truncado
+        anterior = guardar_anterior(FICHEIRO_REGISTO)
+        if anterior is not None:
+            print(f"[REGISTO] Registo anterior guardado em {anterior}")
+    if calibracao.retomada:
+        print(f"[CALIBRACAO] Referencia retomada do disco: {calibracao.referencia:.2f} Pa")
+    else:
+        print("[CALIBRACAO] A calcular pressao de referencia local em segundo plano...")
+
+    escalonador = Escalonador()
+    leitor_registo = Leitor(buffer_bmp)
+
+    with RegistoVoo(FICHEIRO_REGISTO, novo=retoma is None) as registo_voo, ponto_controlo:
+        maquina = MaquinaFases(
+            PERIODO_AMOSTRAGEM * DECIMACAO_FASES,
+            altitude_lancamento=ALTITUDE_LANCAMENTO,
+            tempo_solo=TEMPO_VERIFICACAO_SOLO,
+        )
+        downlink = TelemetriaAdaptativa(canais_telemetria(), ORCAMENTO_TELEMETRIA,
+                                        compressor=CompressorTelemetria(PERIODO_TRAMA_CHAVE),
+                                        fec=CodificadorFEC() if FEC_TELEMETRIA else None)
+        ultimo_gps = None
+        aviso_estimador = False
+        seq = 0
+        fotos_pedidas = 0
+        if retoma is not None:
+            maquina.retomar(retoma.fase, retoma.altitude_maxima)
+            downlink.definir_fase(retoma.fase)
+            # Saltar as tramas enviadas depois da ultima gravacao do ponto de controlo
+            seq = retoma.seq_telemetria + int(PERIODO_PONTO_CONTROLO / PERIODO_SLOT_TELEMETRIA) + 1
+            fotos_pedidas = retoma.fotos
+            if registo_voo.offset < retoma.offset_registo:
+                print(f"[RETOMA] Registo com {registo_voo.offset} bytes, esperados {retoma.offset_registo}")
+
+        def altura(pressao):
+            # Antes de a calibracao terminar usa a media provisoria
+            return calcular_altura(pressao, calibracao.provisoria or pressao)
+
+        def calibrar():
+            if calibracao.atualizar(leitor_calibracao.novas()):
+                escalonador.remover(tarefa_calibracao)
+                estado_cal = "forcada (sensor instavel)" if calibracao.forcada else "concluida"
+                print(f"[CALIBRACAO] {estado_cal}: {calibracao.referencia:.2f} Pa "
+                      f"(ruido {calibracao.ruido:.2f} Pa, {calibracao.amostras} amostras, {calibracao.duracao:.1f} s)")
+
+        def telemetria():
+            nonlocal seq
+            media = leitor_radio.media()
+            if media is None:
+                return
+            _, pressao, temperatura = media  # pressao em Pa
+            # Um so instantaneo por trama: lat, lon e alt vem do mesmo fix
+            instantaneo = estado.ler()
+            gps = estado.gps_recente(instantaneo, IDADE_MAXIMA_GPS)
+            downlink.atualizar(
+                t=temperatura, p=pressao, fase=maquina.fase,
+                gps=campos_gps(gps) if gps is not None else None,
+            )
+            # Altitude filtrada (BMP + GPS) em vez de uma leitura isolada
+            if instantaneo.estimativa is not None:
+                downlink.atualizar(h=instantaneo.estimativa.altitude, v=instantaneo.estimativa.velocidade)
+            else:
+                downlink.atualizar(h=altura(pressao))
+            # So seguem os canais devidos que cabem no orcamento do radio
+            enviada = downlink.proxima_trama(seq, time.time())
+            if enviada is None:
+                return
+            trama, valores = enviada
+            uart.write(trama)
+            print(f"[RADIO] Transmitido: n={seq} {len(trama)} B "
+                  + " ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in valores.items()))
+            if "primeira_trama" not in dispositivos.marcos:
+                primeira_trama()
+            seq += 1
+
+        def primeira_trama():
+            print(f"[ARRANQUE] Primeira trama de telemetria apos {dispositivos.marcar('primeira_trama') * 1000:.0f} ms")
+            for linha in dispositivos.relatorio():
+                print(f"[ARRANQUE] {linha}")
+            # O resto carrega em segundo plano, ja com a telemetria a correr
+            dispositivos.preparar("estimador")
+
+        def registar():
+            media = leitor_registo.media()
+            if media is None:
+                return
+            _, pressao, temperatura = media
+            altitude = altura(pressao)
+            lat, lon, alt_gps = campos_gps(estado.gps_recente(estado.ler(), IDADE_MAXIMA_GPS))
+            registo_voo.escrever(time.time(), temperatura, pressao, altitude, lat, lon, alt_gps)
+
+        def guardar_ponto():
+            ponto_controlo.guardar(EstadoVoo(
+                time.time(), maquina.fase, calibracao.referencia, maquina.altitude_maxima,
+                fotos_pedidas, seq, registo_voo.registos, registo_voo.offset,
+            ))
+
+        def verificar_fases():
+            nonlocal ultimo_gps, aviso_estimador
+            if not calibracao.concluida:
+                return  # as amostras ficam no buffer ate haver referencia
+            # Estimador ainda a carregar ou falhou: velocidade pelo declive da janela da maquina de fases
+            estimador = dispositivos.obter("estimador") if dispositivos.pronto("estimador") else None
+            if estimador is None and dispositivos.falhou("estimador") and not aviso_estimador:
+                print(f"[ERRO] Estimador indisponivel ({dispositivos.erros['estimador']}); "
+                      "fases pelo declive da janela")
+                aviso_estimador = True
+            for (tempo, p, _) in leitor_fases.decimadas(DECIMACAO_FASES):
+                altitude = calcular_altura(p, calibracao.referencia)
+                if estimador is None:
+                    fase = maquina.atualizar(tempo, altitude)
+                else:
+                    estimador.atualizar_baro(tempo, altitude)
+                    gps = estado.ler().gps
+                    if gps is not None and gps is not ultimo_gps:
+                        estimador.atualizar_gps(tempo, gps.alt)
+                        ultimo_gps = gps
+                    estado.publicar(estimativa=Estimativa(tempo, estimador.altitude, estimador.velocidade))
+                    fase = maquina.atualizar(tempo, estimador.altitude, estimador.velocidade)
+                if fase is None:
+                    continue
+                print(f"[SISTEMA] Fase de voo: {fase} (h={maquina.altitude:.1f} m, v={maquina.velocidade:.1f} m/s)")
+                downlink.definir_fase(fase)
+                guardar_ponto()
+                if fase == ATERRADO:
                     print("[SISTEMA] Regresso ao solo confirmado")
-                    pouso_confirmado = True
-                    buzzer(pig)
+                    buzzer(pig, escalonador)
+
+        def estatisticas():
+            for nome, e in escalonador.estatisticas().items():
+                print(f"[ESCALONADOR] {nome}: execucoes={e['execucoes']} ultrapassagens={e['ultrapassagens']} "
+                      f"perdidos={e['prazos_perdidos']} atraso_max={e['atraso_maximo'] * 1000:.1f} ms "
+                      f"duracao_max={e['duracao_maxima'] * 1000:.1f} ms")
+            if amostrador.erros:
+                print(f"[AMOSTRAGEM] {amostrador.erros} leituras do BMP falhadas")
+            r = downlink.estatisticas()
+            print(f"[RADIO] {r['bytes_por_segundo']:.1f} B/s de {r['orcamento']:.0f} B/s, "
+                  f"tramas={r['tramas']} (chave={r['chaves']} delta={r['deltas']}) adiados={r['adiados']}")
+            for nome, c in r["canais"].items():
+                print(f"[RADIO] {nome}: enviados={c['enviados']} latencia_media={c['latencia_media'] * 1000:.0f} ms "
+                      f"latencia_max={c['latencia_maxima'] * 1000:.0f} ms")
 
-            sleep(1)
+        tarefa_calibracao = None
+        if not calibracao.concluida:
+            tarefa_calibracao = escalonador.adicionar("calibracao", PERIODO_CALIBRACAO, calibrar)
+        # Primeira trama logo que haja amostras; depois os canais devidos a cada slot
+        escalonador.adicionar("telemetria", PERIODO_SLOT_TELEMETRIA, telemetria, atraso=ATRASO_PRIMEIRA_TRAMA)
+        escalonador.adicionar("registo", PERIODO_REGISTO, registar, atraso=PERIODO_REGISTO)
+        escalonador.adicionar("fases", PERIODO_FASES, verificar_fases)
+        escalonador.adicionar("ponto_controlo", PERIODO_PONTO_CONTROLO, guardar_ponto, atraso=PERIODO_PONTO_CONTROLO)
+        escalonador.adicionar("estatisticas", PERIODO_ESTATISTICAS, estatisticas, atraso=PERIODO_ESTATISTICAS)
+        escalonador.correr()
 
 if __name__ == "__main__":
     principal()
\ No newline at end of file
@@ -0,0 +1,299 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Hardware falso para correr o codigo de voo num PC ******
+#
+# Modulos que substituem board, busio, adafruit_bmp280,
+# adafruit_bmp3xx, pigpio, picamera2 e serial em sys.modules antes de
+# importar o script de voo. Todos leem o estado do Mundo, que junta o
+# perfil de voo ao relogio acelerado.
+#
+# O relogio acelerado substitui time.time/time.monotonic/time.sleep:
+# o tempo simulado corre fator vezes mais depressa que o real. Todas as
+# threads do codigo de voo (amostrador, GPS, camara) continuam a ser
+# threads reais, so que dormem menos.
+import os
+import random
+from math import log
+import threading
+import time
+import tty
+import types
+
+from perfil_voo import frases_nmea
+
+_time_real = time.time
+_monotonic_real = time.monotonic
+_sleep_real = time.sleep
+
+
+class FimSimulacao(Exception):
+    pass
+
+
+class RelogioAcelerado:
+    def __init__(self, fator, inicio_epoch=None, duracao=None):
+        self.fator = fator
+        self.inicio_real = _monotonic_real()
+        self.inicio_epoch = _time_real() if inicio_epoch is None else inicio_epoch
+        self.duracao = duracao
+        self.thread_principal = threading.main_thread()
+
+    def monotonic(self):
+        return (_monotonic_real() - self.inicio_real) * self.fator
+
+    def time(self):
+        return self.inicio_epoch + self.monotonic()
+
+    def sleep(self, segundos):
+        if (self.duracao is not None and threading.current_thread() is self.thread_principal
+                and self.monotonic() >= self.duracao):
+            raise FimSimulacao()
+        if segundos > 0:
+            _sleep_real(segundos / self.fator)
+
+
+_relogio_atual = None
+
+
+def _monotonic():
+    return _relogio_atual.monotonic() if _relogio_atual else _monotonic_real()
+
+
+def _time():
+    return _relogio_atual.time() if _relogio_atual else _time_real()
+
+
+def _sleep(segundos):
+    if _relogio_atual:
+        _relogio_atual.sleep(segundos)
+    else:
+        _sleep_real(segundos)
+
+
+def instalar_relogio(relogio):
+    # As funcoes instaladas delegam no relogio atual: modulos importados
+    # numa simulacao anterior (e os seus argumentos por omissao) continuam
+    # a funcionar nas seguintes
+    global _relogio_atual
+    _relogio_atual = relogio
+    time.time = _time
+    time.monotonic = _monotonic
+    time.sleep = _sleep
+
+
+def remover_relogio():
+    global _relogio_atual
+    _relogio_atual = None
+    time.time = _time_real
+    time.monotonic = _monotonic_real
+    time.sleep = _sleep_real
+
+
+class Mundo:
+    """Estado fisico partilhado pelos sensores falsos."""
+
+    def __init__(self, perfil, relogio, semente=1, ruido_pressao=0.03, ruido_gps=3.0,
+                 tempo_fix=20.0, pressao_rampa=1013.25 - 7.2):
+        self.perfil = perfil
+        self.relogio = relogio
+        self.aleatorio = random.Random(semente)
+        self.ruido_pressao = ruido_pressao  # hPa
+        self.ruido_gps = ruido_gps  # m
+        self.tempo_fix = tempo_fix
+        self.pressao_rampa = pressao_rampa
+        self.leituras_bmp = 0
+        self.bytes_nmea = 0
+        self.arestas_gpio = {}  # gpio -> numero de mudancas de nivel
+        self.fotos = []  # (tempo, caminho)
+
+    @property
+    def agora(self):
+        return self.relogio.monotonic()
+
+    def pressao(self):
+        h = self.perfil.altitude(self.agora)
+        self.leituras_bmp += 1
+        return self.pressao_rampa * (1 - h / 44330) ** 5.255 + self.aleatorio.gauss(0, self.ruido_pressao)
+
+    def temperatura(self):
+        return 18.0 - 0.0065 * self.perfil.altitude(self.agora) + self.aleatorio.gauss(0, 0.02)
+
+
+def _modulo(nome, **atributos):
+    modulo = types.ModuleType(nome)
+    modulo.__dict__.update(atributos)
+    return modulo
+
+
+class _BMP:
+    def __init__(self, mundo):
+        self._mundo = mundo
+        self.sea_level_pressure = 1013.25
+
+    @property
+    def pressure(self):
+        return self._mundo.pressao()
+
+    @property
+    def temperature(self):
+        return self._mundo.temperatura()
+
+
+class _Pigpio:
+    def __init__(self, mundo):
+        self.mundo = mundo
+        self.connected = True
+        self.niveis = {}
+        self._proximo_nmea = {}
+
+    def set_mode(self, gpio, modo):
+        pass
+
+    def write(self, gpio, nivel):
+        if self.niveis.get(gpio, 0) != nivel:
+            self.mundo.arestas_gpio[gpio] = self.mundo.arestas_gpio.get(gpio, 0) + 1
+        self.niveis[gpio] = nivel
+
+    def bb_serial_read_open(self, gpio, baud, bits=8):
+        self._proximo_nmea[gpio] = int(self.mundo.agora) + 1
+
+    def bb_serial_read(self, gpio):
+        # Uma rajada por cada segundo simulado que passou desde a ultima leitura
+        dados = bytearray()
+        agora = self.mundo.agora
+        while self._proximo_nmea[gpio] <= agora:
+            t = self._proximo_nmea[gpio]
+            com_fix = t >= self.mundo.tempo_fix
+            dados += frases_nmea(t, self.mundo.perfil, com_fix, ruido_alt=self.mundo.aleatorio.gauss(0, self.mundo.ruido_gps))
+            self._proximo_nmea[gpio] += 1
+        self.mundo.bytes_nmea += len(dados)
+        return len(dados), dados
+
+    def bb_serial_read_close(self, gpio):
+        self._proximo_nmea.pop(gpio, None)
+
+    def stop(self):
+        pass
+
+
+class _PedidoCaptura:
+    def __init__(self, mundo, tempo_gravacao):
+        self.mundo = mundo
+        self.tempo_gravacao = tempo_gravacao
+
+    def save(self, nome, caminho):
+        time.sleep(self.tempo_gravacao)
+        with open(caminho, "wb") as f:
+            f.write(b"\xff\xd8\xff\xd9")
+        self.mundo.fotos.append((self.mundo.agora, caminho))
+
+    def release(self):
+        pass
+
+
+class _Picamera2:
+    def __init__(self, mundo, tempo_captura=0.15, tempo_gravacao=0.35):
+        self.mundo = mundo
+        self.tempo_captura = tempo_captura
+        self.tempo_gravacao = tempo_gravacao
+
+    def create_still_configuration(self, *args, **kwargs):
+        return {}
+
+    def configure(self, configuracao):
+        pass
+
+    def start(self):
+        pass
+
+    def capture_request(self):
+        time.sleep(self.tempo_captura)
+        return _PedidoCaptura(self.mundo, self.tempo_gravacao)
+
+    def capture_file(self, caminho):
+        self.capture_request().save("main", caminho)
+
+    def close(self):
+        pass
+
+
+class UARTFalsa:
+    """Par pty: o script de voo escreve no lado escravo, a estacao le do mestre.
+
+    Com ber > 0 o radio troca bits: cada erro troca rajada bits seguidos,
+    com erros a uma taxa media de ber por bit.
+    """
+
+    def __init__(self, ber=0.0, rajada=1, semente=1):
+        self.mestre, self.escravo = os.openpty()
+        tty.setraw(self.escravo)
+        tty.setraw(self.mestre)
+        self.nome = os.ttyname(self.escravo)
+        self.bytes_escritos = 0
+        self.ber = ber
+        self.rajada = rajada
+        self.bits_trocados = 0
+        self._aleatorio = random.Random(semente)
+        self._proximo_erro = self._intervalo_erro()
+
+    def _intervalo_erro(self):
+        """Bits ate ao proximo erro (distribuicao geometrica)."""
+        if self.ber <= 0:
+            return None
+        return int(log(1.0 - self._aleatorio.random()) / log(1.0 - min(self.ber / self.rajada, 0.5)))
+
+    def ruido(self, dados):
+        if self._proximo_erro is None:
+            return dados
+        dados = bytearray(dados)
+        bits = len(dados) * 8
+        posicao = self._proximo_erro
+        while posicao < bits:
+            for bit in range(posicao, min(posicao + self.rajada, bits)):
+                dados[bit // 8] ^= 1 << (bit % 8)
+                self.bits_trocados += 1
+            posicao += self.rajada + self._intervalo_erro()
+        self._proximo_erro = posicao - bits
+        return bytes(dados)
+
+    def serial(self, *args, **kwargs):
+        uart = self
+
+        class Serial:
+            def __init__(self, *a, **k):
+                self.port = uart.nome
+
+            def write(self, dados):
+                uart.bytes_escritos += len(dados)
+                return os.write(uart.escravo, uart.ruido(dados))
+
+            def close(self):
+                pass
+
+        return Serial(*args, **kwargs)
+
+    def fechar(self):
+        for fd in (self.escravo, self.mestre):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def modulos_falsos(mundo, uart):
+    """Dicionario nome -> modulo para instalar em sys.modules."""
+    constantes_bmp280 = dict(
+        MODE_NORMAL=0x03, STANDBY_TC_0_5=0x00, OVERSCAN_X1=0x01, OVERSCAN_X2=0x02,
+        OVERSCAN_X4=0x03, OVERSCAN_X16=0x05, IIR_FILTER_DISABLE=0, IIR_FILTER_X4=0x02,
+    )
+    return {
+        "board": _modulo("board", SCL=3, SDA=2),
+        "busio": _modulo("busio", I2C=lambda scl, sda: object()),
+        "adafruit_bmp280": _modulo(
+            "adafruit_bmp280", Adafruit_BMP280_I2C=lambda i2c, address=0x77: _BMP(mundo), **constantes_bmp280
+        ),
+        "adafruit_bmp3xx": _modulo("adafruit_bmp3xx", BMP3XX_I2C=lambda i2c, address=0x77: _BMP(mundo)),
+        "pigpio": _modulo("pigpio", pi=lambda: _Pigpio(mundo), INPUT=0, OUTPUT=1),
+        "picamera2": _modulo("picamera2", Picamera2=lambda: _Picamera2(mundo)),
+        "serial": _modulo("serial", Serial=uart.serial, SerialException=OSError),
+    }
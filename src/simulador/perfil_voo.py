@@ -0,0 +1,104 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Perfil fisico de um voo para o simulador ***************
+#
+#   rampa    altitude 0 durante tempo_rampa
+#   subida   h = apogeu * sin(pi/2 * tau / tempo_subida) (v = 0 no apogeu)
+#   descida  velocidade constante de paraquedas ate ao solo
+#   solo     altitude 0 ate ao fim
+#
+# O vento desloca o cansat (m/s para este e para norte) so enquanto
+# esta no ar.
+from math import sin, cos, pi, radians
+from functools import reduce
+
+RAIO_TERRA = 6371000.0
+
+
+class PerfilVoo:
+    def __init__(self, tempo_rampa=60.0, apogeu=500.0, tempo_subida=12.0, velocidade_descida=8.0,
+                 vento_este=3.0, vento_norte=1.0, lat0=38.6775, lon0=-9.1617, altitude_rampa=60.0):
+        self.tempo_rampa = tempo_rampa
+        self.apogeu = apogeu
+        self.tempo_subida = tempo_subida
+        self.velocidade_descida = velocidade_descida
+        self.vento_este = vento_este
+        self.vento_norte = vento_norte
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.altitude_rampa = altitude_rampa
+
+    @property
+    def tempo_apogeu(self):
+        return self.tempo_rampa + self.tempo_subida
+
+    @property
+    def tempo_aterragem(self):
+        return self.tempo_apogeu + self.apogeu / self.velocidade_descida
+
+    def altitude(self, t):
+        """Altitude em relacao a rampa (m) no instante t (s desde o inicio)."""
+        if t < self.tempo_rampa:
+            return 0.0
+        if t < self.tempo_apogeu:
+            return self.apogeu * sin(pi / 2 * (t - self.tempo_rampa) / self.tempo_subida)
+        return max(self.apogeu - self.velocidade_descida * (t - self.tempo_apogeu), 0.0)
+
+    def posicao(self, t):
+        """(lat, lon, altitude acima do nivel do mar)."""
+        tempo_no_ar = min(max(t - self.tempo_rampa, 0.0), self.tempo_aterragem - self.tempo_rampa)
+        norte = self.vento_norte * tempo_no_ar
+        este = self.vento_este * tempo_no_ar
+        lat = self.lat0 + norte / RAIO_TERRA * 180 / pi
+        lon = self.lon0 + este / (RAIO_TERRA * cos(radians(self.lat0))) * 180 / pi
+        return lat, lon, self.altitude_rampa + self.altitude(t)
+
+    def velocidade_horizontal(self, t):
+        if self.tempo_rampa <= t < self.tempo_aterragem:
+            return (self.vento_este ** 2 + self.vento_norte ** 2) ** 0.5
+        return 0.0
+
+    def fases_esperadas(self):
+        return [
+            (self.tempo_rampa, "subida"),
+            (self.tempo_apogeu, "apogeu"),
+            (self.tempo_aterragem, "aterrado"),
+        ]
+
+
+def _checksum(frase):
+    return reduce(lambda a, b: a ^ b, frase.encode("ascii"), 0)
+
+
+def _nmea(frase):
+    return f"${frase}*{_checksum(frase):02X}\r\n".encode("ascii")
+
+
+def _ddmm(graus, positivo, negativo, largura):
+    hemisferio = positivo if graus >= 0 else negativo
+    graus = abs(graus)
+    inteiro = int(graus)
+    minutos = (graus - inteiro) * 60
+    return f"{inteiro:0{largura}d}{minutos:07.4f}", hemisferio
+
+
+def frases_nmea(t, perfil, com_fix=True, satelites=8, ruido_alt=0.0):
+    """Rajada de um segundo do Air530: GGA, GSA, GSV, RMC, VTG."""
+    hora = f"{int(t // 3600) % 24:02d}{int(t // 60) % 60:02d}{t % 60:05.2f}"
+    if not com_fix:
+        return (
+            _nmea(f"GPGGA,{hora},,,,,0,00,99.9,,M,,M,,")
+            + _nmea("GPGSA,A,1,,,,,,,,,,,,,99.9,99.9,99.9")
+            + _nmea(f"GPRMC,{hora},V,,,,,,,010125,,,N")
+        )
+    lat, lon, alt = perfil.posicao(t)
+    lat_txt, ns = _ddmm(lat, "N", "S", 2)
+    lon_txt, eo = _ddmm(lon, "E", "W", 3)
+    nos = perfil.velocidade_horizontal(t) / 0.514444
+    return (
+        _nmea(f"GPGGA,{hora},{lat_txt},{ns},{lon_txt},{eo},1,{satelites:02d},0.9,{alt + ruido_alt:.1f},M,46.9,M,,")
+        + _nmea("GPGSA,A,3,01,03,06,11,14,17,19,22,,,,,1.6,0.9,1.3")
+        + _nmea("GPGSV,2,1,08,01,45,083,38,03,22,310,33,06,67,201,41,11,12,045,29")
+        + _nmea(f"GPRMC,{hora},A,{lat_txt},{ns},{lon_txt},{eo},{nos:.2f},72.0,010125,,,A")
+        + _nmea(f"GPVTG,72.0,T,,M,{nos:.2f},N,{nos * 1.852:.2f},K,A")
+    )
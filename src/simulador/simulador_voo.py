@@ -0,0 +1,284 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Simulador de voo (hardware-in-the-loop num PC) *********
+#
+# Corre o script de voo verdadeiro (mati1 ou matiB) com sensores,
+# GPIO, GPS e UART falsos (ver hardware_falso.py), a seguir um perfil
+# de subida/descida (ver perfil_voo.py) e mais depressa que o tempo
+# real. No fim mostra:
+#   - atrasos e duracoes das tarefas do escalonador
+#   - transicoes de fase detetadas vs. esperadas pelo perfil
+#   - fotografias tiradas e estatisticas da captura
+#   - tramas recebidas no lado da estacao (pty) e bytes por segundo
+#
+# Com --reinicio T o script e interrompido aos T segundos (corte de
+# energia) e arrancado de novo, para testar a retoma pelo ponto de
+# controlo. Com --ber o radio troca bits (em rajadas de --rajada bits)
+# e a estacao passa pelo DescodificadorFEC como a ground station
+# (--sem-fec desliga o FEC no script de voo, para comparar).
+#
+# Exemplos:
+#   python3 src/simulador/simulador_voo.py
+#   python3 src/simulador/simulador_voo.py --script matiB --fator 20 --json relatorio.json
+#   python3 src/simulador/simulador_voo.py --reinicio 90
+#   python3 src/simulador/simulador_voo.py --ber 1e-3 --rajada 8
+import argparse
+import importlib.util
+import json
+import os
+import select
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, redirect_stdout
+from os.path import dirname, abspath, join
+
+AQUI = dirname(abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, join(AQUI, "..", "comum"))
+
+import hardware_falso
+from hardware_falso import FimSimulacao, Mundo, RelogioAcelerado, UARTFalsa, modulos_falsos
+from perfil_voo import PerfilVoo
+from telemetria import DescodificadorTramas
+from fec import DescodificadorFEC
+
+SCRIPTS = {
+    "mati1": join(AQUI, "..", "mati1", "mati1_controlo_voo_CORRIGIDO.py"),
+    "matiB": join(AQUI, "..", "matiB", "matiB_controlo_voo.py"),
+}
+BAUD_APC220 = 9600
+
+
+class EstacaoSimulada(threading.Thread):
+    """Le o lado mestre do pty e descodifica as tramas, como a ground station."""
+
+    def __init__(self, uart, relogio):
+        super().__init__(daemon=True)
+        self.uart = uart
+        self.relogio = relogio
+        self.descodificador = DescodificadorTramas()
+        self.fec = DescodificadorFEC()
+        self.bytes = 0
+        self.tramas = []  # (tempo de rececao, trama)
+        self.ativa = True
+
+    def run(self):
+        while self.ativa:
+            try:
+                prontos, _, _ = select.select([self.uart.mestre], [], [], 0.05)
+                if not prontos:
+                    continue
+                dados = os.read(self.uart.mestre, 4096)
+            except (OSError, ValueError):
+                break
+            self.bytes += len(dados)
+            agora = self.relogio.monotonic()
+            for trama in self.descodificador.alimentar(self.fec.alimentar(dados)):
+                self.tramas.append((agora, trama))
+
+
+def _carregar_script(caminho, nome):
+    spec = importlib.util.spec_from_file_location(nome, caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def simular(script="mati1", perfil=None, fator=10.0, duracao=None, semente=1, saida=None, reinicio=None,
+            ber=0.0, rajada=1, fec=True):
+    """Corre um voo simulado e devolve o relatorio (dicionario)."""
+    perfil = perfil or PerfilVoo()
+    if duracao is None:
+        # Tempo para a aterragem ser confirmada (janela de 20 s) com margem
+        duracao = perfil.tempo_aterragem + 40.0
+    pasta = tempfile.mkdtemp(prefix="sim_mati_")
+
+    relogio = RelogioAcelerado(fator, duracao=duracao)
+    mundo = Mundo(perfil, relogio, semente=semente)
+    uart = UARTFalsa(ber, rajada, semente)
+    originais = {nome: sys.modules.get(nome) for nome in modulos_falsos(mundo, uart)}
+    hardware_falso.instalar_relogio(relogio)
+    sys.modules.update(modulos_falsos(mundo, uart))
+
+    observados = {}
+    fases_antes = []
+    estacao = EstacaoSimulada(uart, relogio)
+    estacao.start()
+    inicio_real = time.perf_counter()
+
+    def arrancar(nome):
+        modulo = _carregar_script(SCRIPTS[script], nome)
+        for constante in ("CAMINHO_FOTOS", "CAMINHO_REGISTOS"):
+            if hasattr(modulo, constante):
+                setattr(modulo, constante, pasta)
+        modulo.FICHEIRO_REGISTO = join(pasta, f"registo_{script}.bin")
+        modulo.FICHEIRO_CALIBRACAO = join(pasta, f"calibracao_{script}.json")
+        modulo.FICHEIRO_PONTO_CONTROLO = join(pasta, f"ponto_controlo_{script}.bin")
+        modulo.FEC_TELEMETRIA = fec
+
+        # Guardar as instancias criadas dentro de principal()
+        def observar(nome, classe):
+            def criar(*args, **kwargs):
+                observados[nome] = classe(*args, **kwargs)
+                return observados[nome]
+            setattr(modulo, nome, criar)
+        observar("Escalonador", modulo.Escalonador)
+        observar("MaquinaFases", modulo.MaquinaFases)
+        observar("Amostrador", modulo.Amostrador)
+        try:
+            modulo.principal()
+        except FimSimulacao:
+            pass
+        return modulo
+
+    try:
+        with ExitStack() as pilha:
+            # Sem saida pedida, o devnull e fechado no fim de cada simulacao
+            destino = saida if saida is not None else pilha.enter_context(open(os.devnull, "w"))
+            pilha.enter_context(redirect_stdout(destino))
+            if reinicio is not None:
+                relogio.duracao = reinicio
+                arrancar(f"{script}_simulado_antes")
+                # Corte de energia: o amostrador antigo para, o script arranca de novo
+                observados["Amostrador"].parar()
+                fases_antes = list(observados["MaquinaFases"].transicoes)
+                relogio.duracao = duracao
+            modulo = arrancar(f"{script}_simulado")
+            # Acabar as fotografias em curso antes de o relogio real ser reposto
+            if modulo.dispositivos.pronto("camara"):
+                modulo.dispositivos.obter("camara").parar(esperar=False)
+    finally:
+        duracao_real = time.perf_counter() - inicio_real
+        hardware_falso.remover_relogio()
+        estacao.ativa = False
+        estacao.join(1.0)
+        uart.fechar()
+        for nome, original in originais.items():
+            if original is None:
+                sys.modules.pop(nome, None)
+            else:
+                sys.modules[nome] = original
+
+    relatorio = _relatorio(script, perfil, fator, duracao, duracao_real, mundo, estacao, observados, modulo, pasta)
+    relatorio["radio"] = {"ber": ber, "rajada": rajada, "bits_trocados": uart.bits_trocados,
+                          **estacao.fec.estatisticas()}
+    if reinicio is not None:
+        relatorio["reinicio"] = reinicio
+        relatorio["fases"][:0] = [
+            {"tempo": tempo, "fase": fase, "altitude_real": perfil.altitude(tempo)} for tempo, fase in fases_antes
+        ]
+    return relatorio
+
+
+def _relatorio(script, perfil, fator, duracao, duracao_real, mundo, estacao, observados, modulo, pasta):
+    escalonador = observados.get("Escalonador")
+    maquina = observados.get("MaquinaFases")
+    tramas = estacao.tramas
+    janela_tramas = (tramas[-1][0] - tramas[0][0]) if len(tramas) > 1 else 0.0
+    dispositivos = modulo.dispositivos
+    captura = dispositivos.obter("camara") if dispositivos.pronto("camara") else None
+    return {
+        "script": script,
+        "fator": fator,
+        "duracao_simulada": duracao,
+        "duracao_real": duracao_real,
+        "pasta": pasta,
+        "escalonador": escalonador.estatisticas() if escalonador else {},
+        "fases": [
+            {"tempo": tempo, "fase": fase, "altitude_real": perfil.altitude(tempo)}
+            for tempo, fase in (maquina.transicoes if maquina else [])
+        ],
+        "fases_esperadas": [{"tempo": tempo, "fase": fase} for tempo, fase in perfil.fases_esperadas()],
+        "fotos": len(mundo.fotos),
+        "captura": captura.estatisticas() if captura else None,
+        "arranque": {
+            "primeira_trama": dispositivos.marcos.get("primeira_trama"),
+            "inicializacao": dispositivos.tempos_inicializacao,
+        },
+        "telemetria": {
+            "tramas": len(tramas),
+            "bytes": estacao.bytes,
+            "bytes_por_segundo": estacao.bytes / janela_tramas if janela_tramas else 0.0,
+            "orcamento_bytes_por_segundo": BAUD_APC220 / 10,
+            "erros_crc": estacao.descodificador.erros_crc,
+            "perdidas": estacao.descodificador.tramas_perdidas,
+            "sem_chave": estacao.descodificador.sem_chave,
+            "canais": dict(Counter(canal for _, trama in tramas for canal in trama.get("canais", ()))),
+        },
+        "leituras_bmp": mundo.leituras_bmp,
+        "bytes_nmea": mundo.bytes_nmea,
+        "arestas_gpio": mundo.arestas_gpio,
+    }
+
+
+def imprimir_relatorio(r):
+    print(f"[SIMULADOR] {r['script']}: {r['duracao_simulada']:.0f} s simulados em {r['duracao_real']:.1f} s "
+          f"(fator {r['fator']:g}), registos em {r['pasta']}")
+    print("[SIMULADOR] Escalonador (tempo simulado):")
+    for nome, e in r["escalonador"].items():
+        print(f"  {nome:>12}: periodo={e['periodo']:g} s execucoes={e['execucoes']} "
+              f"ultrapassagens={e['ultrapassagens']} perdidos={e['prazos_perdidos']} "
+              f"atraso_medio={e['atraso_medio'] * 1000:.1f} ms atraso_max={e['atraso_maximo'] * 1000:.1f} ms "
+              f"duracao_max={e['duracao_maxima'] * 1000:.1f} ms")
+    a = r["arranque"]
+    if a["primeira_trama"] is not None:
+        print(f"[SIMULADOR] Primeira trama apos {a['primeira_trama']:.2f} s simulados; inicializacao: "
+              + ", ".join(f"{nome} {segundos * 1000:.0f} ms" for nome, segundos in a["inicializacao"].items()))
+    if r.get("reinicio") is not None:
+        print(f"[SIMULADOR] Reinicio simulado em t={r['reinicio']:.1f} s")
+    print("[SIMULADOR] Fases detetadas:")
+    for f in r["fases"]:
+        print(f"  t={f['tempo']:7.1f} s  {f['fase']:<9} (altitude real {f['altitude_real']:.1f} m)")
+    print("[SIMULADOR] Fases esperadas: "
+          + ", ".join(f"{f['fase']} t={f['tempo']:.1f} s" for f in r["fases_esperadas"]))
+    print(f"[SIMULADOR] Fotografias: {r['fotos']}", end="")
+    if r["captura"]:
+        c = r["captura"]
+        print(f" (descartadas={c['descartadas']}, latencia_max={c['latencia_maxima'] * 1000:.0f} ms simulados)")
+    else:
+        print()
+    t = r["telemetria"]
+    print(f"[SIMULADOR] Telemetria: {t['tramas']} tramas, {t['bytes']} bytes, "
+          f"{t['bytes_por_segundo']:.1f} B/s de {t['orcamento_bytes_por_segundo']:.0f} B/s, "
+          f"erros_crc={t['erros_crc']} perdidas={t['perdidas']} sem_chave={t['sem_chave']}")
+    radio = r["radio"]
+    print(f"[SIMULADOR] Radio: ber={radio['ber']:g} rajada={radio['rajada']} bits_trocados={radio['bits_trocados']}, "
+          f"FEC: blocos={radio['blocos']} corrigidos={radio['corrigidos']} ({radio['bytes_corrigidos']} bytes) "
+          f"sem_correcao={radio['perdidos']}")
+    if t["canais"]:
+        print("[SIMULADOR] Envios por canal: " + ", ".join(f"{nome}={n}" for nome, n in t["canais"].items()))
+    print(f"[SIMULADOR] Leituras BMP: {r['leituras_bmp']}, bytes NMEA: {r['bytes_nmea']}, "
+          f"arestas GPIO: {r['arestas_gpio']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de voo do cansat Mati")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="mati1")
+    parser.add_argument("--fator", type=float, default=10.0, help="Aceleracao do tempo simulado")
+    parser.add_argument("--duracao", type=float, help="Segundos simulados (por omissao: ate depois da aterragem)")
+    parser.add_argument("--apogeu", type=float, default=500.0)
+    parser.add_argument("--descida", type=float, default=8.0, help="Velocidade de descida (m/s)")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--reinicio", type=float, help="Reiniciar o script aos T segundos simulados (corte de energia)")
+    parser.add_argument("--ber", type=float, default=0.0, help="Taxa de erros de bit do radio")
+    parser.add_argument("--rajada", type=int, default=1, help="Bits trocados por erro (rajadas)")
+    parser.add_argument("--sem-fec", action="store_true", help="Desligar o FEC no script de voo")
+    parser.add_argument("--json", help="Guardar o relatorio neste ficheiro")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Mostrar o output do script de voo")
+    args = parser.parse_args()
+
+    perfil = PerfilVoo(apogeu=args.apogeu, velocidade_descida=args.descida)
+    relatorio = simular(args.script, perfil, args.fator, args.duracao, args.semente,
+                        saida=sys.stdout if args.verbose else None, reinicio=args.reinicio,
+                        ber=args.ber, rajada=args.rajada, fec=not args.sem_fec)
+    imprimir_relatorio(relatorio)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(relatorio, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
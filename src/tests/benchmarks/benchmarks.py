@@ -0,0 +1,617 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Benchmarks dos caminhos criticos do voo e da estacao ***
+#
+# Mede o custo por chamada de cada caminho (mediana de varias
+# repeticoes) e compara com uma referencia guardada em JSON:
+#
+#   python3 benchmarks.py --guardar referencia.json     # no Pi / PC de referencia
+#   python3 benchmarks.py --comparar referencia.json    # falha se algo piorar
+#   python3 benchmarks.py --comparar referencia.json --limite 15 --filtro nmea
+#   python3 benchmarks.py --filtro ponto_controlo --pasta /mnt/fotos  # no cartao SD
+#
+# Os benchmarks com objetivo absoluto (ex.: ponto_controlo < 1 ms) sao
+# marcados ok/FALHA e, se algum falhar, o script sai com codigo 1.
+#
+# Os benchmarks "antigo_*" reproduzem o codigo anterior (JSON por linha,
+# CSV com flush, pynmea2, lista com slicing) para comparar com o atual.
+# Os que dependem de bibliotecas ausentes (matplotlib, cv2, pynmea2)
+# sao saltados.
+import argparse
+import io
+import json
+import math
+import platform
+import sys
+import tempfile
+import timeit
+from csv import writer
+from os.path import dirname, abspath, join
+from statistics import median
+
+AQUI = dirname(abspath(__file__))
+SRC = join(AQUI, "..", "..")
+sys.path.insert(0, join(SRC, "comum"))
+sys.path.insert(0, join(SRC, "simulador"))
+
+BENCHMARKS = {}
+OBJETIVOS = {}  # nome -> segundos por chamada que a mediana nao pode ultrapassar
+LIMPEZAS = []  # limpezas do benchmark atual, feitas depois de o medir
+PASTA = None  # pasta dos benchmarks de escrita (por omissao uma pasta temporaria)
+
+
+class Saltar(Exception):
+    pass
+
+
+def benchmark(nome, objetivo=None):
+    """Regista uma funcao de preparacao que devolve a funcao a medir.
+
+    objetivo: tempo maximo por chamada (s), verificado em cada corrida.
+    """
+    def registar(preparar):
+        BENCHMARKS[nome] = preparar
+        if objetivo is not None:
+            OBJETIVOS[nome] = objetivo
+        return preparar
+    return registar
+
+
+def ao_terminar(funcao):
+    """Regista uma limpeza (parar threads, fechar sockets) para quando o benchmark atual acabar."""
+    LIMPEZAS.append(funcao)
+
+
+def _limpar():
+    while LIMPEZAS:
+        LIMPEZAS.pop()()
+
+
+def pasta_escrita():
+    return tempfile.mkdtemp(dir=PASTA)
+
+
+def medir(funcao, repeticoes=5):
+    temporizador = timeit.Timer(funcao)
+    numero, _ = temporizador.autorange()
+    tempos = temporizador.repeat(repeat=repeticoes, number=numero)
+    return median(tempos) / numero
+
+
+_script_voo = None
+
+
+def script_voo():
+    """Modulo mati1 carregado com o hardware falso do simulador."""
+    global _script_voo
+    if _script_voo is None:
+        import importlib.util
+        import hardware_falso
+        from perfil_voo import PerfilVoo
+        relogio = hardware_falso.RelogioAcelerado(1.0)
+        uart = hardware_falso.UARTFalsa()
+        falsos = hardware_falso.modulos_falsos(hardware_falso.Mundo(PerfilVoo(), relogio), uart)
+        originais = {nome: sys.modules.get(nome) for nome in falsos}
+        sys.modules.update(falsos)
+        try:
+            caminho = join(SRC, "mati1", "mati1_controlo_voo_CORRIGIDO.py")
+            spec = importlib.util.spec_from_file_location("mati1_benchmark", caminho)
+            _script_voo = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(_script_voo)
+        finally:
+            for nome, original in originais.items():
+                if original is None:
+                    sys.modules.pop(nome, None)
+                else:
+                    sys.modules[nome] = original
+            uart.fechar()
+    return _script_voo
+
+
+def rajada_nmea():
+    from perfil_voo import PerfilVoo, frases_nmea
+    return frases_nmea(100.0, PerfilVoo())
+
+
+# ---------------------------------------------------------------- bordo
+
+@benchmark("calcular_altura")
+def _():
+    calcular_altura = script_voo().calcular_altura
+    return lambda: calcular_altura(95000.0, 101325.0)
+
+
+@benchmark("antigo_telemetria_json")
+def _():
+    from json import dumps
+    dados = {"d": "20250417_101010", "t": 21.37, "p": 100512.42, "h": 72.31, "la": 38.677512, "lo": -9.161734, "hG": 132.4}
+    return lambda: (dumps(dados) + "\n").encode("utf-8")
+
+
+@benchmark("telemetria_binaria")
+def _():
+    from telemetria import codificar_trama
+    return lambda: codificar_trama(1234, 1744884610.25, 21.37, 100512.42, 72.31, 38.677512, -9.161734, 132.4)
+
+
+@benchmark("telemetria_adaptativa")
+def _():
+    # Um slot de envio: atualizar os canais, escolher os devidos e codificar
+    from telemetria_adaptativa import TelemetriaAdaptativa
+    canais = script_voo().canais_telemetria()
+    downlink = TelemetriaAdaptativa(canais, relogio=lambda: 0.0)
+    downlink.definir_fase("descida")
+    estado = {"agora": 0.0, "seq": 0}
+
+    def slot():
+        estado["agora"] += 0.2
+        estado["seq"] += 1
+        agora = estado["agora"]
+        downlink.atualizar(agora, t=21.37, p=100512.42 - agora, h=72.31 - agora * 8, v=-8.0, fase="descida",
+                           gps=(38.677512, -9.161734, 132.4))
+        return downlink.proxima_trama(estado["seq"], 1744884610.25 + agora, agora)
+    return slot
+
+
+@benchmark("telemetria_delta")
+def _():
+    from telemetria import CompressorTelemetria
+    compressor = CompressorTelemetria(5.0)
+    estado = {"seq": 0}
+
+    def codificar():
+        estado["seq"] += 1
+        i = estado["seq"] % 300  # descida de 60 s, repetida
+        return compressor.codificar(estado["seq"], 1744884610.25 + estado["seq"] * 0.2, {
+            "t": 21.37, "p": 95000.0 + i * 2, "h": 500.0 - i * 1.6, "v": -8.0,
+            "gps": (38.677512, -9.161734, 560.0 - i * 1.6)})
+    return codificar
+
+
+@benchmark("fec_proteger")
+def _():
+    from fec import CodificadorFEC
+    from telemetria import codificar_trama
+    trama = codificar_trama(1234, 1744884610.25, 21.37, 100512.42, 72.31, 38.677512, -9.161734, 132.4)
+    return lambda: CodificadorFEC().proteger(trama)
+
+
+@benchmark("fec_corrigir")
+def _():
+    # Pior caso corrigivel: 4 bytes errados no bloco
+    from fec import CABECALHO_FEC, CodificadorFEC, rs_corrigir
+    from telemetria import codificar_trama
+    trama = codificar_trama(1234, 1744884610.25, 21.37, 100512.42, 72.31, 38.677512, -9.161734, 132.4)
+    bloco = bytearray(CodificadorFEC().proteger(trama)[CABECALHO_FEC:])
+    for posicao in (3, 11, 20, 33):
+        bloco[posicao] ^= 0x5A
+    return lambda: rs_corrigir(bloco)
+
+
+@benchmark("descodificar_trama")
+def _():
+    from telemetria import codificar_trama, DescodificadorTramas
+    trama = codificar_trama(1234, 1744884610.25, 21.37, 100512.42, 72.31, 38.677512, -9.161734, 132.4)
+    descodificador = DescodificadorTramas()
+    return lambda: descodificador.alimentar(trama)
+
+
+@benchmark("antigo_csv_flush")
+def _():
+    f = open(join(pasta_escrita(), "registo.csv"), "w", newline="")
+    writer_csv = writer(f)
+    linha = ["20250417_101010", 21.37, 100512.42, 72.31, 38.677512, -9.161734, 132.4]
+
+    def escrever():
+        writer_csv.writerow(linha)
+        f.flush()
+    return escrever
+
+
+@benchmark("registo_binario")
+def _():
+    from registo import RegistoVoo
+    registo_voo = RegistoVoo(join(pasta_escrita(), "registo.bin"))
+    return lambda: registo_voo.escrever(1744884610.25, 21.37, 100512.42, 72.31, 38.677512, -9.161734, 132.4)
+
+
+def _ponto_controlo(sincronizar):
+    from ponto_controlo import PontoControlo, EstadoVoo
+    ponto = PontoControlo(join(pasta_escrita(), "ponto_controlo.bin"), sincronizar=sincronizar)
+    estado = EstadoVoo(1744884610.25, "descida", 100605.4, 499.8, 12, 88, 877, 51000)
+    return lambda: ponto.guardar(estado)
+
+
+@benchmark("ponto_controlo", objetivo=1e-3)
+def _():
+    # Objetivo: < 1 ms por gravacao (pwrite + fdatasync) no cartao SD
+    return _ponto_controlo(True)
+
+
+@benchmark("ponto_controlo_sem_sync")
+def _():
+    return _ponto_controlo(False)
+
+
+@benchmark("ponto_controlo_json_rename")
+def _():
+    # Alternativa comparada: JSON num ficheiro temporario + fsync + rename
+    from calibracao import guardar_referencia
+    caminho = join(pasta_escrita(), "ponto_controlo.json")
+    return lambda: guardar_referencia(caminho, 100605.4, fase="descida", altitude_maxima=499.8, fotos=12,
+                                      seq_telemetria=88, registos=877, offset_registo=51000)
+
+
+@benchmark("antigo_nmea_pynmea2")
+def _():
+    try:
+        import pynmea2
+    except ImportError:
+        raise Saltar("pynmea2 nao instalado")
+    dados = rajada_nmea()
+
+    def ler():
+        # Copia do ciclo antigo de iniciar_gps()
+        buffer = ""
+        buffer += dados.decode("utf-8", errors="ignore")
+        linhas = buffer.split("\r\n")
+        for linha in linhas[:-1]:
+            if linha.startswith("$"):
+                try:
+                    msg = pynmea2.parse(linha)
+                    if isinstance(msg, pynmea2.types.talker.GGA):
+                        (float(msg.latitude), float(msg.longitude), float(msg.altitude))
+                except Exception:
+                    pass
+    return ler
+
+
+@benchmark("nmea_leitor_gps")
+def _():
+    from gps import LeitorGPS
+    dados = rajada_nmea()
+    leitor = LeitorGPS(lambda fix: None)
+    return lambda: leitor.alimentar(dados)
+
+
+@benchmark("antigo_janela_solo_lista")
+def _():
+    estado = {"registo": [float(i % 7) for i in range(200)]}
+
+    def verificar():
+        registo = estado["registo"]
+        registo.append(3.0)
+        registo = registo[-200:]
+        estado["registo"] = registo
+        return max(registo) - min(registo) < 1.0
+    return verificar
+
+
+@benchmark("janela_solo_deslizante")
+def _():
+    from janela import JanelaDeslizante
+    janela = JanelaDeslizante(200, 0.1)
+    for i in range(200):
+        janela.adicionar(float(i % 7))
+
+    def verificar():
+        janela.adicionar(3.0)
+        return janela.amplitude < 1.0
+    return verificar
+
+
+@benchmark("estimador_kalman")
+def _():
+    from estimador import EstimadorAltitude
+    estimador = EstimadorAltitude()
+    estado = {"t": 0.0}
+
+    def atualizar():
+        estado["t"] += 0.1
+        estimador.atualizar_baro(estado["t"], 100.0)
+    return atualizar
+
+
+# ------------------------------------------------------- ground station
+
+def _matplotlib():
+    try:
+        import matplotlib
+    except ImportError:
+        raise Saltar("matplotlib nao instalado")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+@benchmark("antigo_estacao_atualizar_1h")
+def _():
+    plt = _matplotlib()
+    n = 3600  # uma hora a 1 Hz
+    tempos = [i / 60 for i in range(n)]
+    valores = [float(i % 100) for i in range(n)]
+    fig, eixos = plt.subplots(4, 1, figsize=(10, 8), tight_layout=True)
+
+    def atualizar():
+        # Copia do redesenho de atualizar(): clear + plot de tudo + legendas
+        for ax in eixos:
+            ax.clear()
+            ax.plot(tempos, valores, label="x")
+            ax.set_ylabel("y")
+            ax.legend()
+            ax.grid(True)
+        fig.canvas.draw()
+    return atualizar
+
+
+@benchmark("estacao_rececao")
+def _():
+    # Thread de rececao: FEC + tramas + fila, 10 tramas por leitura da porta
+    sys.path.insert(0, join(SRC, "groundstation"))
+    from fec import CodificadorFEC
+    from rececao import Rececao
+    from telemetria import codificar_trama
+    fec = CodificadorFEC()
+    bloco = b"".join(fec.proteger(codificar_trama(n, 1744884610.25 + n / 5, 21.37, 100512.42, 72.31,
+                                                  38.677512, -9.161734, 132.4)) for n in range(10))
+    rececao = Rececao(None)
+
+    def processar():
+        rececao.processar(bloco)
+        rececao.consumir()
+    return processar
+
+
+@benchmark("estacao_ingestao")
+def _():
+    # Como estacao_rececao, mas distribuido por 4 destinos em threads
+    # (csv, bin, colunar, tcp); so conta o custo na thread de rececao
+    sys.path.insert(0, join(SRC, "groundstation"))
+    from debito_ingestao import gerar_tramas
+    from ingestao import Ingestao, criar_destinos
+    bloco = b"".join(gerar_tramas(10))
+    ingestao = Ingestao(None, criar_destinos(["csv", "bin", "colunar", "tcp"], join(pasta_escrita(), "gs"),
+                                             tcp_porta=0))
+    for trabalhador in ingestao.trabalhadores:
+        trabalhador.start()
+    ao_terminar(ingestao.parar)
+
+    def processar():
+        ingestao.rececao.processar(bloco)
+    return processar
+
+
+def _grafico_vivo(amostras):
+    """Frame do GraficoVivo (blitting) depois de amostras a 5 Hz."""
+    plt = _matplotlib()
+    sys.path.insert(0, join(SRC, "groundstation"))
+    from graficos import GraficoVivo
+    fig, eixos = plt.subplots(4, 1, figsize=(10, 8), tight_layout=True)
+    grafico = GraficoVivo(fig, eixos, [("t", "T", "T"), ("p", "P", "P"), ("h", "h", "h"), ("hG", "hG", "hG")])
+    estado = {"i": 0}
+
+    def adicionar():
+        i = estado["i"]
+        estado["i"] += 1
+        # Sinal lento (subida/descida) com algum ruido, como a telemetria real
+        h = 500.0 * (1 - math.cos(i / 30000)) + (i * 7919 % 13) / 13
+        grafico.adicionar(i / 300, t=20.0 - h * 0.0065, p=101325.0 - h * 12.0, h=h, hG=h + (i * 104729 % 7) - 3)
+
+    for _ in range(amostras):
+        adicionar()
+    grafico.atualizar()
+
+    def frame():
+        adicionar()
+        grafico.atualizar()
+    return frame
+
+
+@benchmark("estacao_historico")
+def _():
+    # Uma amostra + vista para o grafico, com 24 h a 5 Hz ja no historico
+    sys.path.insert(0, join(SRC, "groundstation"))
+    from historico import HistoricoMultiResolucao
+    historico = HistoricoMultiResolucao()
+    estado = {"i": 0}
+
+    def adicionar():
+        estado["i"] += 1
+        historico.adicionar(estado["i"] / 300, float(estado["i"] % 100))
+
+    for _ in range(5 * 3600 * 24):
+        adicionar()
+
+    def frame():
+        adicionar()
+        return historico.dados()
+    return frame
+
+
+@benchmark("estacao_grafico_1min")
+def _():
+    return _grafico_vivo(300)
+
+
+@benchmark("estacao_grafico_1h")
+def _():
+    return _grafico_vivo(5 * 3600)
+
+
+def _mapa_vivo(pontos):
+    """Frame do MapaVivo com pontos GPS ja no trajeto (sem tiles: so o custo do trajeto)."""
+    plt = _matplotlib()
+    sys.path.insert(0, join(SRC, "groundstation"))
+    from mapa import MapaVivo
+    from mapa_tiles import CacheTiles
+    fig, ax = plt.subplots(figsize=(7, 7))
+    mapa = MapaVivo(fig, ax, CacheTiles(pasta_escrita()))
+    estado = {"i": 0}
+
+    def adicionar():
+        # Espiral lenta a descer com o vento, ~1 m entre posicoes
+        i = estado["i"]
+        estado["i"] += 1
+        angulo = i / 500
+        mapa.adicionar(38.6775 + 0.004 * math.sin(angulo) - i * 2e-7, -9.1617 + 0.005 * math.cos(angulo))
+
+    for _ in range(pontos):
+        adicionar()
+    mapa.definir_previsao(38.675, -9.16, 150.0)
+    mapa.atualizar()
+
+    def frame():
+        adicionar()
+        mapa.atualizar()
+    return frame
+
+
+@benchmark("estacao_previsao")
+def _():
+    # Uma trama a meio da descida + Monte Carlo de 2000 aterragens
+    sys.path.insert(0, join(SRC, "groundstation"))
+    from perfil_voo import PerfilVoo
+    from previsao import PrevisorAterragem
+    from previsao_aterragem import tramas_voo
+    perfil = PerfilVoo()
+    tramas = [dados for t, dados in tramas_voo(perfil) if perfil.tempo_apogeu + 5 < t < perfil.tempo_aterragem - 5]
+    previsor = PrevisorAterragem()
+    estado = {"i": 0}
+
+    def frame():
+        previsor.adicionar(tramas[estado["i"] % len(tramas)])
+        estado["i"] += 1
+        if estado["i"] % len(tramas) == 0:
+            previsor.__init__()  # recomecar a descida
+        previsor.prever()
+    return frame
+
+
+@benchmark("estacao_mapa_1k")
+def _():
+    return _mapa_vivo(1000)
+
+
+@benchmark("estacao_mapa_100k")
+def _():
+    return _mapa_vivo(100000)
+
+
+# ----------------------------------------------------------------- NDVI
+
+def _ndvi():
+    try:
+        import cv2
+    except ImportError:
+        raise Saltar("cv2 nao instalado")
+    _matplotlib()
+    sys.path.insert(0, join(SRC, "ndvi"))
+    import ndvi_fusao
+    pasta = join(SRC, "tests", "NDVI")
+    im_normal = cv2.cvtColor(cv2.imread(join(pasta, "normal.jpg")), cv2.COLOR_BGR2RGB)
+    im_noir = cv2.cvtColor(cv2.imread(join(pasta, "noir.jpg")), cv2.COLOR_BGR2RGB)
+    return ndvi_fusao, im_normal, im_noir
+
+
+@benchmark("ndvi_calcular")
+def _():
+    ndvi_fusao, im_normal, im_noir = _ndvi()
+    return lambda: ndvi_fusao.calcular_ndvi(im_normal, im_noir)
+
+
+@benchmark("ndvi_alinhar")
+def _():
+    ndvi_fusao, im_normal, im_noir = _ndvi()
+    return lambda: ndvi_fusao.alinhar_imagens(im_normal, im_noir)
+
+
+# ----------------------------------------------------------------------
+
+def correr(filtro=None, repeticoes=5):
+    resultados = {}
+    for nome, preparar in BENCHMARKS.items():
+        if filtro and filtro not in nome:
+            continue
+        try:
+            try:
+                with io.StringIO() as saida:
+                    stdout, sys.stdout = sys.stdout, saida
+                    try:
+                        funcao = preparar()
+                    finally:
+                        sys.stdout = stdout
+            except Saltar as e:
+                print(f"[BENCH] {nome:<30} saltado ({e})")
+                continue
+            resultados[nome] = medir(funcao, repeticoes)
+        finally:
+            _limpar()
+        objetivo = ""
+        if nome in OBJETIVOS:
+            estado = "ok" if resultados[nome] <= OBJETIVOS[nome] else "FALHA"
+            objetivo = f"  (objetivo < {OBJETIVOS[nome] * 1e6:g} us: {estado})"
+        print(f"[BENCH] {nome:<30} {resultados[nome] * 1e6:12.2f} us{objetivo}")
+    return resultados
+
+
+def objetivos_falhados(resultados):
+    return [nome for nome, tempo in resultados.items() if nome in OBJETIVOS and tempo > OBJETIVOS[nome]]
+
+
+def comparar(resultados, referencia, limite):
+    regressoes = []
+    print(f"\n[BENCH] Comparacao com a referencia (limite {limite:g}%):")
+    for nome, tempo in resultados.items():
+        if nome not in referencia:
+            print(f"  {nome:<30} {'novo':>10}")
+            continue
+        variacao = (tempo / referencia[nome] - 1) * 100
+        estado = "REGRESSAO" if variacao > limite else "ok"
+        print(f"  {nome:<30} {variacao:+9.1f}%  {estado}")
+        if variacao > limite:
+            regressoes.append(nome)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do cansat Mati")
+    parser.add_argument("--guardar", help="Guardar os resultados como referencia neste JSON")
+    parser.add_argument("--comparar", help="Comparar com a referencia guardada neste JSON")
+    parser.add_argument("--limite", type=float, default=20.0, help="Piora maxima aceite, em %%")
+    parser.add_argument("--filtro", help="So correr benchmarks cujo nome contem este texto")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--pasta", help="Pasta para os benchmarks de escrita (ex.: cartao SD)")
+    args = parser.parse_args()
+
+    global PASTA
+    PASTA = args.pasta
+
+    resultados = correr(args.filtro, args.repeticoes)
+    falhados = objetivos_falhados(resultados)
+    codigo = 0
+
+    if args.guardar:
+        with open(args.guardar, "w") as f:
+            json.dump({
+                "maquina": platform.node(),
+                "python": platform.python_version(),
+                "segundos_por_chamada": resultados,
+            }, f, indent=2)
+        print(f"[BENCH] Referencia guardada em {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            referencia = json.load(f)["segundos_por_chamada"]
+        regressoes = comparar(resultados, referencia, args.limite)
+        if regressoes:
+            print(f"[BENCH] {len(regressoes)} regressoes: {', '.join(regressoes)}")
+            codigo = 1
+
+    if falhados:
+        print(f"[BENCH] Objetivo falhado: {', '.join(falhados)}")
+        codigo = 1
+    sys.exit(codigo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Teste de carga do servidor web da ground station *******
+#
+# Liga um enxame de clientes WebSocket (noutro processo, para nao
+# dividirem o GIL com o servidor) ao ServidorWeb verdadeiro e envia
+# tramas sinteticas pelo mesmo Trabalhador que a ingestao usa. Alguns
+# clientes sao "lentos": ligam-se e nunca leem, como um browser com o
+# separador em segundo plano, e devem ser desligados sem atrasar os
+# outros.
+#
+# No fim mostra, para os clientes normais, tramas recebidas e o atraso
+# desde a entrega a ingestao (p50 / p99 / maximo), quantos lentos foram
+# desligados e o CPU gasto pelo processo do servidor.
+#
+#   python3 carga_web.py
+#   python3 carga_web.py --clientes 100 --lentos 10 --taxa 50 --duracao 30
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from os.path import dirname, abspath, join
+
+AQUI = dirname(abspath(__file__))
+SRC = join(AQUI, "..", "..")
+sys.path.insert(0, join(SRC, "comum"))
+sys.path.insert(0, join(SRC, "groundstation"))
+
+from destinos import Trabalhador
+from servidor_web import ServidorWeb, ler_frame_ws
+
+HISTORICO = 1500  # tramas ja no servidor quando os clientes chegam (5 min a 5 Hz)
+
+
+def trama_sintetica(n):
+    tempo = time.time()
+    return {"n": n, "ts": tempo, "d": time.strftime("%Y%m%d_%H%M%S", time.localtime(tempo)),
+            "t": 18.25, "p": 97812.4, "h": 312.45, "v": None, "la": 38.6775123, "lo": -9.1617456,
+            "hG": 318.2, "f": None, "canais": ["t", "p", "h", "gps"], "tempo_min": n / 300}
+
+
+# ------------------------------------------------------------ enxame
+
+async def _ligar(endereco, ler=True):
+    leitor, escritor = await asyncio.open_connection(*endereco)
+    if not ler:
+        # Buffer de rececao pequeno: o servidor sente o cliente parado mais cedo
+        escritor.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    chave = base64.b64encode(os.urandom(16)).decode("ascii")
+    escritor.write((f"GET /ws HTTP/1.1\r\nHost: {endereco[0]}:{endereco[1]}\r\nUpgrade: websocket\r\n"
+                    f"Connection: Upgrade\r\nSec-WebSocket-Key: {chave}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+                    ).encode("latin-1"))
+    resposta = await leitor.readuntil(b"\r\n\r\n")
+    if not resposta.startswith(b"HTTP/1.1 101"):
+        raise ConnectionError(resposta.split(b"\r\n")[0].decode("latin-1"))
+    return leitor, escritor
+
+
+async def _cliente(endereco, fim, resultado):
+    leitor, escritor = await _ligar(endereco)
+    try:
+        while time.time() < fim:
+            try:
+                _, dados = await asyncio.wait_for(ler_frame_ws(leitor), fim - time.time())
+            except asyncio.TimeoutError:
+                break
+            agora = time.time()
+            mensagem = json.loads(dados)
+            if isinstance(mensagem, list):
+                resultado["historico"] = len(mensagem)
+            else:
+                resultado["tramas"] += 1
+                resultado["atrasos"].append(agora - mensagem["ts"])
+    except (asyncio.IncompleteReadError, ConnectionError):
+        resultado["desligado"] = True
+    escritor.close()
+
+
+async def _cliente_lento(endereco, fim, resultado):
+    leitor, escritor = await _ligar(endereco, ler=False)
+    await asyncio.sleep(max(fim - time.time(), 0))
+    escritor.close()
+
+
+async def _enxame(endereco, clientes, lentos, fim, pronto):
+    resultados = [{"tramas": 0, "atrasos": [], "historico": 0, "desligado": False} for _ in range(clientes)]
+    tarefas = [asyncio.ensure_future(_cliente(endereco, fim, r)) for r in resultados]
+    tarefas += [asyncio.ensure_future(_cliente_lento(endereco, fim, {})) for _ in range(lentos)]
+    pronto.set()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    return resultados
+
+
+def enxame(endereco, clientes, lentos, fim, pronto, saida):
+    saida.put(asyncio.run(_enxame(endereco, clientes, lentos, fim, pronto)))
+
+
+# ------------------------------------------------------------ servidor
+
+def _percentil(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+def correr(clientes=50, lentos=5, taxa=20.0, duracao=30.0, capacidade_cliente=256):
+    servidor = ServidorWeb(porta=0, historico=HISTORICO, capacidade_cliente=capacidade_cliente)
+    servidor.escrever_lote([trama_sintetica(n) for n in range(HISTORICO)])
+    trabalhador = Trabalhador(servidor)
+    trabalhador.start()
+
+    ligacao = 5.0  # s para os clientes se ligarem antes de comecar
+    fim = time.time() + ligacao + duracao + 3.0
+    pronto = multiprocessing.Event()
+    saida = multiprocessing.Queue()
+    processo = multiprocessing.Process(target=enxame, args=(servidor.endereco, clientes, lentos, fim, pronto, saida))
+    processo.start()
+    pronto.wait(10)
+    limite = time.time() + ligacao
+    while servidor.estatisticas()["clientes"] < clientes + lentos and time.time() < limite:
+        time.sleep(0.05)
+    ligados = servidor.estatisticas()["clientes"]
+    time.sleep(1.0)  # os clientes ainda estao a ler o historico
+
+    cpu = time.process_time()
+    inicio = time.perf_counter()
+    enviadas = 0
+    while time.perf_counter() - inicio < duracao:
+        trabalhador.entregar(trama_sintetica(HISTORICO + enviadas))
+        enviadas += 1
+        time.sleep(max(inicio + enviadas / taxa - time.perf_counter(), 0))
+    cpu = time.process_time() - cpu
+
+    resultados = saida.get()
+    processo.join()
+    trabalhador.parar()
+    atrasos = [a for r in resultados for a in r["atrasos"]]
+    estatisticas = servidor.estatisticas()
+    return {
+        "ligados": ligados,
+        "enviadas": enviadas,
+        "recebidas_min": min(r["tramas"] for r in resultados),
+        "recebidas_media": sum(r["tramas"] for r in resultados) / len(resultados),
+        "historico_recebido": min(r["historico"] for r in resultados),
+        "normais_desligados": sum(r["desligado"] for r in resultados),
+        "atraso_p50": _percentil(atrasos, 0.5),
+        "atraso_p99": _percentil(atrasos, 0.99),
+        "atraso_max": max(atrasos, default=float("nan")),
+        "lentos_desligados": estatisticas["desligados_lentos"],
+        "cpu": cpu / duracao,
+        "mensagens": estatisticas["mensagens"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor WebSocket")
+    parser.add_argument("--clientes", type=int, default=50, help="clientes que leem tudo")
+    parser.add_argument("--lentos", type=int, default=5, help="clientes que nunca leem")
+    parser.add_argument("--taxa", type=float, default=20.0, help="tramas/s (o cansat envia 5)")
+    parser.add_argument("--duracao", type=float, default=30.0, help="s")
+    parser.add_argument("--capacidade", type=int, default=256, help="mensagens em fila por cliente")
+    args = parser.parse_args()
+
+    r = correr(args.clientes, args.lentos, args.taxa, args.duracao, args.capacidade)
+    print(f"[BENCH] {r['ligados']} clientes ligados, {r['enviadas']} tramas a {args.taxa:g}/s durante "
+          f"{args.duracao:g} s")
+    print(f"  normais: historico {r['historico_recebido']} tramas, recebidas min {r['recebidas_min']} "
+          f"media {r['recebidas_media']:.1f}, desligados {r['normais_desligados']}")
+    print(f"  atraso: p50 {r['atraso_p50'] * 1000:.1f} ms, p99 {r['atraso_p99'] * 1000:.1f} ms, "
+          f"max {r['atraso_max'] * 1000:.1f} ms")
+    print(f"  lentos desligados: {r['lentos_desligados']}/{args.lentos}")
+    print(f"  servidor: {r['mensagens']} mensagens WebSocket, CPU {r['cpu']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Bytes por amostra dos formatos de telemetria ***********
+#
+# Codifica as amostras de um voo gravado (registo .bin do mati1, ou CSV
+# do mati1 / da ground station) em cada formato de telemetria e compara
+# o tamanho:
+#
+#   json   linha JSON antiga ({"d": ..., "t": ..., ...}\n)
+#   v1     trama binaria fixa (36 B)
+#   v2     trama multicanal com todos os canais
+#   v3     tramas delta com trama chave a cada --chave segundos
+#
+# Sem ficheiros, usa um voo sintetico do perfil do simulador (10 Hz,
+# com ruido). Com --perda, descarta tramas v3 ao acaso e conta quantas
+# a estacao consegue descodificar.
+#
+#   python3 compressao.py /mnt/fotos/registo_mati1.bin
+#   python3 compressao.py voo.csv --chave 2 --perda 0.05
+import argparse
+import json
+import random
+import sys
+from os.path import dirname, abspath, join
+from time import strftime, localtime
+
+AQUI = dirname(abspath(__file__))
+SRC = join(AQUI, "..", "..")
+sys.path.insert(0, join(SRC, "comum"))
+sys.path.insert(0, join(SRC, "simulador"))
+
+from telemetria import (TAMANHO_TRAMA, CompressorTelemetria, DescodificadorTramas,
+                        codificar_trama_multicanal)
+
+
+def voo_sintetico(periodo=0.1, semente=1):
+    """Amostras (timestamp, t, p, h, la, lo, hG) de um voo do simulador."""
+    from perfil_voo import PerfilVoo
+    perfil = PerfilVoo()
+    aleatorio = random.Random(semente)
+    inicio = 1744884610.0
+    pressao_rampa = 101325.0 - 720.0
+    amostras = []
+    for i in range(int((perfil.tempo_aterragem + 30.0) / periodo)):
+        t = i * periodo
+        h = perfil.altitude(t)
+        la, lo, hG = perfil.posicao(t)
+        pressao = pressao_rampa * (1 - h / 44330) ** 5.255 + aleatorio.gauss(0, 3.0)
+        amostras.append((inicio + t, 21.0 - h * 0.0065 + aleatorio.gauss(0, 0.05), pressao,
+                         h + aleatorio.gauss(0, 0.3), la + aleatorio.gauss(0, 2e-6),
+                         lo + aleatorio.gauss(0, 2e-6), hG + aleatorio.gauss(0, 1.5)))
+    return amostras
+
+
+def ler_voo(caminho):
+    if caminho.endswith(".bin"):
+        from registo import ler_registo
+        return ler_registo(caminho)
+    from registo_colunar import ler_csv
+    return list(ler_csv(caminho))
+
+
+def _valores(amostra):
+    _, t, p, h, la, lo, hG = amostra
+    valores = {"t": t, "p": p, "h": h}
+    valores["gps"] = None if la is None or lo is None or hG is None else (la, lo, hG)
+    return {nome: valor for nome, valor in valores.items() if valor is not None}
+
+
+def _arredondar(valor, casas):
+    return None if valor is None else round(valor, casas)
+
+
+def linha_json(amostra):
+    timestamp, t, p, h, la, lo, hG = amostra
+    # Como o script de voo antigo: t, p e h arredondados, gps como vem do NMEA
+    dados = {"d": strftime("%Y%m%d_%H%M%S", localtime(int(timestamp))),
+             "t": _arredondar(t, 2), "p": _arredondar(p, 2), "h": _arredondar(h, 2),
+             "la": la, "lo": lo, "hG": _arredondar(hG, 1)}
+    return (json.dumps(dados) + "\n").encode("utf-8")
+
+
+def comparar(amostras, periodo_chave=5.0, perda=0.0, semente=1):
+    compressor = CompressorTelemetria(periodo_chave)
+    descodificador = DescodificadorTramas()
+    aleatorio = random.Random(semente)
+    totais = {"json": 0, "v1": 0, "v2": 0, "v3": 0}
+    descartadas = 0
+    for seq, amostra in enumerate(amostras):
+        valores = _valores(amostra)
+        totais["json"] += len(linha_json(amostra))
+        totais["v1"] += TAMANHO_TRAMA
+        totais["v2"] += len(codificar_trama_multicanal(seq, amostra[0], valores))
+        trama, _ = compressor.codificar(seq, amostra[0], valores)
+        totais["v3"] += len(trama)
+        if aleatorio.random() < perda:
+            descartadas += 1
+            continue
+        descodificador.alimentar(trama)
+    return {
+        "amostras": len(amostras),
+        "bytes_por_amostra": {formato: total / len(amostras) for formato, total in totais.items()},
+        "chaves": compressor.chaves,
+        "deltas": compressor.deltas,
+        "descartadas": descartadas,
+        "descodificadas": descodificador.tramas_ok,
+        "sem_chave": descodificador.sem_chave,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por amostra: JSON vs tramas binarias")
+    parser.add_argument("ficheiros", nargs="*", help="registos .bin ou CSV (por omissao: voo sintetico)")
+    parser.add_argument("--chave", type=float, default=5.0, help="periodo das tramas chave (s)")
+    parser.add_argument("--perda", type=float, default=0.0, help="fracao de tramas v3 perdidas")
+    args = parser.parse_args()
+
+    voos = [(caminho, ler_voo(caminho)) for caminho in args.ficheiros] or [("sintetico", voo_sintetico())]
+    for nome, amostras in voos:
+        if not amostras:
+            print(f"[COMPRESSAO] {nome}: sem amostras")
+            continue
+        r = comparar(amostras, args.chave, args.perda)
+        json_bytes = r["bytes_por_amostra"]["json"]
+        print(f"[COMPRESSAO] {nome}: {r['amostras']} amostras, chave a cada {args.chave:g} s "
+              f"({r['chaves']} chaves, {r['deltas']} deltas)")
+        for formato, media in r["bytes_por_amostra"].items():
+            print(f"  {formato:5s} {media:6.1f} B/amostra  ({media / json_bytes:5.1%} do JSON)")
+        if args.perda:
+            print(f"  perdidas={r['descartadas']} descodificadas={r['descodificadas']} "
+                  f"sem_chave={r['sem_chave']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Debito maximo da ingestao da ground station ************
+#
+# Gera tramas sinteticas (voo do simulador, tramas chave + delta com
+# FEC, como o mati1) e escreve-as o mais depressa possivel num pty. Do
+# outro lado corre a Ingestao verdadeira (pyserial + Rececao + destinos
+# numa pasta temporaria) e no fim mostra tramas/s, o atraso de cada
+# destino e quantas tramas cada um perdeu.
+#
+# Com --lento S junta um destino que demora S segundos por lote, para
+# confirmar que um destino lento nao atrasa a rececao nem os outros.
+#
+#   python3 debito_ingestao.py
+#   python3 debito_ingestao.py --tramas 50000 --destinos csv,bin,colunar,tcp --lento 0.5
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tty
+from os.path import dirname, abspath, join
+
+AQUI = dirname(abspath(__file__))
+SRC = join(AQUI, "..", "..")
+sys.path.insert(0, join(SRC, "comum"))
+sys.path.insert(0, join(SRC, "groundstation"))
+sys.path.insert(0, AQUI)
+
+from destinos import Destino
+from fec import CodificadorFEC
+from ingestao import Ingestao, criar_destinos
+from telemetria import CompressorTelemetria
+
+
+class DestinoLento(Destino):
+    nome = "lento"
+
+    def __init__(self, atraso):
+        self.atraso = atraso
+
+    def escrever_lote(self, tramas):
+        time.sleep(self.atraso)
+
+
+def gerar_tramas(n, periodo_chave=5.0, fec=True):
+    """n tramas (bytes) de um voo sintetico a 5 Hz, repetido se preciso."""
+    from compressao import voo_sintetico, _valores
+    amostras = voo_sintetico(periodo=0.2)
+    compressor = CompressorTelemetria(periodo_chave)
+    codificador = CodificadorFEC() if fec else None
+    tramas = []
+    for seq in range(n):
+        amostra = amostras[seq % len(amostras)]
+        # Tempo sempre a crescer, mesmo ao repetir o voo
+        tempo = amostras[0][0] + seq * 0.2
+        trama, _ = compressor.codificar(seq, tempo, _valores(amostra))
+        tramas.append(codificador.proteger(trama) if codificador else trama)
+    return tramas
+
+
+def medir(tramas, nomes, lento=None, tamanho_escrita=4096):
+    import serial
+    pasta = tempfile.mkdtemp()
+    mestre, escravo = os.openpty()
+    tty.setraw(mestre)
+    tty.setraw(escravo)
+    porta = serial.Serial(os.ttyname(escravo), 115200, timeout=0.1)
+    destinos = criar_destinos(nomes, join(pasta, "debito"), tcp_porta=0)
+    if lento is not None:
+        destinos.append(DestinoLento(lento))
+    ingestao = Ingestao(porta, destinos)
+    ingestao.iniciar()
+    try:
+        dados = b"".join(tramas)
+        inicio = time.perf_counter()
+        for i in range(0, len(dados), tamanho_escrita):
+            os.write(mestre, dados[i:i + tamanho_escrita])
+        while ingestao.rececao.tramas < len(tramas) and time.perf_counter() - inicio < 60:
+            time.sleep(0.001)
+        rececao = time.perf_counter() - inicio
+        ingestao.parar()
+        total = time.perf_counter() - inicio
+        return {
+            "bytes": len(dados),
+            "tramas": ingestao.rececao.tramas,
+            "segundos_rececao": rececao,
+            "segundos_total": total,
+            "estatisticas": ingestao.estatisticas(),
+        }
+    finally:
+        os.close(mestre)
+        os.close(escravo)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Debito maximo da ingestao (pty + destinos)")
+    parser.add_argument("--tramas", type=int, default=20000)
+    parser.add_argument("--destinos", default="csv,bin,colunar,tcp")
+    parser.add_argument("--lento", type=float, help="junta um destino que demora LENTO s por lote")
+    parser.add_argument("--sem-fec", action="store_true")
+    args = parser.parse_args()
+
+    tramas = gerar_tramas(args.tramas, fec=not args.sem_fec)
+    nomes = [nome.strip() for nome in args.destinos.split(",") if nome.strip()]
+    r = medir(tramas, nomes, args.lento)
+    print(f"[BENCH] {r['tramas']}/{len(tramas)} tramas, {r['bytes']} bytes em {r['segundos_rececao']:.2f} s: "
+          f"{r['tramas'] / r['segundos_rececao']:.0f} tramas/s "
+          f"({r['tramas'] / r['segundos_rececao'] / 5:.0f}x o debito do cansat a 5 Hz)")
+    for nome, d in r["estatisticas"]["destinos"].items():
+        print(f"  {nome:8s} escritas {d['escritas']:6d}  descartadas {d['descartadas']:6d}  "
+              f"atraso medio {d['latencia_media'] * 1000:7.1f} ms  max {d['latencia_maxima'] * 1000:7.1f} ms  "
+              f"fila max {d['profundidade_maxima']}")
+
+
+if __name__ == "__main__":
+    main()
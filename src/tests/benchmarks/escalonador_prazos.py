@@ -0,0 +1,113 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Prazos, atrasos e ultrapassagens do escalonador ********
+#
+# Corre o Escalonador com o RelogioFalso (sem esperas reais, sempre o
+# mesmo resultado) em tres cenarios e confirma as estatisticas:
+#
+#   pontual     tarefas rapidas: nenhum atraso, nenhum prazo perdido,
+#               periodo sem deriva
+#   ultrapassa  uma execucao de 2.5 s numa tarefa de 1 s: a propria e a
+#               tarefa que esperou por ela contam a ultrapassagem, os
+#               prazos saltados e o atraso, e voltam a grelha de tempo
+#   pontual_atrasado  um evento agendar() vencido durante essa execucao
+#               corre logo a seguir, com o atraso esperado
+#
+# Sai com codigo 1 se alguma estatistica nao for a esperada.
+#
+#   python3 escalonador_prazos.py
+import sys
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, join(dirname(abspath(__file__)), "..", "..", "comum"))
+
+from escalonador import Escalonador, RelogioFalso
+
+FOLGA = 1e-9
+
+
+def perto(a, b):
+    return abs(a - b) < FOLGA
+
+
+def cenario_pontual():
+    relogio = RelogioFalso()
+    escalonador = Escalonador(relogio, relogio.dormir)
+    inicios = []
+
+    def tarefa():
+        inicios.append(relogio())
+        relogio.avancar(0.01)  # 10 ms de trabalho, bem abaixo do periodo
+
+    escalonador.adicionar("telemetria", 0.2, tarefa)
+    escalonador.correr(60.0)
+    e = escalonador.estatisticas()["telemetria"]
+    falhas = []
+    if e["ultrapassagens"] or e["prazos_perdidos"] or e["atraso_maximo"] > FOLGA:
+        falhas.append(f"atrasos com tarefa rapida: {e}")
+    # Prazos absolutos: a execucao k comeca em k * periodo, sem acumular os 10 ms
+    if not all(perto(inicio, k * 0.2) for k, inicio in enumerate(inicios)):
+        falhas.append("o periodo derivou")
+    return e, falhas
+
+
+def cenario_ultrapassagem():
+    relogio = RelogioFalso()
+    escalonador = Escalonador(relogio, relogio.dormir)
+    inicios = []
+    pontual = []
+
+    def lenta():
+        inicios.append(relogio())
+        if len(inicios) == 3:
+            relogio.avancar(2.5)  # a terceira execucao (t=2) acaba em t=4.5
+
+    escalonador.adicionar("lenta", 1.0, lenta)
+    escalonador.adicionar("rapida", 0.5, lambda: None)
+    escalonador.agendar(2.2, lambda: pontual.append(relogio()))
+    escalonador.correr(10.0)
+    estatisticas = escalonador.estatisticas()
+    lenta_e, rapida_e = estatisticas["lenta"], estatisticas["rapida"]
+
+    falhas = []
+    # lenta: prazo seguinte 3.0 ultrapassado; 3.0 e 4.0 saltados, retoma em 5.0
+    if (lenta_e["ultrapassagens"], lenta_e["prazos_perdidos"]) != (1, 2):
+        falhas.append(f"lenta: {lenta_e}")
+    if lenta_e["atraso_maximo"] > FOLGA or not perto(lenta_e["duracao_maxima"], 2.5):
+        falhas.append(f"lenta: atraso/duracao {lenta_e}")
+    if [round(t, 6) for t in inicios[:5]] != [0.0, 1.0, 2.0, 5.0, 6.0]:
+        falhas.append(f"lenta nao voltou a grelha: {inicios[:5]}")
+    # rapida: prazo 2.0 so corre em 4.5 (atraso 2.5); 2.5 a 4.5 saltados, retoma em 5.0
+    if (rapida_e["ultrapassagens"], rapida_e["prazos_perdidos"]) != (1, 5):
+        falhas.append(f"rapida: {rapida_e}")
+    if not perto(rapida_e["atraso_maximo"], 2.5):
+        falhas.append(f"rapida: atraso maximo {rapida_e['atraso_maximo']}")
+    # pontual: vencido em 2.2, corre no passo seguinte, em 4.5
+    if len(pontual) != 1 or not perto(pontual[0], 4.5):
+        falhas.append(f"pontual atrasado: {pontual}")
+    return estatisticas, pontual, falhas
+
+
+def main():
+    falhas = []
+    e, f = cenario_pontual()
+    falhas += f
+    print(f"[BENCH] pontual: {e['execucoes']} execucoes, ultrapassagens={e['ultrapassagens']} "
+          f"perdidos={e['prazos_perdidos']} atraso_max={e['atraso_maximo'] * 1000:.1f} ms")
+    estatisticas, pontual, f = cenario_ultrapassagem()
+    falhas += f
+    for nome, e in estatisticas.items():
+        print(f"[BENCH] ultrapassa/{nome}: {e['execucoes']} execucoes, ultrapassagens={e['ultrapassagens']} "
+              f"perdidos={e['prazos_perdidos']} atraso_max={e['atraso_maximo'] * 1000:.0f} ms "
+              f"duracao_max={e['duracao_maxima'] * 1000:.0f} ms")
+    if pontual:
+        print(f"[BENCH] pontual_atrasado: agendado para 2.2 s, correu em {pontual[0]:.1f} s")
+    for falha in falhas:
+        print(f"[ERRO] {falha}")
+    if falhas:
+        sys.exit(1)
+    print("[BENCH] Estatisticas do escalonador como esperado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# ********************* Cansat 2024/2025 ***********************
+# *********************** Equipa Argos *************************
+# ***** Erro e custo da previsao do ponto de aterragem *********
+#
+# Passa um voo do perfil do simulador (tramas a 5 Hz, GPS a 1 Hz, com
+# ruido no BMP e no GPS) pelo PrevisorAterragem da ground station e
+# compara cada previsao com o ponto e o instante reais da aterragem:
+#
+#   - erro da posicao e do tempo ate ao impacto ao longo da descida
+#   - fracao das previsoes em que o ponto real fica dentro do raio (95%)
+#   - custo de adicionar() + prever() por frame
+#
+#   python3 previsao_aterragem.py
+#   python3 previsao_aterragem.py --vento 6,-2 --descida 5 --ruido-gps 5
+import argparse
+import math
+import random
+import sys
+import time
+from os.path import dirname, abspath, join
+
+AQUI = dirname(abspath(__file__))
+SRC = join(AQUI, "..", "..")
+sys.path.insert(0, join(SRC, "comum"))
+sys.path.insert(0, join(SRC, "groundstation"))
+sys.path.insert(0, join(SRC, "simulador"))
+
+from perfil_voo import PerfilVoo, RAIO_TERRA
+from previsao import PrevisorAterragem
+
+
+def distancia(lat0, lon0, lat1, lon1):
+    norte = math.radians(lat1 - lat0) * RAIO_TERRA
+    este = math.radians(lon1 - lon0) * RAIO_TERRA * math.cos(math.radians(lat0))
+    return math.hypot(este, norte)
+
+
+def tramas_voo(perfil, periodo=0.2, periodo_gps=1.0, ruido_baro=0.3, ruido_gps=3.0, semente=1):
+    """Tramas como as da estacao: GPS novo so a cada periodo_gps, repetido nas outras."""
+    aleatorio = random.Random(semente)
+    inicio = 1744884610.0
+    gps = (None, None, None)
+    for i in range(int((perfil.tempo_aterragem + 10.0) / periodo)):
+        t = i * periodo
+        if i % round(periodo_gps / periodo) == 0:
+            la, lo, hG = perfil.posicao(t)
+            # ruido_gps em metros, convertido para graus
+            la += aleatorio.gauss(0, ruido_gps) / RAIO_TERRA * 180 / math.pi
+            lo += aleatorio.gauss(0, ruido_gps) / (RAIO_TERRA * math.cos(math.radians(la))) * 180 / math.pi
+            gps = (la, lo, hG + aleatorio.gauss(0, ruido_gps * 1.5))
+        yield t, {"ts": inicio + t, "h": perfil.altitude(t) + aleatorio.gauss(0, ruido_baro),
+                  "la": gps[0], "lo": gps[1], "hG": gps[2]}
+
+
+def avaliar(perfil, **ruido):
+    previsor = PrevisorAterragem()
+    lat_real, lon_real, _ = perfil.posicao(perfil.tempo_aterragem)
+    resultados = []
+    custos = []
+    for t, dados in tramas_voo(perfil, **ruido):
+        inicio = time.perf_counter()
+        previsor.adicionar(dados)
+        previsao = previsor.prever()
+        custos.append(time.perf_counter() - inicio)
+        if previsao is None or t < perfil.tempo_apogeu:
+            continue
+        erro = distancia(lat_real, lon_real, previsao["la"], previsao["lo"])
+        resultados.append({
+            "fracao": (t - perfil.tempo_apogeu) / (perfil.tempo_aterragem - perfil.tempo_apogeu),
+            "erro": erro,
+            "raio": previsao["raio"],
+            "erro_tempo": previsao["tempo"] - (perfil.tempo_aterragem - t),
+            "dentro": erro <= previsao["raio"],
+        })
+    return resultados, custos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erro e custo da previsao do ponto de aterragem")
+    parser.add_argument("--vento", default="3,1", help="vento este,norte (m/s)")
+    parser.add_argument("--descida", type=float, default=8.0, help="velocidade de descida (m/s)")
+    parser.add_argument("--apogeu", type=float, default=500.0)
+    parser.add_argument("--ruido-gps", type=float, default=3.0, help="m")
+    args = parser.parse_args()
+
+    vento_este, vento_norte = (float(v) for v in args.vento.split(","))
+    perfil = PerfilVoo(apogeu=args.apogeu, velocidade_descida=args.descida, vento_este=vento_este,
+                       vento_norte=vento_norte)
+    resultados, custos = avaliar(perfil, ruido_gps=args.ruido_gps)
+    if not resultados:
+        print("[PREVISAO] Nenhuma previsao durante a descida")
+        return
+    print(f"[PREVISAO] Descida de {args.apogeu:g} m a {args.descida:g} m/s, vento {vento_este:g},{vento_norte:g} m/s, "
+          f"{len(resultados)} previsoes")
+    for marca in (0.1, 0.25, 0.5, 0.75, 0.9):
+        r = min(resultados, key=lambda r: abs(r["fracao"] - marca))
+        print(f"  {r['fracao']:4.0%} da descida: erro {r['erro']:6.1f} m (raio {r['raio']:6.1f} m), "
+              f"erro do tempo ate ao impacto {r['erro_tempo']:+5.1f} s")
+    dentro = sum(r["dentro"] for r in resultados) / len(resultados)
+    custos.sort()
+    print(f"  ponto real dentro do raio em {dentro:.0%} das previsoes")
+    print(f"  custo por frame: mediana {custos[len(custos) // 2] * 1e6:.0f} us, "
+          f"p99 {custos[int(len(custos) * 0.99)] * 1e6:.0f} us, maximo {custos[-1] * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()